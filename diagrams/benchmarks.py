@@ -0,0 +1,206 @@
+"""
+Khuta App - Deck Benchmarks
+Times the slide builders and whole-deck builds at realistic and stress sizes
+
+Each scenario builds a deck from a generated spec and saves it to memory,
+recording build and save wall time, peak traced memory and output size.
+Peak memory comes from tracemalloc, so it counts Python allocations only;
+lxml's C-level trees are not traced.
+Results are written as JSON and can be compared against a saved baseline
+to catch regressions.
+"""
+
+import argparse
+import fnmatch
+import io
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+from khuta_deck.deck_engine import DeckEngine, load_spec
+from khuta_deck.reproducible import save_presentation
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DECK_SPEC = os.path.join(HERE, "deck_spec.json")
+
+DECK_SIZES = (1000, 10000)
+TABLE_ROWS = (10, 50, 100, 250, 500)
+
+# Slides per builder scenario
+BUILDER_SLIDES = 200
+
+# Metrics compared against a baseline, lower is better
+METRICS = ("wall_s", "peak_mb", "size_bytes")
+
+
+def _cycled(slides, count):
+    return [slides[i % len(slides)] for i in range(count)]
+
+
+def _table_slide(rows):
+    return {
+        "type": "table",
+        "title": f"Benchmark table ({rows} rows)",
+        "headers": ["Question", "Parent", "Teacher", "T-Score"],
+        "rows": [[f"Question {i + 1}", str(i % 3), str((i + 1) % 3), str(40 + i % 40)] for i in range(rows)],
+    }
+
+
+def scenarios():
+    """Return {name: spec} for every benchmark scenario"""
+    deck = load_spec(DECK_SPEC)["slides"]
+    specs = {"deck_28": {"slides": deck}}
+    for size in DECK_SIZES:
+        specs[f"deck_{size // 1000}k"] = {"slides": _cycled(deck, size)}
+
+    # One scenario per builder, using the first deck slide of each type
+    for slide_spec in deck:
+        name = f"builder_{slide_spec['type']}"
+        if name not in specs:
+            specs[name] = {"slides": [slide_spec] * BUILDER_SLIDES}
+
+    for rows in TABLE_ROWS:
+        specs[f"table_{rows}"] = {"slides": [_table_slide(rows)]}
+    return specs
+
+
+def _build_and_save(engine, spec):
+    start = time.perf_counter()
+    prs = engine.build(spec)
+    built = time.perf_counter()
+    out = io.BytesIO()
+    save_presentation(prs, out)
+    saved = time.perf_counter()
+    return len(prs.slides), built - start, saved - built, out.tell()
+
+
+def _stream(engine, spec):
+    from khuta_deck.streaming import StreamingWriter
+
+    prs = engine.new_presentation()
+    out = io.BytesIO()
+    writer = StreamingWriter(prs, out)
+    start = time.perf_counter()
+    for slides in engine.iter_slides(prs, spec):
+        for slide in slides:
+            writer.add(slide)
+    writer.close()
+    elapsed = time.perf_counter() - start
+    return len(writer.slides), elapsed - writer.write_seconds, writer.write_seconds, out.tell()
+
+
+def run_scenario(engine, spec, repeat=1, memory=True, stream=False):
+    """Benchmark one spec; wall times are the best of `repeat` runs
+
+    With `stream`, slides are written as they are built and "save" is the
+    time spent writing them.
+    """
+    run = _stream if stream else _build_and_save
+    runs = [run(engine, spec) for _ in range(repeat)]
+    slides, build_s, save_s, size = min(runs, key=lambda r: r[1] + r[2])
+    result = {
+        "slides": slides,
+        "build_s": round(build_s, 4),
+        "save_s": round(save_s, 4),
+        "wall_s": round(build_s + save_s, 4),
+        "size_bytes": size,
+    }
+
+    # Tracing slows Python down, so memory gets its own untimed run
+    if memory:
+        tracemalloc.start()
+        run(engine, spec)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["peak_mb"] = round(peak / 2 ** 20, 2)
+    return result
+
+
+def environment():
+    """Describe the machine and library versions a run was made on"""
+    import pptx
+    return {
+        "python": platform.python_version(),
+        "python_pptx": pptx.__version__,
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Return [(scenario, metric, baseline, current, ratio, regressed)]"""
+    rows = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric in METRICS:
+            if metric not in current or not previous.get(metric):
+                continue
+            ratio = current[metric] / previous[metric]
+            rows.append((name, metric, previous[metric], current[metric], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def print_comparison(rows):
+    print(f"{'scenario':<30}{'metric':<12}{'baseline':>12}{'current':>12}{'change':>9}")
+    for name, metric, previous, current, ratio, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<30}{metric:<12}{previous:>12}{current:>12}{ratio - 1:>+9.1%}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Khuta slide builders and deck builds")
+    parser.add_argument("patterns", nargs="*", default=["*"],
+                        help="scenario names or glob patterns (default: all)")
+    parser.add_argument("--list", action="store_true", help="list scenarios and exit")
+    parser.add_argument("--quick", action="store_true", help="skip the 10k-slide deck")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="timed runs per scenario, keeping the fastest (default: 3)")
+    parser.add_argument("--stream", action="store_true", help="use the streaming writer")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    parser.add_argument("-o", "--output", help="write results JSON here (e.g. a new baseline)")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare against a saved results JSON")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="relative increase reported as a regression (default: 0.15)")
+    args = parser.parse_args(argv)
+
+    specs = scenarios()
+    names = [n for n in specs if any(fnmatch.fnmatch(n, p) for p in args.patterns)]
+    if args.quick:
+        names = [n for n in names if n != "deck_10k"]
+    if args.list:
+        for name in names:
+            print(f"{name:<30}{len(specs[name]['slides'])} slide specs")
+        return 0
+
+    engine = DeckEngine()
+    engine.warm_up()
+    results = {}
+    for name in names:
+        result = run_scenario(engine, specs[name], args.repeat, not args.no_memory, args.stream)
+        results[name] = result
+        peak = f"{result['peak_mb']:>9.1f} MB" if "peak_mb" in result else ""
+        print(f"{name:<30}{result['slides']:>6} slides {result['build_s']:>9.3f}s build "
+              f"{result['save_s']:>8.3f}s save {result['size_bytes'] / 1024:>9.0f} KB{peak}", flush=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+        print(f"Results saved to: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        rows = compare(results, baseline, args.threshold)
+        print()
+        print_comparison(rows)
+        if any(row[-1] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
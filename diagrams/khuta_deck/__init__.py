@@ -0,0 +1,56 @@
+"""
+Khuta App - Deck Toolkit
+Builds the Khuta presentation decks from declarative specs
+
+    from khuta_deck import build_deck
+    build_deck("deck_spec.json", "Khuta_Presentation.pptx")
+
+Importing the package is cheap: python-pptx and the slide builders are only
+loaded when a deck is actually built.
+"""
+
+import os
+
+DIAGRAMS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUILD_CACHE_DIR = os.path.join(DIAGRAMS_DIR, ".build_cache")
+
+__all__ = ["build_deck", "DIAGRAMS_DIR", "BUILD_CACHE_DIR"]
+
+_engine = None
+
+
+def build_deck(spec, out=None, cache_dir=None, stream=False, locales=None, store_dir=None):
+    """Build a deck and return its output path
+
+    `spec` is a spec mapping or the path of a JSON/YAML spec file; `out`
+    defaults to the spec's "output". With `cache_dir`, unchanged slides are
+    replayed from the build cache and an up-to-date output is left as is.
+    With `stream`, slides are written out as they are built.
+    With `locales` (or a spec that lists them), one deck is built per locale
+    in a single pass and the list of output paths is returned. With
+    `store_dir` (which needs `cache_dir`), decks are archived in an artifact
+    store and identical rebuilds are checked out of it.
+    One engine is shared across calls, so the template is prepared once.
+    """
+    global _engine
+    from .deck_engine import DeckEngine, load_spec
+
+    if isinstance(spec, (str, os.PathLike)):
+        spec = load_spec(os.fspath(spec))
+    cache = None
+    if cache_dir:
+        from .build_cache import SlideCache
+
+        cache = SlideCache(cache_dir)
+    store = None
+    if store_dir:
+        from .artifact_store import ArtifactStore
+
+        store = ArtifactStore(store_dir)
+    if _engine is None:
+        _engine = DeckEngine()
+    if locales or spec.get("locales"):
+        from .locales import compile_locales
+
+        return compile_locales(_engine, spec, locales, out, cache, stream=stream, store=store)
+    return _engine.compile(spec, out, cache, stream=stream, store=store)
@@ -0,0 +1,8 @@
+"""
+Khuta App - Deck Toolkit
+Runs the command line: python -m khuta_deck [specs...] [options]
+"""
+
+from .cli import main
+
+raise SystemExit(main())
@@ -0,0 +1,276 @@
+"""
+Khuta App - App Data
+Questions and SDQ scoring norms extracted from the app's Dart sources
+
+The question tables in lib/core/constants/questions.dart and the T-score
+table, age groups and interpretation levels in
+lib/core/services/sdq_scoring_service.dart are parsed once into a JSON
+cache, along with their English and Arabic texts from assets/translations.
+The cache is reused while the sources are unchanged (same mtime, or same
+content hash after a touch), so builds never re-parse the Dart files.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+from . import BUILD_CACHE_DIR, DIAGRAMS_DIR
+
+APP_DIR = os.path.normpath(os.path.join(DIAGRAMS_DIR, ".."))
+QUESTIONS_DART = os.path.join(APP_DIR, "lib", "core", "constants", "questions.dart")
+SCORING_DART = os.path.join(APP_DIR, "lib", "core", "services", "sdq_scoring_service.dart")
+TRANSLATIONS = {
+    "en": os.path.join(APP_DIR, "assets", "translations", "en.json"),
+    "ar": os.path.join(APP_DIR, "assets", "translations", "ar.json"),
+}
+LOGO_PATH = os.path.join(APP_DIR, "assets", "images", "logo.png")
+APP_DATA_CACHE = os.path.join(BUILD_CACHE_DIR, "app_data.json")
+
+# Changes to the extractor itself invalidate the cache too
+with open(__file__, "rb") as _f:
+    EXTRACTOR_VERSION = hashlib.sha256(_f.read()).hexdigest()[:16]
+
+_TOKEN = re.compile(r"""
+    \s+ | //[^\n]* | /\*.*?\*/
+  | '(?P<sq>(?:[^'\\]|\\.)*)'
+  | "(?P<dq>(?:[^"\\]|\\.)*)"
+  | (?P<num>-?\d+(?:\.\d+)?)
+  | (?P<punct>[{}\[\]:,;])
+  | (?P<word>\w+)
+""", re.S | re.X)
+
+_AGE_GROUP = re.compile(r"age >= (\d+) && age <= (\d+)\)\s*\{\s*ageGroup = '([^']+)'")
+_LEVEL = re.compile(r"tScore >= (\d+)\)\s*\{\s*return '(\w+)'\.tr\(\)")
+_LOWEST_LEVEL = re.compile(r"\}\s*else\s*\{\s*return '(\w+)'\.tr\(\)")
+
+
+class DartParseError(ValueError):
+    """Raised when a Dart constant cannot be found or parsed"""
+
+
+def _tokens(source, start):
+    """Return the (kind, value) tokens of Dart source from `start`"""
+    tokens = []
+    pos = start
+    while pos < len(source):
+        match = _TOKEN.match(source, pos)
+        if not match:
+            raise DartParseError(f"Unexpected character {source[pos]!r} at offset {pos}")
+        pos = match.end()
+        kind = match.lastgroup
+        if kind is None:
+            continue
+        value = match.group(kind)
+        if kind in ("sq", "dq"):
+            kind, value = "str", re.sub(r"\\(.)", r"\1", value)
+        elif kind == "num":
+            value = float(value) if "." in value else int(value)
+        # Adjacent string literals are concatenated, as in Dart
+        if kind == "str" and tokens and tokens[-1][0] == "str":
+            tokens[-1] = ("str", tokens[-1][1] + value)
+        else:
+            tokens.append((kind, value))
+        if kind == "punct" and value == ";":
+            break
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def next(self):
+        if self.pos >= len(self.tokens):
+            raise DartParseError("Unexpected end of Dart literal")
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def value(self):
+        kind, value = self.next()
+        # Dart `const` before a literal changes nothing here
+        while kind == "word" and value == "const":
+            kind, value = self.next()
+        if (kind, value) == ("punct", "{"):
+            return self.collection("}", mapping=True)
+        if (kind, value) == ("punct", "["):
+            return self.collection("]", mapping=False)
+        if kind in ("str", "num"):
+            return value
+        if kind == "word" and value in ("true", "false", "null"):
+            return {"true": True, "false": False, "null": None}[value]
+        raise DartParseError(f"Unsupported Dart value: {value!r}")
+
+    def collection(self, close, mapping):
+        result = {} if mapping else []
+        while self.peek() != ("punct", close):
+            item = self.value()
+            if mapping:
+                if self.next() != ("punct", ":"):
+                    raise DartParseError(f"Expected ':' after map key {item!r}")
+                result[item] = self.value()
+            else:
+                result.append(item)
+            if self.peek() == ("punct", ","):
+                self.next()
+        self.next()
+        return result
+
+
+def parse_dart_constant(source, name):
+    """Parse the map or list literal assigned to `name` in Dart source"""
+    match = re.search(rf"\b{re.escape(name)}\s*=\s*", source)
+    if not match:
+        raise DartParseError(f"{name} not found")
+    return _Parser(_tokens(source, match.end())).value()
+
+
+def _question_list(table, prefix, translations):
+    return [
+        {
+            "id": f"{prefix}{index}",
+            "key": table[index]["text"],
+            "image": table[index]["image"],
+            "en": translations["en"].get(table[index]["text"], table[index]["text"]),
+            "ar": translations["ar"].get(table[index]["text"], table[index]["text"]),
+        }
+        for index in sorted(table)
+    ]
+
+
+def extract():
+    """Parse the Dart sources and translations into the app data mapping"""
+    with open(QUESTIONS_DART, encoding="utf-8") as f:
+        questions = f.read()
+    with open(SCORING_DART, encoding="utf-8") as f:
+        scoring = f.read()
+    translations = {}
+    for lang, path in TRANSLATIONS.items():
+        with open(path, encoding="utf-8") as f:
+            translations[lang] = json.load(f)
+
+    levels = [
+        {"min": int(low), "key": key} for low, key in _LEVEL.findall(scoring)
+    ]
+    lowest = _LOWEST_LEVEL.findall(scoring)
+    if lowest:
+        levels.append({"min": None, "key": lowest[-1]})
+    for level in levels:
+        level["en"] = translations["en"].get(level["key"], level["key"])
+        level["ar"] = translations["ar"].get(level["key"], level["key"]).strip()
+
+    table = parse_dart_constant(scoring, "sdqParentTScoreTable")
+    return {
+        "questions": {
+            "parent": _question_list(parse_dart_constant(questions, "indexedParentQuestions"), "p", translations),
+            "teacher": _question_list(parse_dart_constant(questions, "indexedTeacherQuestions"), "t", translations),
+        },
+        # type -> gender -> age group -> [T-score for raw score 0, 1, ...]
+        "t_scores": {
+            kind: {
+                gender: {group: [scores[raw] for raw in sorted(scores)] for group, scores in groups.items()}
+                for gender, groups in genders.items()
+            }
+            for kind, genders in table.items()
+        },
+        "age_groups": [
+            {"min": int(low), "max": int(high), "group": group} for low, high, group in _AGE_GROUP.findall(scoring)
+        ],
+        # Highest threshold first; the last level has no lower bound
+        "levels": levels,
+    }
+
+
+def _sources():
+    return [QUESTIONS_DART, SCORING_DART, *TRANSLATIONS.values()]
+
+
+def _stamp(path):
+    stat = os.stat(path)
+    with open(path, "rb") as f:
+        sha = hashlib.sha256(f.read()).hexdigest()
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": sha}
+
+
+def _check_sources(stamps):
+    """Return (current, touched) for cached source stamps
+
+    A source whose mtime or size moved but whose content hash matches is
+    still current; its stamp is refreshed in place and `touched` is set.
+    """
+    touched = False
+    for path in _sources():
+        stamp = stamps.get(path)
+        if stamp is None:
+            return False, False
+        stat = os.stat(path)
+        if (stat.st_mtime_ns, stat.st_size) == (stamp["mtime_ns"], stamp["size"]):
+            continue
+        current = _stamp(path)
+        if current["sha256"] != stamp["sha256"]:
+            return False, False
+        stamps[path] = current
+        touched = True
+    return True, touched
+
+
+def load_app_data(cache_path=APP_DATA_CACHE):
+    """Return the app data, from the cache when the sources are unchanged"""
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        cached = {}
+
+    if cached.get("version") == EXTRACTOR_VERSION:
+        current, touched = _check_sources(cached["sources"])
+        if current:
+            if touched:
+                _write_cache(cache_path, cached)
+            return cached["data"]
+
+    cached = {
+        "version": EXTRACTOR_VERSION,
+        "sources": {path: _stamp(path) for path in _sources()},
+        "data": extract(),
+    }
+    _write_cache(cache_path, cached)
+    return cached["data"]
+
+
+def _write_cache(cache_path, cached):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cached, f, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+
+
+_app_data = None
+
+
+def app_data():
+    """App data shared by the slide builders, loaded once per process"""
+    global _app_data
+    if _app_data is None:
+        _app_data = load_app_data()
+    return _app_data
+
+
+def reload_app_data():
+    """Forget the loaded app data so the next app_data() call reads it again"""
+    global _app_data
+    _app_data = None
+
+
+def age_group(age):
+    """Return the SDQ age group label ('6-8', ...) for an age in years, or None"""
+    for group in app_data()["age_groups"]:
+        if group["min"] <= age <= group["max"]:
+            return group["group"]
+    return None
@@ -0,0 +1,139 @@
+"""
+Khuta App - Artifact Store
+Content-addressed archive of generated decks, deduplicated part by part
+
+A deck is stored as a manifest listing its zip members and the content hash
+of each one; the members themselves are zlib-compressed objects named by
+that hash. The theme, layouts, logo and question pictures shared by
+thousands of reports are therefore kept once. Decks are identified by the
+hash of their manifest, and build keys (from the build cache) map to deck
+ids, so rebuilding identical inputs is a lookup. Checking a deck out
+rewrites it with reproducible.py's fixed timestamps, giving back the same
+bytes the build wrote.
+
+    <store>/objects/ab/cdef...    member contents, by sha256
+    <store>/decks/<id>.json       manifest: members, file hash and size
+    <store>/keys/<build key>      deck id built from that key
+"""
+
+import hashlib
+import io
+import json
+import os
+import zipfile
+import zlib
+
+from . import BUILD_CACHE_DIR
+
+ARTIFACT_STORE_DIR = os.path.join(BUILD_CACHE_DIR, "artifacts")
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class ArtifactStore:
+    """Store and retrieve decks by content hash"""
+
+    def __init__(self, root=ARTIFACT_STORE_DIR):
+        self.root = root
+        self.hits = 0
+        self.stored = 0
+        self.new_objects = 0
+
+    def _object_path(self, sha):
+        return os.path.join(self.root, "objects", sha[:2], sha[2:])
+
+    def _deck_path(self, deck_id):
+        return os.path.join(self.root, "decks", f"{deck_id}.json")
+
+    def _key_path(self, key):
+        return os.path.join(self.root, "keys", key)
+
+    def put_object(self, blob):
+        """Store a blob once and return its sha256"""
+        sha = _sha256(blob)
+        path = self._object_path(sha)
+        if not os.path.exists(path):
+            _write_atomic(path, zlib.compress(blob))
+            self.new_objects += 1
+        return sha
+
+    def get_object(self, sha):
+        with open(self._object_path(sha), "rb") as f:
+            blob = zlib.decompress(f.read())
+        if _sha256(blob) != sha:
+            raise ValueError(f"Artifact object {sha} is corrupt")
+        return blob
+
+    def put_deck(self, path, key=None):
+        """Archive a .pptx file, optionally under a build key, and return its deck id"""
+        with open(path, "rb") as f:
+            data = f.read()
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            members = [[name, self.put_object(zf.read(name))] for name in zf.namelist()]
+
+        manifest = {"members": members, "sha256": _sha256(data), "size": len(data)}
+        deck_id = _sha256(json.dumps(members, separators=(",", ":")).encode("utf-8"))
+        deck_path = self._deck_path(deck_id)
+        if not os.path.exists(deck_path):
+            _write_atomic(deck_path, json.dumps(manifest, indent=1).encode("utf-8"))
+        if key is not None:
+            _write_atomic(self._key_path(key), deck_id.encode("ascii"))
+        self.stored += 1
+        return deck_id
+
+    def manifest(self, deck_id):
+        with open(self._deck_path(deck_id), encoding="utf-8") as f:
+            return json.load(f)
+
+    def lookup(self, key):
+        """Deck id archived under a build key, or None"""
+        try:
+            with open(self._key_path(key), encoding="ascii") as f:
+                deck_id = f.read().strip()
+        except OSError:
+            return None
+        return deck_id if os.path.exists(self._deck_path(deck_id)) else None
+
+    def checkout(self, deck_id, output_path):
+        """Write an archived deck to `output_path` and return the path"""
+        from .reproducible import write_member
+
+        manifest = self.manifest(deck_id)
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+            for name, sha in manifest["members"]:
+                write_member(zf, name, self.get_object(sha))
+        _write_atomic(os.path.abspath(output_path), buffer.getvalue())
+        self.hits += 1
+        return output_path
+
+    def usage(self):
+        """Return (decks, objects, bytes stored, bytes of the decks themselves)"""
+        decks = stored = logical = objects = 0
+        for folder, _, files in os.walk(os.path.join(self.root, "objects")):
+            for name in files:
+                objects += 1
+                stored += os.path.getsize(os.path.join(folder, name))
+        decks_dir = os.path.join(self.root, "decks")
+        for name in os.listdir(decks_dir) if os.path.isdir(decks_dir) else ():
+            decks += 1
+            with open(os.path.join(decks_dir, name), encoding="utf-8") as f:
+                logical += json.load(f)["size"]
+        return decks, objects, stored, logical
+
+    def report(self):
+        decks, objects, stored, logical = self.usage()
+        saved = 1 - stored / logical if logical else 0
+        return (f"Artifact store: {self.stored} decks archived, {self.hits} checked out, "
+                f"{self.new_objects} new objects; {decks} decks in {objects} objects, "
+                f"{stored / 1024:.0f} KB for {logical / 1024:.0f} KB of decks ({saved:.0%} saved)")
@@ -0,0 +1,193 @@
+"""
+Khuta App - Incremental Build Cache
+On-disk cache of built slide XML, keyed by a hash of each slide's inputs
+
+A slide key covers its builder name and arguments, the builder and style
+sources (slide_builders.py, deck_theme.py, deck_layouts.py, ...) and the
+content of any image or Markdown files its arguments reference. A hit replays
+the cached slide XML instead of running the builder. One spec entry may
+produce several slides; they are cached together, along with the blobs of
+any pictures they embed.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+from .app_data import LOGO_PATH, TRANSLATIONS, load_app_data
+
+# Files referenced by slide arguments whose content is part of the key
+TRACKED_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".gif", ".bmp", ".md")
+
+_RID_ATTR = re.compile(r'(r:(?:embed|link|id))="(rId\d+)"')
+
+_SOURCE_MODULES = ("slide_builders.py", "deck_theme.py", "deck_layouts.py", "mermaid_slides.py", "media.py",
+                  "text_layout.py", "table_xml.py", "shape_styles.py", "app_data.py", "locales.py",
+                  "template_snapshot.py", "markdown_doc.py")
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def builder_fingerprint():
+    """Hash of the sources that decide how a slide spec is rendered"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for name in _SOURCE_MODULES:
+        with open(os.path.join(here, name), "rb") as f:
+            digest.update(f.read())
+    # Questions and norms extracted from the app's Dart sources
+    digest.update(json.dumps(load_app_data(), sort_keys=True).encode("utf-8"))
+    # Builders look up some of their labels in the translation catalogs
+    for path in TRANSLATIONS.values():
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    # The logo is drawn on the title layout
+    if os.path.exists(LOGO_PATH):
+        with open(LOGO_PATH, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _referenced_files(value):
+    """Yield tracked file paths referenced anywhere in a slide's arguments"""
+    if isinstance(value, str):
+        if value.lower().endswith(TRACKED_EXTENSIONS) and os.path.isfile(value):
+            yield value
+    elif isinstance(value, dict):
+        for v in value.values():
+            yield from _referenced_files(v)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            yield from _referenced_files(v)
+
+
+class SlideCache:
+    """Content-addressed store of slide XML with hit/miss counters"""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.fingerprint = builder_fingerprint()
+        self.hits = 0
+        self.misses = 0
+        self.decks_current = 0
+        self._file_hashes = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _file_hash(self, path):
+        stat = os.stat(path)
+        cached = self._file_hashes.get(path)
+        if cached and cached[0] == (stat.st_mtime_ns, stat.st_size):
+            return cached[1]
+        with open(path, "rb") as f:
+            digest = _sha256(f.read())
+        self._file_hashes[path] = ((stat.st_mtime_ns, stat.st_size), digest)
+        return digest
+
+    def key(self, slide_spec):
+        """Return the cache key for one slide spec entry"""
+        payload = {
+            "builder": self.fingerprint,
+            "slide": slide_spec,
+            "files": {p: self._file_hash(p) for p in sorted(set(_referenced_files(slide_spec)))},
+        }
+        return _sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """Return the cached [(layout name, slide XML, images)] for a key, or None"""
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                entry = [(s["layout"], s["xml"], s["images"]) for s in json.load(f)["slides"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, key, slides):
+        """Store built slides, unless one depends on parts other than its layout and pictures"""
+        from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+
+        entry = []
+        for slide in slides:
+            images = {}
+            for rId, rel in slide.part.rels.items():
+                if rel.reltype == RT.SLIDE_LAYOUT:
+                    continue
+                if rel.reltype != RT.IMAGE or rel.is_external:
+                    return
+                images[rId] = self._put_blob(rel.target_part)
+            entry.append({
+                "layout": slide.slide_layout.name,
+                "xml": slide.part.blob.decode("utf-8"),
+                "images": images,
+            })
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"slides": entry}, f, ensure_ascii=False)
+
+    def _put_blob(self, image_part):
+        """Store a picture blob by content hash and return its cache path"""
+        ext = os.path.splitext(image_part.partname)[1]
+        path = os.path.join(self.cache_dir, "blobs", f"{_sha256(image_part.blob)}{ext}")
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(image_part.blob)
+        return path
+
+    def restore(self, prs, entry):
+        """Add the slides of a cached entry to `prs` and return them"""
+        from pptx.oxml import parse_xml
+
+        slides = []
+        for layout_name, xml, images in entry:
+            slide = prs.slides.add_slide(prs.slide_layouts.get_by_name(layout_name))
+            # Re-link pictures, mapping their old relationship ids to new ones
+            rids = {}
+            for old_rId, blob_path in images.items():
+                _, rids[old_rId] = slide.part.get_or_add_image_part(blob_path)
+            if rids:
+                xml = _RID_ATTR.sub(lambda m: f'{m.group(1)}="{rids.get(m.group(2), m.group(2))}"', xml)
+            slide._element[:] = list(parse_xml(xml.encode("utf-8")))
+            slides.append(slide)
+        return slides
+
+    def deck_key(self, slide_keys):
+        """Return the key of a whole deck from its slide keys"""
+        return _sha256("\n".join(slide_keys).encode("ascii"))
+
+    def _deck_stamp_path(self, output_path):
+        name = _sha256(os.path.abspath(output_path).encode("utf-8"))
+        return os.path.join(self.cache_dir, "decks", f"{name}.txt")
+
+    def deck_is_current(self, output_path, deck_key):
+        """True when `output_path` was last written from the same deck key"""
+        try:
+            with open(self._deck_stamp_path(output_path), encoding="ascii") as f:
+                stamp = f.read().split()
+        except OSError:
+            return False
+        stat = os.stat(output_path) if os.path.exists(output_path) else None
+        return bool(stat) and stamp == [deck_key, str(stat.st_mtime_ns)]
+
+    def mark_deck(self, output_path, deck_key):
+        """Record the deck key that `output_path` was written from"""
+        path = self._deck_stamp_path(output_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="ascii") as f:
+            f.write(f"{deck_key} {os.stat(output_path).st_mtime_ns}\n")
+
+    def report(self):
+        """One-line summary of cache activity"""
+        summary = f"Slide cache: {self.hits} hits, {self.misses} misses"
+        if self.decks_current:
+            summary += f" ({self.decks_current} decks already up to date)"
+        return summary
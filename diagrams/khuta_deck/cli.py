@@ -0,0 +1,252 @@
+"""
+Khuta App - Command Line
+Entry point for `python -m khuta_deck` and create_presentation.py
+
+Only the standard library is imported up front, so --help, --list-slides and
+up-to-date --incremental builds return without loading python-pptx.
+"""
+
+import argparse
+import os
+
+from . import BUILD_CACHE_DIR, DIAGRAMS_DIR
+from .artifact_store import ARTIFACT_STORE_DIR, ArtifactStore
+from .deck_engine import DeckEngine, load_spec
+
+DEFAULT_SPEC = os.path.join(DIAGRAMS_DIR, "deck_spec.json")
+
+
+def build_specs(spec_paths, output=None, cache=None, profiler=None, stream=False, locales=None, store=None,
+                update=False):
+    """Build each spec file, reusing one engine so the template is only prepared once
+
+    Specs listing "locales", or any spec when `locales` is given, build one
+    deck per locale. With `update`, existing decks are patched in place (see
+    deck_update.py). Returns the output paths.
+    """
+    engine = DeckEngine()
+    built = []
+    for spec_path in spec_paths:
+        spec = load_spec(spec_path)
+        if update:
+            from .deck_update import update_decks
+
+            for output_path, summary in update_decks(engine, spec, output, cache, locales):
+                if summary is None:
+                    print(f"Presentation saved to: {output_path}")
+                else:
+                    print(f"Presentation updated: {output_path} ({summary['rebuilt']} slides rebuilt, "
+                          f"{summary['kept']} kept, {summary['removed']} removed, "
+                          f"{summary['added_by_hand']} added by hand)")
+                built.append(output_path)
+            continue
+        if locales or spec.get("locales"):
+            from .locales import compile_locales
+
+            output_paths = compile_locales(engine, spec, locales, output, cache, profiler, stream, store)
+        else:
+            output_paths = [engine.compile(spec, output, cache, profiler, stream, store)]
+        for output_path in output_paths:
+            print(f"Presentation saved to: {output_path}")
+        built += output_paths
+    return built
+
+
+def render_thumbnails(deck_paths, out_dir, width=None, workers=None):
+    """Write slide PNGs and a contact sheet for each deck under `out_dir`"""
+    from .thumbnails import DEFAULT_WIDTH, ThumbnailRenderer, thumbnail_dir
+
+    renderer = ThumbnailRenderer(width=width or DEFAULT_WIDTH, workers=workers)
+    for deck_path in deck_paths:
+        folder = thumbnail_dir(out_dir, deck_path)
+        renderer.write(deck_path, folder)
+        print(f"Thumbnails saved to: {folder}")
+    print(renderer.report())
+
+
+def check_layouts(deck_paths):
+    """Print the layout issues of each deck, returning how many were found"""
+    from collections import Counter
+
+    from .layout_check import check_deck, format_issue
+
+    total = 0
+    for deck_path in deck_paths:
+        issues = check_deck(deck_path)
+        kinds = Counter(issue.kind for issue in issues)
+        summary = ", ".join(f"{count} {kind}" for kind, count in sorted(kinds.items()))
+        print(f"Layout check: {deck_path}: {len(issues)} issues" + (f" ({summary})" if issues else ""))
+        for issue in issues:
+            print(f"  {format_issue(issue)}")
+        total += len(issues)
+    return total
+
+
+def list_slides(spec_paths):
+    """Print the slide entries of each spec without building anything"""
+    for spec_path in spec_paths:
+        slides = load_spec(spec_path)["slides"]
+        print(f"{spec_path}: {len(slides)} slide specs")
+        for index, slide_spec in enumerate(slides, 1):
+            label = slide_spec.get("title") or os.path.basename(str(slide_spec.get("file", "")))
+            if isinstance(label, dict):
+                from .locales import localize
+
+                label = localize(label)
+            print(f"  {index:>4}  {slide_spec.get('type', '?'):<22}{label}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build Khuta presentation decks from specs")
+    parser.add_argument("specs", nargs="*", default=[DEFAULT_SPEC],
+                        help="deck spec files (JSON or YAML)")
+    parser.add_argument("-o", "--output",
+                        help="output path (only valid with a single spec)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="reuse unchanged slides from the build cache")
+    parser.add_argument("--cache-dir", default=BUILD_CACHE_DIR,
+                        help="build cache folder for --incremental")
+    parser.add_argument("--stream", action="store_true",
+                        help="write each slide out as soon as it is built, keeping memory flat")
+    parser.add_argument("--locales", type=lambda value: value.split(","), metavar="LIST",
+                        help="build one deck per locale, e.g. en,ar (default: the spec's locales)")
+    parser.add_argument("--store", nargs="?", const=ARTIFACT_STORE_DIR, metavar="DIR",
+                        help="archive decks in a content-addressed store and check out unchanged "
+                             "ones from it (implies --incremental)")
+    parser.add_argument("--update", action="store_true",
+                        help="patch existing decks in place, rebuilding only changed slides and keeping slides "
+                             "added by hand (implies --incremental)")
+    parser.add_argument("--watch", action="store_true",
+                        help="rebuild whenever the spec or a file it uses changes (implies --incremental)")
+    parser.add_argument("--thumbnails", metavar="DIR",
+                        help="render slide PNGs and a contact sheet of each built deck into DIR; "
+                             "given .pptx files instead of specs, only render those")
+    parser.add_argument("--thumb-width", type=int, metavar="PX",
+                        help="thumbnail width in pixels for --thumbnails (default: 640)")
+    parser.add_argument("--check-layout", action="store_true",
+                        help="check the built decks (or the given .pptx files) for overlapping shapes, "
+                             "shapes off the slide and overflowing text; exits with 1 if any are found")
+    parser.add_argument("--serve", nargs="?", const="127.0.0.1:8765", metavar="HOST:PORT",
+                        help="run the local render service (default: 127.0.0.1:8765)")
+    parser.add_argument("--queue-size", type=int, default=64, metavar="N",
+                        help="jobs --serve queues before answering 503 (default: 64)")
+    parser.add_argument("--list-slides", action="store_true",
+                        help="list the slide entries of each spec and exit")
+    parser.add_argument("--batch", metavar="MANIFEST",
+                        help="build every job in a manifest across worker processes")
+    parser.add_argument("--workers", type=int,
+                        help="worker processes for --batch, --serve and --thumbnails (default: CPU count)")
+    parser.add_argument("--reports", metavar="RESULTS",
+                        help="build one report deck per child from a TestResults export")
+    parser.add_argument("--cohort", metavar="RESULTS",
+                        help="build a cohort report deck of charts from a TestResults export "
+                             "(CSV, JSONL or Parquet; needs NumPy), saved to --output or cohort_report.pptx")
+    parser.add_argument("--children", metavar="CHILDREN",
+                        help="Children export to join with --reports or --cohort")
+    parser.add_argument("--out-dir", default="reports",
+                        help="output folder for --reports (default: reports)")
+    parser.add_argument("--profile", nargs="?", const="build_profile.json", metavar="JSON",
+                        help="time each builder call and save, writing JSON (default: build_profile.json)")
+    parser.add_argument("--profile-top", type=int, default=10, metavar="N",
+                        help="slowest builder calls to list with --profile (default: 10)")
+    parser.add_argument("--cprofile", metavar="PSTATS",
+                        help="run the build under cProfile and save the stats here")
+    args = parser.parse_args(argv)
+
+    if args.batch:
+        from .deck_batch import load_manifest, print_report, run_batch
+
+        results, elapsed = run_batch(load_manifest(args.batch), args.workers)
+        print_report(results, elapsed)
+        return 0 if all(r["status"] == "ok" for r in results) else 1
+
+    if args.serve:
+        from .render_service import serve
+
+        host, _, port = args.serve.rpartition(":")
+        return serve(host or "127.0.0.1", int(port), args.workers, args.queue_size)
+
+    if args.list_slides:
+        list_slides(args.specs)
+        return 0
+
+    if args.thumbnails and all(path.lower().endswith(".pptx") for path in args.specs):
+        render_thumbnails(args.specs, args.thumbnails, args.thumb_width, args.workers)
+        return 0
+
+    if args.check_layout and all(path.lower().endswith(".pptx") for path in args.specs):
+        return 1 if check_layouts(args.specs) else 0
+
+    if args.output and len(args.specs) > 1:
+        parser.error("--output can only be used with a single spec")
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+
+    cache = None
+    if args.incremental or args.store or args.watch or args.update:
+        from .build_cache import SlideCache
+
+        cache = SlideCache(args.cache_dir)
+
+    store = None
+    if args.store:
+        store = ArtifactStore(args.store)
+
+    if args.watch:
+        from .watch import watch
+
+        return watch(DeckEngine(), args.specs, cache, args.output, args.locales)
+
+    if args.reports:
+        from .report_decks import build_reports
+
+        reports = build_reports(DeckEngine(), args.reports, args.out_dir, args.children, cache, store)
+        count = sum(1 for _ in reports)
+        print(f"Built {count} report decks in: {args.out_dir}")
+        if store is not None:
+            print(store.report())
+        return 0
+
+    if args.cohort:
+        from .cohort import build_cohort_report
+
+        output_path = build_cohort_report(DeckEngine(), args.cohort, args.output or "cohort_report.pptx",
+                                          args.children, cache, store)
+        print(f"Presentation saved to: {output_path}")
+        if args.check_layout and check_layouts([output_path]):
+            return 1
+        return 0
+
+    profiler = None
+    if args.profile:
+        from .deck_profile import BuildProfiler
+
+        profiler = BuildProfiler()
+
+    if args.cprofile:
+        import cProfile
+        import pstats
+
+        with cProfile.Profile() as cprofiler:
+            built = build_specs(args.specs, args.output, cache, profiler, args.stream, args.locales, store,
+                                args.update)
+        cprofiler.dump_stats(args.cprofile)
+        pstats.Stats(cprofiler).sort_stats("cumulative").print_stats(20)
+        print(f"cProfile stats saved to: {args.cprofile}")
+    else:
+        built = build_specs(args.specs, args.output, cache, profiler, args.stream, args.locales, store,
+                            args.update)
+
+    if cache is not None:
+        print(cache.report())
+    if store is not None:
+        print(store.report())
+    if profiler is not None:
+        profiler.write_json(args.profile)
+        print(profiler.report(args.profile_top))
+        print(f"Profile saved to: {args.profile}")
+    if args.thumbnails:
+        render_thumbnails(built, args.thumbnails, args.thumb_width, args.workers)
+    if args.check_layout and check_layouts(built):
+        return 1
+    return 0
@@ -0,0 +1,455 @@
+"""
+Khuta App - Cohort Report
+Summarizes a whole TestResults export as one deck of native charts
+
+Where report_decks.py gives each child a deck, this reads the export as
+columns and reports on the cohort. It covers the T-score distribution and
+score band shares per age group and gender, and how far parent and teacher
+assessments of the same child agree. Each child's latest parent and teacher
+result counts. Exports can be CSV, JSONL or Parquet, with an optional
+Children export supplying age and gender.
+
+The columns are NumPy arrays, and every statistic is a sort or a bincount
+over all rows at once, so exports of millions of rows take seconds. NumPy is
+only needed here. Parquet exports also need pyarrow, which reads CSV much
+faster than the csv module when it is installed. Distributions are
+re-binned to at most MAX_CHART_POINTS points, so charts stay light however
+wide the score range is.
+"""
+
+import csv
+import math
+import operator
+import warnings
+
+from .app_data import app_data
+from .deck_engine import SpecError
+from .locales import default_index
+from .report_decks import _parse_date, read_rows
+from .slide_builders import score_bands
+
+# Points per chart series at most; finer distributions are re-binned
+MAX_CHART_POINTS = 40
+
+ASSESSMENTS = ("parent", "teacher")
+GENDERS = ("male", "female")
+
+RESULT_COLUMNS = ("childId", "testType", "score", "date", "age", "gender")
+CHILD_COLUMNS = ("id", "age", "gender", "isDeleted")
+
+# Series colors of the distribution charts: all ages, then each age group
+_SERIES_COLORS = ("2D3748", "4299E1", "48BB78", "ECC94B", "ED8936", "F56565", "C53030")
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise SpecError("NumPy is required for cohort reports (pip install numpy)") from None
+    return numpy
+
+
+def read_columns(path, names):
+    """Columns of a CSV, JSONL or Parquet export as {name: sequence}; absent columns are left out"""
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SpecError(f"pyarrow is required to read {path}") from None
+        present = [name for name in names if name in pq.read_schema(path).names]
+        table = pq.read_table(path, columns=present)
+        return {name: table.column(name).to_numpy(zero_copy_only=False) for name in present}
+
+    if path.endswith(".csv"):
+        try:
+            import pyarrow
+            from pyarrow import csv as arrow_csv
+        except ImportError:
+            arrow_csv = None
+        if arrow_csv is not None:
+            # pyarrow parses CSV far faster than the csv module; ids stay strings
+            options = arrow_csv.ConvertOptions(
+                include_columns=list(names), include_missing_columns=True,
+                column_types={name: pyarrow.string() for name in ("childId", "id")},
+            )
+            table = arrow_csv.read_csv(path, convert_options=options)
+            return {name: table.column(name).to_numpy(zero_copy_only=False)
+                    for name in names if table.column(name).type != pyarrow.null()}
+        with open(path, encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            present = [name for name in names if name in header]
+            if not present:
+                return {}
+            get = operator.itemgetter(*(header.index(name) for name in present))
+            rows = map(get, reader) if len(present) > 1 else ((value,) for value in map(get, reader))
+            columns = list(zip(*rows)) or [()] * len(present)
+            return dict(zip(present, columns))
+
+    columns = {name: [] for name in names}
+    for row in read_rows(path):
+        for name, column in columns.items():
+            column.append(row.get(name))
+    return {name: column for name, column in columns.items() if any(v is not None for v in column)}
+
+
+def _strings(np, values):
+    """Values as stripped strings, with '' for missing ones"""
+    values = np.asarray(values, dtype=object)
+    if values.dtype.kind == "O":
+        values[np.equal(values, None)] = ""
+    return np.char.strip(values.astype(str))
+
+
+def _numbers(np, values):
+    """Floats, with NaN for blank or missing values"""
+    try:
+        return np.asarray(values, dtype=float)
+    except (TypeError, ValueError):
+        pass
+    values = _strings(np, values)
+    numbers = np.full(len(values), np.nan)
+    present = values != ""
+    try:
+        numbers[present] = values[present].astype(float)
+    except ValueError as e:
+        raise SpecError(f"Expected numbers in the export: {e}") from None
+    return numbers
+
+
+def _timestamps(np, values):
+    """Seconds since the epoch of ISO, epoch-second or timestamp values, NaN when missing"""
+    values = np.asarray(values)
+    if values.dtype.kind != "M":
+        try:
+            return _numbers(np, values)
+        except SpecError:
+            pass
+        try:
+            with warnings.catch_warnings():
+                # A trailing "Z" is UTC, which is what datetime64 assumes anyway
+                warnings.simplefilter("ignore", UserWarning)
+                values = values.astype("datetime64[s]")
+        except ValueError:
+            # Time zone offsets and Firestore exports are parsed one by one
+            dates = [_parse_date(value) for value in values.tolist()]
+            return np.array([date.timestamp() if date else np.nan for date in dates])
+    stamps = values.astype("datetime64[s]")
+    return np.where(np.isnat(stamps), np.nan, stamps.astype("int64").astype(float))
+
+
+def _name_index(names):
+    """Index of each accepted spelling of `names`: the name itself and its catalog texts
+
+    The app stores some values translated, e.g. testType is "parent".tr(),
+    so "Parent Assessment" and "تقييم الوالدين" both mean "parent".
+    """
+    catalog = default_index().index
+    index = {}
+    for i, name in enumerate(names):
+        for alias in [name, *catalog.get(name, {}).values()]:
+            index.setdefault(alias.strip().casefold(), i)
+    return index
+
+
+def _codes(np, values, names):
+    """Index of each value in `names` or their translations (ignoring case and spaces), or -1"""
+    values = values.tolist() if hasattr(values, "tolist") else values
+    index = _name_index(names)
+    codes = {}
+    for value in set(values):
+        name = str(value).strip().casefold() if value is not None else ""
+        codes[value] = index.get(name, -1)
+    return np.fromiter(map(codes.__getitem__, values), dtype=np.int64, count=len(values))
+
+
+def load_cohort(results_path, children_path=None):
+    """Each child's latest parent and teacher T-score, age and gender, as arrays indexed by child
+
+    Returns {"scores": (children, 2) array with NaN where an assessment is
+    missing, "age", "gender" (index into GENDERS or -1), "results": rows read}.
+    """
+    np = _numpy()
+    columns = read_columns(results_path, RESULT_COLUMNS)
+    if "childId" not in columns or "score" not in columns:
+        raise SpecError(f"{results_path}: the export needs 'childId' and 'score' columns")
+    rows = len(columns["childId"])
+    ids, child = np.unique(_strings(np, columns["childId"]), return_inverse=True)
+    child = child.reshape(-1)
+    kind = _codes(np, columns["testType"], ASSESSMENTS) if "testType" in columns else np.zeros(rows, dtype=int)
+    score = _numbers(np, columns["score"])
+    date = _timestamps(np, columns["date"]) if "date" in columns else np.zeros(rows)
+
+    age = np.full(len(ids), np.nan)
+    gender = np.full(len(ids), -1)
+    deleted = np.zeros(len(ids), dtype=bool)
+    if "age" in columns or "gender" in columns:
+        # Age and gender as of each child's latest assessment
+        rated = np.flatnonzero((kind >= 0) & ~np.isnan(score))
+        rated = rated[np.lexsort((np.nan_to_num(date[rated], nan=-np.inf), child[rated]))]
+        last = rated[np.flatnonzero(np.append(child[rated][1:] != child[rated][:-1], True))] if len(rated) else rated
+        if "age" in columns:
+            age[child[last]] = _numbers(np, columns["age"])[last]
+        if "gender" in columns:
+            gender[child[last]] = _codes(np, columns["gender"], GENDERS)[last]
+
+    if children_path:
+        info = read_columns(children_path, CHILD_COLUMNS)
+        if len(info.get("id", ())):
+            # Join the Children export on id; its age and gender win over the results'
+            child_ids = _strings(np, info["id"])
+            order = np.argsort(child_ids)
+            position = np.minimum(np.searchsorted(child_ids[order], ids), len(order) - 1)
+            found = child_ids[order][position] == ids
+            source = order[position[found]]
+            if "age" in info:
+                ages = _numbers(np, info["age"])[source]
+                age[found] = np.where(np.isnan(ages), age[found], ages)
+            if "gender" in info:
+                genders = _codes(np, info["gender"], GENDERS)[source]
+                gender[found] = np.where(genders < 0, gender[found], genders)
+            if "isDeleted" in info:
+                deleted[found] = _codes(np, info["isDeleted"], ("true",))[source] == 0
+
+    # Latest row of each (child, assessment): sort by child, assessment and date, keep each run's last
+    valid = np.flatnonzero((kind >= 0) & ~np.isnan(score) & ~deleted[child])
+    order = valid[np.lexsort((np.nan_to_num(date[valid], nan=-np.inf), kind[valid], child[valid]))]
+    key = child[order] * len(ASSESSMENTS) + kind[order]
+    latest = order[np.flatnonzero(np.append(key[1:] != key[:-1], True))] if len(order) else order
+    scores = np.full((len(ids), len(ASSESSMENTS)), np.nan)
+    scores[child[latest], kind[latest]] = score[latest]
+
+    kept = ~deleted & ~np.isnan(scores).all(axis=1)
+    return {"scores": scores[kept], "age": age[kept], "gender": gender[kept], "results": rows}
+
+
+def _age_bounds():
+    return [(group["min"], group["max"]) for group in app_data()["age_groups"]]
+
+
+def age_groups(np, ages):
+    """Index of each age's SDQ age group, or -1"""
+    groups = np.full(len(ages), -1)
+    for index, (low, high) in enumerate(_age_bounds()):
+        groups[(ages >= low) & (ages <= high)] = index
+    return groups
+
+
+def rebin(counts, max_points=MAX_CHART_POINTS):
+    """Sum adjacent bins of the last axis so there are at most `max_points`; returns (counts, bins per point)"""
+    np = _numpy()
+    width = max(1, math.ceil(counts.shape[-1] / max_points))
+    padding = (-counts.shape[-1]) % width
+    padded = np.concatenate([counts, np.zeros(counts.shape[:-1] + (padding,), dtype=counts.dtype)], axis=-1)
+    return padded.reshape(counts.shape[:-1] + (-1, width)).sum(axis=-1), width
+
+
+def _shares(counts):
+    """Each row of counts as percentages of its total, rounded to 0.1"""
+    np = _numpy()
+    totals = counts.sum(axis=-1, keepdims=True)
+    return np.round(100 * counts / np.maximum(totals, 1), 1)
+
+
+def distribution_slides(cohort, max_points=MAX_CHART_POINTS):
+    """Line charts of the T-score distribution, one per assessment and gender, with a series per age group"""
+    np = _numpy()
+    scores, genders = cohort["scores"], cohort["gender"]
+    groups = age_groups(np, cohort["age"])
+    labels = [f"{low}-{high}" for low, high in _age_bounds()]
+    known = scores[~np.isnan(scores)]
+    if not len(known):
+        return []
+    low, high = math.floor(known.min()), math.floor(known.max()) + 1
+
+    slides = []
+    for column, assessment in enumerate(ASSESSMENTS):
+        score = scores[:, column]
+        has = ~np.isnan(score)
+        bins = (score[has] - low).astype(int)
+        for code, gender in enumerate(GENDERS):
+            rows = genders[has] == code
+            if not rows.any():
+                continue
+            # Row 0 is every age, rows 1.. the age groups
+            counts = np.zeros((len(labels) + 1, high - low), dtype=np.int64)
+            counts[0] = np.bincount(bins[rows], minlength=high - low)
+            grouped = rows & (groups[has] >= 0)
+            counts[1:] = np.bincount(groups[has][grouped] * (high - low) + bins[grouped],
+                                     minlength=len(labels) * (high - low)).reshape(len(labels), -1)
+            counts, width = rebin(counts, max_points)
+            categories = [str(low + i * width) for i in range(counts.shape[1])]
+            shares = _shares(counts)
+            series = [
+                {"name": name, "values": shares[row].tolist(), "color": _SERIES_COLORS[row % len(_SERIES_COLORS)]}
+                for row, name in enumerate(["All ages"] + [f"Age {label}" for label in labels])
+                if counts[row].any()
+            ]
+            slides.append({
+                "type": "chart",
+                "chart_type": "line",
+                "title": f"T-Scores: {assessment.title()}, {gender.title()} - الدرجات التائية",
+                "categories": categories,
+                "series": series,
+                "number_format": '0.0"%"',
+            })
+    return slides
+
+
+def _group_labels(np, cohort):
+    """Group index of each child (age group x gender, -1 if unknown) and the group labels"""
+    groups = age_groups(np, cohort["age"])
+    genders = cohort["gender"]
+    index = np.where((groups >= 0) & (genders >= 0), groups * len(GENDERS) + genders, -1)
+    labels = [f"{gender.title()} {low}-{high}" for low, high in _age_bounds() for gender in GENDERS]
+    return index, labels
+
+
+def _per_group(np, index, count, weights=None):
+    """Sums per group, with the total over every child (known group or not) first"""
+    known = index >= 0
+    weights = np.ones(len(index)) if weights is None else weights
+    sums = np.bincount(index[known], weights=weights[known], minlength=count)
+    return np.concatenate([[weights.sum()], sums])
+
+
+def band_slides(cohort):
+    """100% stacked bars of the score band shares per group, one per assessment"""
+    np = _numpy()
+    bands = score_bands("en")
+    lows = np.array([low for (low, _), *_ in bands[1:]])
+    index, labels = _group_labels(np, cohort)
+    labels = ["All"] + labels
+
+    slides = []
+    for column, assessment in enumerate(ASSESSMENTS):
+        score = cohort["scores"][:, column]
+        has = ~np.isnan(score)
+        if not has.any():
+            continue
+        band = np.searchsorted(lows, score[has], side="right")
+        counts = np.stack([_per_group(np, index[has], len(labels) - 1, (band == b).astype(float))
+                           for b in range(len(bands))], axis=1)
+        rows = np.flatnonzero(counts.sum(axis=1))
+        shares = _shares(counts[rows])
+        slides.append({
+            "type": "chart",
+            "chart_type": "stacked_bar",
+            "title": f"Score Bands: {assessment.title()} - مستويات الدرجات",
+            # Bar charts draw the first category at the bottom; list "All" last so it is on top
+            "categories": [labels[row] for row in rows][::-1],
+            "series": [
+                {"name": f"{label} ({score_range})", "values": shares[::-1, b].tolist(), "color": str(color)}
+                for b, (_, score_range, label, color, _) in enumerate(bands)
+            ],
+            "number_format": '0.0"%"',
+        })
+    return slides
+
+
+def agreement_stats(cohort):
+    """Parent-teacher agreement per group, for children with both assessments
+
+    Returns the group labels ("All" first) and arrays of the number of
+    children, the share (%) in the same score band and within one band, the
+    mean absolute T-score difference and the Pearson correlation.
+    """
+    np = _numpy()
+    index, labels = _group_labels(np, cohort)
+    both = ~np.isnan(cohort["scores"]).any(axis=1)
+    parent, teacher = cohort["scores"][both].T
+    index = index[both]
+    lows = np.array([low for (low, _), *_ in score_bands("en")[1:]])
+    apart = np.abs(np.searchsorted(lows, parent, side="right") - np.searchsorted(lows, teacher, side="right"))
+
+    count = len(labels)
+    n = _per_group(np, index, count)
+    sums = {name: _per_group(np, index, count, values) for name, values in {
+        "same": (apart == 0).astype(float), "near": (apart <= 1).astype(float), "diff": np.abs(parent - teacher),
+        "p": parent, "t": teacher, "pp": parent * parent, "tt": teacher * teacher, "pt": parent * teacher,
+    }.items()}
+    safe_n = np.maximum(n, 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        covariance = n * sums["pt"] - sums["p"] * sums["t"]
+        spread = np.sqrt((n * sums["pp"] - sums["p"] ** 2) * (n * sums["tt"] - sums["t"] ** 2))
+        r = np.where(spread > 0, covariance / spread, np.nan)
+    return {
+        "labels": ["All"] + labels,
+        "children": n.astype(int),
+        "same_band": 100 * sums["same"] / safe_n,
+        "within_one_band": 100 * sums["near"] / safe_n,
+        "mean_difference": sums["diff"] / safe_n,
+        "correlation": r,
+    }
+
+
+def agreement_slides(cohort):
+    """A column chart and a table of parent-teacher agreement per group"""
+    np = _numpy()
+    stats = agreement_stats(cohort)
+    rows = np.flatnonzero(stats["children"])
+    if not len(rows):
+        return []
+    categories = [stats["labels"][row] for row in rows]
+    return [
+        {
+            "type": "chart",
+            "chart_type": "column",
+            "title": "Parent-Teacher Agreement - التوافق",
+            "categories": categories,
+            "series": [
+                {"name": "Same band", "values": np.round(stats["same_band"][rows], 1).tolist(), "color": "4299E1"},
+                {"name": "Within one band", "values": np.round(stats["within_one_band"][rows], 1).tolist(),
+                 "color": "48BB78"},
+            ],
+            "number_format": '0.0"%"',
+        },
+        {
+            "type": "table",
+            "title": "Agreement by Group - التوافق حسب الفئة",
+            "headers": ["Group", "Children", "Same band", "Within one band", "Mean |ΔT|", "r"],
+            "rows": [
+                [
+                    stats["labels"][row],
+                    str(stats["children"][row]),
+                    f"{stats['same_band'][row]:.1f}%",
+                    f"{stats['within_one_band'][row]:.1f}%",
+                    f"{stats['mean_difference'][row]:.1f}",
+                    "-" if np.isnan(stats["correlation"][row]) else f"{stats['correlation'][row]:.2f}",
+                ]
+                for row in rows
+            ],
+            "font_size": 14,
+            "row_height": 0.4,
+        },
+    ]
+
+
+def build_cohort_spec(cohort, max_points=MAX_CHART_POINTS):
+    """Describe the cohort report deck as a deck spec"""
+    np = _numpy()
+    assessed = ~np.isnan(cohort["scores"])
+    return {"slides": [
+        {"type": "title", "title": "Cohort Report", "subtitle": "تقرير المجموعة"},
+        {
+            "type": "content",
+            "title": "Cohort - المجموعة",
+            "content_items": [
+                f"Results read - النتائج: {cohort['results']:,}",
+                f"Children - الأطفال: {len(assessed):,}",
+                f"Parent assessments - تقييمات الوالدين: {int(assessed[:, 0].sum()):,}",
+                f"Teacher assessments - تقييمات المعلم: {int(assessed[:, 1].sum()):,}",
+                f"Both - كلاهما: {int(assessed.all(axis=1).sum()):,}",
+                "Each child's latest result per assessment is counted - يُحتسب آخر تقييم لكل طفل",
+            ],
+        },
+        *distribution_slides(cohort, max_points),
+        *band_slides(cohort),
+        *agreement_slides(cohort),
+    ]}
+
+
+def build_cohort_report(engine, results_path, output_path, children_path=None, cache=None, store=None):
+    """Build the cohort report deck of a TestResults export, returning its path"""
+    spec = build_cohort_spec(load_cohort(results_path, children_path))
+    return engine.compile(spec, output_path, cache, store=store)
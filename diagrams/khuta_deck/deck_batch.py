@@ -0,0 +1,97 @@
+"""
+Khuta App - Batch Deck Generation
+Spreads a manifest of deck jobs across a pool of worker processes
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .deck_engine import DeckEngine, SpecError, load_spec
+
+# Per-process engine, prepared once by the pool initializer and kept
+# warm between jobs
+_engine = None
+
+
+def load_manifest(path):
+    """Load a batch manifest, resolving job paths against its folder"""
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    jobs = manifest.get("jobs") if isinstance(manifest, dict) else None
+    if not isinstance(jobs, list):
+        raise SpecError(f"{path}: manifest must be a mapping with a 'jobs' list")
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    resolved = []
+    for i, job in enumerate(jobs):
+        job = dict(job)
+        if isinstance(job.get("spec"), str):
+            job["spec"] = os.path.join(base_dir, job["spec"])
+        if job.get("output"):
+            job["output"] = os.path.join(base_dir, job["output"])
+        job.setdefault("name", f"job-{i + 1}")
+        resolved.append(job)
+    return resolved
+
+
+def _init_worker():
+    global _engine
+    _engine = DeckEngine()
+    _engine.warm_up()
+
+
+def run_job(job):
+    """Build one deck job in the current worker and report its status"""
+    start = time.perf_counter()
+    result = {"name": job["name"], "outputs": [], "pid": os.getpid()}
+    try:
+        spec = job["spec"]
+        if isinstance(spec, str):
+            spec = load_spec(spec)
+        output = job.get("output") or spec.get("output")
+        if output:
+            os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        if job.get("locales") or spec.get("locales"):
+            from .locales import compile_locales
+
+            # One deck per locale, as build_deck and the CLI do
+            result["outputs"] = compile_locales(_engine, spec, job.get("locales"), output)
+        else:
+            result["outputs"] = [_engine.compile(spec, output)]
+        result["status"] = "ok"
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def run_batch(jobs, workers=None):
+    """Run deck jobs across a process pool and return (results, elapsed)"""
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(run_job, job) for job in jobs]
+        for future in as_completed(futures):
+            results.append(future.result())
+    elapsed = time.perf_counter() - start
+
+    # Report in manifest order regardless of completion order
+    order = {job["name"]: i for i, job in enumerate(jobs)}
+    results.sort(key=lambda r: order.get(r["name"], 0))
+    return results, elapsed
+
+
+def print_report(results, elapsed):
+    """Print per-job status and overall throughput"""
+    for r in results:
+        detail = ", ".join(r["outputs"]) if r["status"] == "ok" else r["error"]
+        print(f"  [{r['status']:>5}] {r['name']:<30} {r['seconds']:7.3f}s  {detail}")
+
+    ok = sum(1 for r in results if r["status"] == "ok")
+    decks = sum(len(r["outputs"]) for r in results if r["status"] == "ok")
+    rate = decks / elapsed if elapsed else 0.0
+    print(f"Built {decks} decks from {ok}/{len(results)} jobs in {elapsed:.2f}s ({rate:.1f} decks/s)")
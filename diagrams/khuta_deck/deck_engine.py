@@ -0,0 +1,222 @@
+"""
+Khuta App - Deck Build Engine
+Compiles declarative deck specs (JSON/YAML) into PowerPoint files
+"""
+
+import copy
+import io
+import json
+import os
+import time
+
+
+# Slide arguments holding file paths, resolved against the spec's folder
+PATH_ARGS = ("file", "image", "images")
+
+
+class SpecError(ValueError):
+    """Raised when a deck spec is malformed"""
+
+
+def _resolve_paths(value, base_dir):
+    if isinstance(value, list):
+        return [_resolve_paths(v, base_dir) for v in value]
+    if isinstance(value, dict):
+        # Per-locale paths
+        return {key: _resolve_paths(v, base_dir) for key, v in value.items()}
+    if isinstance(value, str) and not os.path.isabs(value):
+        return os.path.join(base_dir, value)
+    return value
+
+
+def load_spec(path):
+    """Load a deck spec from a JSON or YAML file"""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise SpecError(f"PyYAML is required to read {path}") from None
+            spec = yaml.safe_load(f)
+        else:
+            spec = json.load(f)
+
+    if not isinstance(spec, dict) or not isinstance(spec.get("slides"), list):
+        raise SpecError(f"{path}: spec must be a mapping with a 'slides' list")
+
+    # Relative paths are resolved against the spec's folder
+    base_dir = os.path.dirname(os.path.abspath(path))
+    if spec.get("output"):
+        spec["output"] = _resolve_paths(spec["output"], base_dir)
+    for slide_spec in spec["slides"]:
+        for arg in PATH_ARGS:
+            if arg in slide_spec:
+                slide_spec[arg] = _resolve_paths(slide_spec[arg], base_dir)
+    return spec
+
+
+class DeckEngine:
+    """Builds decks from specs, reusing one prepared base template
+
+    python-pptx and the template are only loaded when the first deck is
+    built, so checking an up-to-date deck never pays for them. The base is
+    loaded from the template snapshot (see template_snapshot.py) and cloned
+    for every deck.
+    """
+
+    def __init__(self, template=None):
+        self.template = template
+        self._base = None
+
+    def _prepare_base(self):
+        from pptx import Presentation
+
+        from .template_snapshot import load_snapshot
+
+        # The prepared template is parsed once per process
+        return Presentation(io.BytesIO(load_snapshot(self.template)))
+
+    def warm_up(self):
+        """Load python-pptx and prepare the template now rather than on first build"""
+        if self._base is None:
+            self._base = self._prepare_base()
+
+    def new_presentation(self, profiler=None):
+        """Return a fresh presentation cloned from the base template
+
+        Copying the parsed base is faster than parsing the snapshot bytes
+        again. A `profiler` records the time taken as the deck's setup cost.
+        """
+        start = time.perf_counter()
+        self.warm_up()
+        prs = copy.deepcopy(self._base)
+        if profiler is not None:
+            profiler.record_setup(time.perf_counter() - start)
+        return prs
+
+    def add_slide(self, prs, slide_spec, cache=None, key=None, entry_id=None):
+        """Add the slides described by a spec entry and return them as a list
+
+        Slides are replayed from `cache` when it holds the entry's key. Given
+        the entry's `entry_id`, the slides are tagged for deck_update.py.
+        """
+        from .deck_update import tag_slides
+
+        if cache is not None:
+            key = key or cache.key(slide_spec)
+            entry = cache.get(key)
+            if entry is not None:
+                slides = cache.restore(prs, entry)
+                if entry_id is not None:
+                    tag_slides(slides, entry_id, key)
+                return slides
+
+        from .slide_builders import BUILDERS
+
+        args = dict(slide_spec)
+        args.pop("id", None)
+        slide_type = args.pop("type", None)
+        builder = BUILDERS.get(slide_type)
+        if builder is None:
+            raise SpecError(f"Unknown slide type: {slide_type!r}")
+        result = builder(prs, **args)
+        slides = result if isinstance(result, list) else [result]
+
+        if cache is not None:
+            cache.put(key, slides)
+        if entry_id is not None:
+            tag_slides(slides, entry_id, key)
+        return slides
+
+    def iter_slides(self, prs, spec, cache=None, keys=None, profiler=None):
+        """Add each spec entry's slides to `prs`, yielding them entry by entry"""
+        from .deck_update import entry_id
+
+        keys = keys or [None] * len(spec["slides"])
+        for index, (slide_spec, key) in enumerate(zip(spec["slides"], keys)):
+            if profiler is None:
+                yield self.add_slide(prs, slide_spec, cache, key, entry_id(slide_spec, index))
+                continue
+            hits = cache.hits if cache is not None else 0
+            start = time.perf_counter()
+            slides = self.add_slide(prs, slide_spec, cache, key, entry_id(slide_spec, index))
+            seconds = time.perf_counter() - start
+            cached = cache is not None and cache.hits > hits
+            profiler.record_call(index, slide_spec.get("type"), seconds, slides, cached)
+            yield slides
+
+    def build(self, spec, cache=None, keys=None, profiler=None):
+        """Build a presentation from a spec without saving it"""
+        prs = self.new_presentation(profiler)
+        for _ in self.iter_slides(prs, spec, cache, keys, profiler):
+            pass
+        return prs
+
+    def deck_keys(self, spec, output_path, cache=None):
+        """Return (slide keys, deck key, current) for building a spec to `output_path`
+
+        `current` is true when the output already matches the spec, in which
+        case the slides count as cache hits. Without a cache nothing is keyed.
+        """
+        if cache is None:
+            return None, None, False
+        keys = [cache.key(slide_spec) for slide_spec in spec["slides"]]
+        deck_key = cache.deck_key(keys)
+        if cache.deck_is_current(output_path, deck_key):
+            cache.hits += len(keys)
+            cache.decks_current += 1
+            return keys, deck_key, True
+        return keys, deck_key, False
+
+    def compile(self, spec, output_path=None, cache=None, profiler=None, stream=False, store=None):
+        """Build a spec and save it, returning the output path
+
+        With a `cache`, unchanged slides are replayed from it and the save
+        is skipped entirely when the output already matches the spec. A
+        `profiler` records the time of each builder call and of the save.
+        With `stream`, each slide is written out as soon as it is built (see
+        streaming.py) so memory does not grow with the deck. With a `store`
+        (and a cache to key the deck), a deck archived from the same inputs
+        is checked out instead of rebuilt, and new decks are archived.
+        """
+        output_path = output_path or spec.get("output")
+        if not output_path:
+            raise SpecError("No output path given for deck")
+
+        keys, deck_key, current = self.deck_keys(spec, output_path, cache)
+        if current:
+            return output_path
+        if self.checkout(store, deck_key, output_path, cache):
+            return output_path
+
+        if profiler is not None:
+            profiler.begin_deck(output_path)
+        if stream:
+            from .streaming import stream_deck
+
+            save_seconds = stream_deck(self, spec, output_path, cache, keys, profiler)
+        else:
+            from .reproducible import save_presentation
+
+            prs = self.build(spec, cache, keys, profiler)
+            start = time.perf_counter()
+            save_presentation(prs, output_path)
+            save_seconds = time.perf_counter() - start
+        if profiler is not None:
+            profiler.record_save(save_seconds, os.path.getsize(output_path))
+        if cache is not None:
+            cache.mark_deck(output_path, deck_key)
+        if store is not None:
+            store.put_deck(output_path, deck_key)
+        return output_path
+
+    def checkout(self, store, deck_key, output_path, cache):
+        """Write the deck archived under `deck_key` to `output_path`, if there is one"""
+        if store is None or deck_key is None:
+            return False
+        deck_id = store.lookup(deck_key)
+        if deck_id is None:
+            return False
+        store.checkout(deck_id, output_path)
+        cache.mark_deck(output_path, deck_key)
+        return True
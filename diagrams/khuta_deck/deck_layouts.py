@@ -0,0 +1,192 @@
+"""
+Khuta App - Custom Slide Layouts
+Installs the Khuta title, section and header layouts into the slide master
+
+The header band, section bar, title background and logo live on the
+layouts, and the slide titles are layout placeholders, so each slide only
+carries its own content shapes.
+"""
+
+import os
+
+from pptx.opc.constants import CONTENT_TYPE as CT, RELATIONSHIP_TYPE as RT
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import qn
+from pptx.parts.slide import SlideLayoutPart
+from pptx.util import Inches, Pt
+
+from .app_data import LOGO_PATH
+from .deck_theme import SLIDE_WIDTH, SLIDE_HEIGHT, PRIMARY_BLUE, DARK_BLUE, WHITE
+from .text_layout import INSET_X_PT, SAFETY, default_metrics
+
+TITLE_LAYOUT = "Khuta Title"
+SECTION_LAYOUT = "Khuta Section"
+HEADER_LAYOUT = "Khuta Header"
+
+# Title sizes of the layouts (points); longer titles shrink to fit one line, down to MIN_TITLE_PT
+TITLE_SIZES = {TITLE_LAYOUT: 54, SECTION_LAYOUT: 48, HEADER_LAYOUT: 36}
+MIN_TITLE_PT = 20
+
+# Logo size and top edge on the title layout
+LOGO_SIZE = Inches(1.5)
+LOGO_TOP = Inches(0.7)
+
+_NSMAP = (
+    'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships" '
+    'xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main"'
+)
+
+
+def _xfrm(left, top, width, height):
+    return (
+        f'<a:xfrm><a:off x="{int(left)}" y="{int(top)}"/>'
+        f'<a:ext cx="{int(width)}" cy="{int(height)}"/></a:xfrm>'
+    )
+
+
+def _rect(shape_id, name, left, top, width, height, color):
+    """A filled, borderless rectangle drawn on the layout"""
+    return (
+        f'<p:sp><p:nvSpPr><p:cNvPr id="{shape_id}" name="{name}"/><p:cNvSpPr/><p:nvPr userDrawn="1"/></p:nvSpPr>'
+        f'<p:spPr>{_xfrm(left, top, width, height)}<a:prstGeom prst="rect"><a:avLst/></a:prstGeom>'
+        f'<a:solidFill><a:srgbClr val="{color}"/></a:solidFill><a:ln><a:noFill/></a:ln></p:spPr>'
+        f'<p:txBody><a:bodyPr/><a:lstStyle/><a:p><a:endParaRPr lang="en-US"/></a:p></p:txBody></p:sp>'
+    )
+
+
+def _placeholder(shape_id, name, ph, left, top, width, height, size, color, bold=False, align="l"):
+    """A text placeholder whose list style carries the Khuta font settings"""
+    bold_attr = ' b="1"' if bold else ""
+    return (
+        f'<p:sp><p:nvSpPr><p:cNvPr id="{shape_id}" name="{name}"/>'
+        f'<p:cNvSpPr><a:spLocks noGrp="1"/></p:cNvSpPr><p:nvPr>{ph}</p:nvPr></p:nvSpPr>'
+        f'<p:spPr>{_xfrm(left, top, width, height)}</p:spPr>'
+        f'<p:txBody><a:bodyPr wrap="none" lIns="91440" tIns="45720" rIns="91440" bIns="45720" anchor="t">'
+        f'<a:noAutofit/></a:bodyPr><a:lstStyle>'
+        f'<a:lvl1pPr marL="0" indent="0" algn="{align}"><a:spcBef><a:spcPts val="0"/></a:spcBef><a:buNone/>'
+        f'<a:defRPr sz="{int(size.pt * 100)}"{bold_attr}><a:solidFill><a:srgbClr val="{color}"/></a:solidFill>'
+        f'<a:latin typeface="+mn-lt"/><a:ea typeface="+mn-ea"/><a:cs typeface="+mn-cs"/></a:defRPr></a:lvl1pPr>'
+        f'</a:lstStyle><a:p><a:endParaRPr lang="en-US"/></a:p></p:txBody></p:sp>'
+    )
+
+
+def _picture(shape_id, name, rId, left, top, width, height):
+    """A picture drawn on the layout, with rounded corners"""
+    return (
+        f'<p:pic {_NSMAP}><p:nvPicPr><p:cNvPr id="{shape_id}" name="{name}"/>'
+        f'<p:cNvPicPr><a:picLocks noChangeAspect="1"/></p:cNvPicPr><p:nvPr userDrawn="1"/></p:nvPicPr>'
+        f'<p:blipFill><a:blip r:embed="{rId}"/><a:stretch><a:fillRect/></a:stretch></p:blipFill>'
+        f'<p:spPr>{_xfrm(left, top, width, height)}<a:prstGeom prst="roundRect"><a:avLst/></a:prstGeom></p:spPr>'
+        f'</p:pic>'
+    )
+
+
+def _add_logo(layout_part):
+    """Draw the app logo centered above the title, if the logo file is there"""
+    if not os.path.exists(LOGO_PATH):
+        return
+    from .media import default_pipeline
+
+    size_in = LOGO_SIZE.inches
+    _, rId = layout_part.get_or_add_image_part(default_pipeline().prepare(LOGO_PATH, size_in, size_in))
+    sp_tree = layout_part._element.cSld.spTree
+    shape_id = max(int(el.get("id")) for el in sp_tree.iter(qn("p:cNvPr"))) + 1
+    left = (SLIDE_WIDTH - LOGO_SIZE) // 2
+    sp_tree.append(parse_xml(_picture(shape_id, "Logo", rId, left, LOGO_TOP, LOGO_SIZE, LOGO_SIZE)))
+
+
+def _layout_xml(name, shapes, background=None):
+    bg = (
+        f'<p:bg><p:bgPr><a:solidFill><a:srgbClr val="{background}"/></a:solidFill>'
+        f'<a:effectLst/></p:bgPr></p:bg>'
+        if background else ""
+    )
+    return (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        f'<p:sldLayout {_NSMAP} preserve="1" userDrawn="1">'
+        f'<p:cSld name="{name}">{bg}<p:spTree>'
+        f'<p:nvGrpSpPr><p:cNvPr id="1" name=""/><p:cNvGrpSpPr/><p:nvPr/></p:nvGrpSpPr>'
+        f'<p:grpSpPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="0" cy="0"/>'
+        f'<a:chOff x="0" y="0"/><a:chExt cx="0" cy="0"/></a:xfrm></p:grpSpPr>'
+        f'{"".join(shapes)}</p:spTree></p:cSld>'
+        f'<p:clrMapOvr><a:masterClrMapping/></p:clrMapOvr></p:sldLayout>'
+    ).encode("utf-8")
+
+
+def _layout_definitions():
+    """Return (name, layout XML) for each Khuta layout"""
+    title_ph = '<p:ph type="title"/>'
+    return [
+        (TITLE_LAYOUT, _layout_xml(TITLE_LAYOUT, [
+            _placeholder(2, "Title 1", title_ph, Inches(0.5), Inches(2.5), Inches(12.333), Inches(1.5),
+                         Pt(TITLE_SIZES[TITLE_LAYOUT]), WHITE, bold=True, align="ctr"),
+            _placeholder(3, "Subtitle 2", '<p:ph type="subTitle" idx="1"/>',
+                         Inches(0.5), Inches(4.2), Inches(12.333), Inches(1),
+                         Pt(28), PRIMARY_BLUE, align="ctr"),
+        ], background=DARK_BLUE)),
+        (SECTION_LAYOUT, _layout_xml(SECTION_LAYOUT, [
+            _rect(2, "Section Bar", 0, 0, Inches(0.3), SLIDE_HEIGHT, PRIMARY_BLUE),
+            _placeholder(3, "Title 2", title_ph, Inches(1), Inches(3), Inches(11), Inches(1.5),
+                         Pt(TITLE_SIZES[SECTION_LAYOUT]), DARK_BLUE, bold=True),
+        ])),
+        (HEADER_LAYOUT, _layout_xml(HEADER_LAYOUT, [
+            _rect(2, "Header Band", 0, 0, SLIDE_WIDTH, Inches(1.2), PRIMARY_BLUE),
+            _placeholder(3, "Title 2", title_ph, Inches(0.5), Inches(0.3), Inches(12.333), Inches(0.8),
+                         Pt(TITLE_SIZES[HEADER_LAYOUT]), WHITE, bold=True),
+        ])),
+    ]
+
+
+def install_layouts(prs):
+    """Add the Khuta layouts to the first slide master, if not already there"""
+    master = prs.slide_master
+    existing = {layout.name for layout in master.slide_layouts}
+    package = prs.part.package
+
+    layout_id_lst = master._element.get_or_add_sldLayoutIdLst()
+    used_ids = [int(el.get("id")) for el in prs.part._element.iter(qn("p:sldMasterId"))]
+    used_ids += [int(el.get("id")) for el in layout_id_lst.iter(qn("p:sldLayoutId"))]
+    next_id = max(used_ids) + 1
+
+    for name, blob in _layout_definitions():
+        if name in existing:
+            continue
+        partname = package.next_partname("/ppt/slideLayouts/slideLayout%d.xml")
+        layout_part = SlideLayoutPart.load(partname, CT.PML_SLIDE_LAYOUT, package, blob)
+        layout_part.relate_to(master.part, RT.SLIDE_MASTER)
+        rId = master.part.relate_to(layout_part, RT.SLIDE_LAYOUT)
+        if name == TITLE_LAYOUT:
+            _add_logo(layout_part)
+
+        layout_id = layout_id_lst._add_sldLayoutId()
+        layout_id.set("id", str(next_id))
+        layout_id.set(qn("r:id"), rId)
+        next_id += 1
+
+
+def get_layout(prs, name):
+    """Return a Khuta layout by name, installing the layouts on first use"""
+    layout = prs.slide_layouts.get_by_name(name)
+    if layout is None:
+        install_layouts(prs)
+        layout = prs.slide_layouts.get_by_name(name)
+    return layout
+
+
+def set_title(slide, text):
+    """Fill a slide's title placeholder, shrinking the text when it is too wide for one line
+
+    Returns the title's paragraph.
+    """
+    title = slide.shapes.title
+    p = title.text_frame.paragraphs[0]
+    p.text = text
+    size = TITLE_SIZES.get(slide.slide_layout.name)
+    if size:
+        metrics = default_metrics()
+        width_pt = title.width.pt - 2 * INSET_X_PT
+        widest = max(metrics.width(line, 1) for line in text.replace("\v", "\n").split("\n")) * SAFETY
+        if widest * size > width_pt:
+            p.font.size = Pt(max(MIN_TITLE_PT, int(width_pt / widest)))
+    return p
@@ -0,0 +1,102 @@
+"""
+Khuta App - Build Profiling
+Records where deck build time goes, for create_presentation.py --profile
+
+Every spec entry's builder call is timed along with the shapes and slide
+XML bytes it produced, and every deck's setup (cloning the base template)
+and save are timed. Results are written as JSON
+and summarised as a table of the slowest calls and per-builder totals.
+"""
+
+import json
+from collections import defaultdict
+
+
+class BuildProfiler:
+    """Collects per-builder and per-save timings across one or more decks"""
+
+    def __init__(self):
+        self.calls = []
+        self.setups = []
+        self.saves = []
+        self.deck = None
+
+    def begin_deck(self, name):
+        """Attribute the following records to deck `name`"""
+        self.deck = name
+
+    def record_call(self, index, slide_type, seconds, slides, cached=False):
+        """Record one spec entry, given the slides its builder returned"""
+        # Serializing each slide for its size happens outside the timed call
+        self.calls.append({
+            "deck": self.deck,
+            "index": index,
+            "type": slide_type,
+            "seconds": seconds,
+            "cached": cached,
+            "slides": len(slides),
+            "shapes": sum(len(slide.shapes) for slide in slides),
+            "xml_bytes": [len(slide.part.blob) for slide in slides],
+        })
+
+    def record_setup(self, seconds):
+        """Record the creation of the current deck from the base template"""
+        self.setups.append({"deck": self.deck, "seconds": seconds})
+
+    def record_save(self, seconds, size):
+        """Record the save of the current deck"""
+        self.saves.append({"deck": self.deck, "seconds": seconds, "bytes": size})
+
+    def by_builder(self):
+        """Return {slide type: totals} sorted by total time, slowest first"""
+        totals = defaultdict(lambda: {"calls": 0, "seconds": 0.0, "slides": 0, "shapes": 0, "xml_bytes": 0})
+        for call in self.calls:
+            entry = totals[call["type"]]
+            entry["calls"] += 1
+            entry["seconds"] += call["seconds"]
+            entry["slides"] += call["slides"]
+            entry["shapes"] += call["shapes"]
+            entry["xml_bytes"] += sum(call["xml_bytes"])
+        return dict(sorted(totals.items(), key=lambda item: -item[1]["seconds"]))
+
+    def to_dict(self):
+        return {
+            "build_seconds": sum(call["seconds"] for call in self.calls),
+            "setup_seconds": sum(setup["seconds"] for setup in self.setups),
+            "save_seconds": sum(save["seconds"] for save in self.saves),
+            "builders": self.by_builder(),
+            "calls": self.calls,
+            "setups": self.setups,
+            "saves": self.saves,
+        }
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+
+    def report(self, top=10):
+        """Text summary: slowest calls, per-builder totals and save times"""
+        lines = [f"Slowest {min(top, len(self.calls))} of {len(self.calls)} builder calls:",
+                 f"  {'slide':>6}  {'type':<22}{'ms':>9}{'shapes':>8}{'XML KB':>9}"]
+        for call in sorted(self.calls, key=lambda c: -c["seconds"])[:top]:
+            cached = " (cached)" if call["cached"] else ""
+            lines.append(f"  {call['index'] + 1:>6}  {call['type']:<22}{call['seconds'] * 1000:>9.1f}"
+                         f"{call['shapes']:>8}{sum(call['xml_bytes']) / 1024:>9.1f}{cached}")
+
+        lines += ["", "Per builder:",
+                  f"  {'type':<22}{'calls':>6}{'total ms':>10}{'mean ms':>9}{'shapes':>8}{'XML KB':>9}"]
+        for slide_type, entry in self.by_builder().items():
+            lines.append(f"  {slide_type:<22}{entry['calls']:>6}{entry['seconds'] * 1000:>10.1f}"
+                         f"{entry['seconds'] * 1000 / entry['calls']:>9.1f}{entry['shapes']:>8}"
+                         f"{entry['xml_bytes'] / 1024:>9.1f}")
+
+        if self.setups:
+            total = sum(setup["seconds"] for setup in self.setups)
+            lines += ["", f"Setup: {len(self.setups)} decks from the base template, "
+                          f"{total * 1000:.1f} ms ({total * 1000 / len(self.setups):.2f} ms per deck)"]
+
+        lines += ["", "Saves:"]
+        for save in self.saves:
+            lines.append(f"  {save['seconds'] * 1000:>9.1f} ms  {save['bytes'] / 1024:>9.1f} KB  {save['deck']}")
+        return "\n".join(lines)
+
@@ -0,0 +1,35 @@
+"""
+Khuta App - Deck Theme
+Slide size and colors shared by the slide builders and layouts
+"""
+
+from pptx.util import Inches
+from pptx.dml.color import RGBColor
+
+# Slide size (16:9)
+SLIDE_WIDTH = Inches(13.333)
+SLIDE_HEIGHT = Inches(7.5)
+
+# Colors
+PRIMARY_BLUE = RGBColor(66, 153, 225)
+DARK_BLUE = RGBColor(45, 55, 72)
+LIGHT_GRAY = RGBColor(247, 250, 252)
+GREEN = RGBColor(72, 187, 120)
+YELLOW = RGBColor(236, 201, 75)
+ORANGE = RGBColor(237, 137, 54)
+RED = RGBColor(245, 101, 101)
+DARK_RED = RGBColor(197, 48, 48)
+WHITE = RGBColor(255, 255, 255)
+
+# Theme color slots taken over from the template, so table styles and other
+# theme-colored elements follow the Khuta palette
+THEME_COLORS = {
+    "dk2": DARK_BLUE,
+    "lt2": LIGHT_GRAY,
+    "accent1": PRIMARY_BLUE,
+    "accent2": GREEN,
+    "accent3": YELLOW,
+    "accent4": ORANGE,
+    "accent5": RED,
+    "accent6": DARK_RED,
+}
@@ -0,0 +1,467 @@
+"""
+Khuta App - Deck Update
+Patches a built deck in place, rebuilding only the slides whose inputs changed
+
+Every generated slide is named (the p:cSld name attribute) with a tag made
+of its spec entry's id, its page within the entry and the entry's build
+cache key. An update reads the tags of the existing deck and keeps each
+slide whose entry still has the same key. Entries with a new key are built
+again. Kept members are copied across without being parsed, so the cost of
+an update follows the changed slides rather than the deck size. Slides
+without a tag were added by hand. They stay after the generated slide they
+followed. Parts nothing refers to any more, such as the pictures of
+replaced slides, are left out.
+
+Entries are identified by their "id" when the spec gives one, and by their
+position otherwise. A deck with no tags at all, built before tags existed,
+is adopted: its slides are matched to entries by title, or by position for
+entries without one, and rebuilt, and the layouts the new slides need are
+added to its master. Slides matching no entry are kept as added by hand.
+"""
+
+import os
+import posixpath
+import re
+import zipfile
+from xml.sax.saxutils import escape, unescape
+
+from lxml import etree
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.opc.oxml import serialize_part_xml
+from pptx.opc.packuri import PackURI
+from pptx.opc.serialized import _ContentTypesItem
+from pptx.oxml import parse_xml
+
+from .deck_engine import SpecError
+from .ooxml_geometry import NS, qn
+from .reproducible import write_member
+from .streaming import (
+    _PARTNAME, FIRST_SLIDE_ID, StreamingWriter, _WrittenPart, _rid_order, capture, drop_slide, template_parts,
+)
+
+TAG_PREFIX = "khuta:"
+
+_CSLD_NAME = re.compile(rb'<p:cSld\b[^>]*?\bname="([^"]*)"')
+
+_SLIDE_LAYOUT = re.compile(r"^ppt/slideLayouts/slideLayout\d+\.xml$")
+_SLIDE_MASTER = re.compile(r"^ppt/slideMasters/slideMaster\d+\.xml$")
+
+# Hex digits of the build key kept in a tag
+TAG_KEY_LENGTH = 16
+
+_R_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+
+# Members written anew rather than copied
+_PACKAGE_MEMBERS = ("[Content_Types].xml", "ppt/presentation.xml", "ppt/_rels/presentation.xml.rels")
+
+
+class UpdateError(ValueError):
+    """Raised when a deck cannot be patched and needs a full build"""
+
+
+def entry_id(slide_spec, index):
+    """Id of a spec entry: its "id", or its 1-based position in the spec"""
+    return str(slide_spec.get("id", index + 1))
+
+
+def slide_tag(entry, page, key=None):
+    return f"{TAG_PREFIX}{entry}:{page}:{(key or '')[:TAG_KEY_LENGTH]}"
+
+
+def parse_tag(name):
+    """(entry id, page, key) of a slide tag, or None for a slide added by hand"""
+    if not name.startswith(TAG_PREFIX):
+        return None
+    try:
+        entry, page, key = name[len(TAG_PREFIX):].rsplit(":", 2)
+        return entry, int(page), key or None
+    except ValueError:
+        return None
+
+
+def tag_slides(slides, entry, key=None):
+    """Name each slide built from a spec entry with its tag"""
+    for page, slide in enumerate(slides):
+        slide._element.cSld.set("name", slide_tag(entry, page, key))
+
+
+def _cSld_name(zf, member):
+    """Name of a slide or layout, read from the start of its XML"""
+    with zf.open(member) as f:
+        match = _CSLD_NAME.search(f.read(2048))
+    return unescape(match.group(1).decode("utf-8"), {"&quot;": '"'}) if match else ""
+
+
+def _retag(xml, tag):
+    """Slide XML with its name replaced by `tag`"""
+    name = escape(tag, {'"': "&quot;"}).encode("utf-8")
+    match = _CSLD_NAME.search(xml)
+    return xml[:match.start(1)] + name + xml[match.end(1):]
+
+
+def _source_part(rels_member):
+    """Member a .rels member holds the relationships of ("" for the package)"""
+    folder, name = posixpath.split(rels_member)
+    return posixpath.join(posixpath.dirname(folder), name[:-len(".rels")])
+
+
+def _rel_targets(zf, member):
+    """Members the internal relationships of `member` ("" for the package) point to"""
+    folder, name = posixpath.split(member)
+    rels_name = posixpath.join(folder, "_rels", f"{name}.rels")
+    if rels_name not in zf.NameToInfo:
+        return []
+    targets = []
+    for rel in etree.fromstring(zf.read(rels_name)):
+        if rel.get("TargetMode") == "External":
+            continue
+        target = rel.get("Target")
+        targets.append(target[1:] if target.startswith("/") else posixpath.normpath(posixpath.join(folder, target)))
+    return targets
+
+
+def _content_types(zf):
+    """({extension: content type}, {partname: content type}) of a package"""
+    defaults, overrides = {}, {}
+    for item in etree.fromstring(zf.read("[Content_Types].xml")):
+        if item.get("Extension") is not None:
+            defaults[item.get("Extension").lower()] = item.get("ContentType")
+        else:
+            overrides[item.get("PartName")] = item.get("ContentType")
+    return defaults, overrides
+
+
+def _copy_member(src, dst, info):
+    """Copy a member from `src` into `dst` with its compression and attributes"""
+    copied = zipfile.ZipInfo(info.filename, info.date_time)
+    copied.compress_type = info.compress_type
+    copied.create_system = info.create_system
+    copied.external_attr = info.external_attr
+    dst.writestr(copied, src.read(info))
+
+
+class _PatchWriter(StreamingWriter):
+    """StreamingWriter for the new slides of an existing deck
+
+    New parts are numbered after the deck's own, and slides are linked to
+    the deck's layouts of the same name as the template's. A template layout
+    the deck lacks is written on first use and recorded in `added_layouts`
+    for linking to the deck's slide master, `master`.
+    """
+
+    def __init__(self, prs, file, src, master):
+        super().__init__(prs, file)
+        self.src = src
+        self.master = PackURI(f"/{master}")
+        self.added_layouts = []
+        for member in src.namelist():
+            match = _PARTNAME.match(f"/{member}")
+            if match:
+                prefix, index, ext = match.groups()
+                self._counters[(prefix, ext)] = max(self._counters.get((prefix, ext), 0), int(index or 0))
+        deck_layouts = {_cSld_name(src, m): PackURI(f"/{m}") for m in src.namelist() if _SLIDE_LAYOUT.match(m)}
+        self._template_layouts = {layout.part.partname: layout for layout in prs.slide_layouts}
+        self.layouts = {
+            layout.part.partname: deck_layouts[layout.name]
+            for layout in prs.slide_layouts if layout.name in deck_layouts
+        }
+
+    def _shared_partname(self, partname):
+        if partname in self.layouts:
+            return self.layouts[partname]
+        if partname in self._template_layouts:
+            # Written with its own pictures, and linked to the deck's master
+            captured = capture(self._template_layouts[partname].part, {id(self.prs.slide_master.part)})
+            layout = self._write_part(captured, self._next_partname("/ppt/slideLayouts/slideLayout.xml"), {})
+            self.layouts[partname] = layout
+            self.added_layouts.append(layout)
+            return layout
+        if partname == self.prs.slide_master.part.partname:
+            return self.master
+        if partname.membername in self.src.NameToInfo:
+            return partname
+        raise UpdateError(f"{self.src.filename}: has no {partname.membername} for the new slides")
+
+
+def _link_layouts(src, master, layouts):
+    """{member: XML} of a slide master and its relationships with `layouts` added to it"""
+    rels_member = PackURI(f"/{master}").rels_uri.membername
+    master_xml = parse_xml(src.read(master))
+    rels = parse_xml(src.read(rels_member))
+    # Layout ids are unique across the deck's masters and their layouts
+    ids = [int(item.get("id")) for item in
+           etree.fromstring(src.read("ppt/presentation.xml")).iterfind("p:sldMasterIdLst/p:sldMasterId", NS)]
+    ids += [int(item.get("id")) for member in src.namelist() if _SLIDE_MASTER.match(member)
+            for item in etree.fromstring(src.read(member)).iterfind("p:sldLayoutIdLst/p:sldLayoutId", NS)]
+    next_id = max(ids, default=2147483648) + 1
+    next_rId = max((_rid_order(rel.get("Id")) for rel in rels), default=0) + 1
+    sldLayoutIdLst = master_xml.find(qn("p:sldLayoutIdLst"))
+    for layout in layouts:
+        rId = f"rId{next_rId}"
+        rels.add_rel(rId, RT.SLIDE_LAYOUT, layout.relative_ref(PackURI(f"/{master}").baseURI), False)
+        etree.SubElement(sldLayoutIdLst, qn("p:sldLayoutId"), {"id": str(next_id), _R_ID: rId})
+        next_id += 1
+        next_rId += 1
+    return {master: serialize_part_xml(master_xml), rels_member: rels.xml_file_bytes}
+
+
+def _read_slides(src):
+    """Return the presentation, its relationships, [(sldId, member, tag)] in deck order and its first master"""
+    presentation = parse_xml(src.read("ppt/presentation.xml"))
+    prs_rels = parse_xml(src.read("ppt/_rels/presentation.xml.rels"))
+    targets = {}
+    for rel in prs_rels:
+        target = rel.get("Target")
+        targets[rel.get("Id")] = target[1:] if target.startswith("/") else posixpath.join("ppt", target)
+    slides = []
+    for sldId in presentation.get_or_add_sldIdLst().sldId_lst:
+        member = targets[sldId.get(_R_ID)]
+        slides.append((sldId, member, parse_tag(_cSld_name(src, member))))
+    master = targets[presentation.find(qn("p:sldMasterIdLst"))[0].get(_R_ID)]
+    return presentation, prs_rels, slides, master
+
+
+def _slide_title(zf, member):
+    """Title of a slide: its title placeholder's text, else the first text on it"""
+    first = ""
+    for sp in etree.fromstring(zf.read(member)).iterfind("p:cSld/p:spTree//p:sp", NS):
+        paragraph = sp.find("p:txBody/a:p", NS)
+        runs = paragraph.iter(qn("a:t")) if paragraph is not None else ()
+        text = " ".join("".join(t.text or "" for t in runs).split())
+        ph = sp.find("p:nvSpPr/p:nvPr/p:ph", NS)
+        if ph is not None and ph.get("type") in ("title", "ctrTitle"):
+            return text
+        first = first or text
+    return first
+
+
+def _adopt(src, spec, old):
+    """Tag the slides of a deck built without tags with the entries they came from
+
+    A slide goes to the next entry with its title (or its title and a page
+    number), to the entry before it as a further page, or, when no later
+    entry has its title, to the next entry if that entry has no title of
+    its own. Adopted slides get no key, so their entries are built again.
+    Slides matching no entry count as added by hand.
+    """
+    titles = []
+    for slide_spec in spec["slides"]:
+        title = slide_spec.get("title")
+        titles.append(" ".join(title.split()) or None if isinstance(title, str) else None)
+
+    def matches(index, title):
+        expected = titles[index]
+        return expected is not None and (title == expected or title.startswith(f"{expected} ("))
+
+    adopted, following, page = [], 0, 0
+    for sldId, member, _ in old:
+        title = _slide_title(src, member)
+        if following < len(titles) and matches(following, title):
+            index, page = following, 0
+        elif following and matches(following - 1, title):
+            index, page = following - 1, page + 1
+        else:
+            index = next((i for i in range(following, len(titles)) if matches(i, title)), None)
+            if index is None and following < len(titles) and titles[following] is None:
+                index = following
+            page = 0
+        if index is None:
+            adopted.append((sldId, member, None))
+            continue
+        following = index + 1
+        adopted.append((sldId, member, (entry_id(spec["slides"][index], index), page, None)))
+    return adopted
+
+
+def _plan(engine, spec, entries, keys, old, cache):
+    """Decide, entry by entry, which old slides to keep and which slides to build
+
+    Returns (order, presentation the new slides were built in). `order` lists
+    ("keep", sldId, member, new tag or None) and ("new", captured slide).
+    """
+    # Generated slides by (entry, key); slides added by hand in runs, each
+    # with the slots of the generated slides before it, nearest first
+    generated, manual, before = {}, [], []
+    for sldId, member, tag in old:
+        if tag is None:
+            if manual and manual[-1][0] == before:
+                manual[-1][1].append(("keep", sldId, member, None))
+            else:
+                manual.append((before, [("keep", sldId, member, None)]))
+            continue
+        slot = (tag[0], tag[2])
+        generated.setdefault(slot, []).append((tag[1], sldId, member))
+        if not before or before[0] != slot:
+            before = [slot] + before
+    stale = []
+    for slot, pages in list(generated.items()):
+        pages.sort(key=lambda page: page[0])
+        if slot[1] is None or [page for page, _, _ in pages] != list(range(len(pages))):
+            del generated[slot]
+            stale.append(slot)
+
+    # An entry keeps the slides of its own id and key. Failing that, it takes
+    # the unclaimed slides of another id with its key, as when entries
+    # before it were added or removed. Otherwise it is built.
+    slots = [(entry, key[:TAG_KEY_LENGTH]) for entry, key in zip(entries, keys)]
+    unclaimed = set(generated) - set(slots)
+    prs = engine.new_presentation()
+    shared = template_parts(prs)
+    placed, entry_slides = {}, []
+    for index, (slide_spec, entry, key, slot) in enumerate(zip(spec["slides"], entries, keys, slots)):
+        if slot not in generated:
+            slot = next((s for s in unclaimed if s[1] == slot[1]), None)
+            unclaimed.discard(slot)
+        if slot is not None:
+            pages = generated.pop(slot)
+            placed[slot] = index
+            entry_slides.append([
+                ("keep", sldId, member, slide_tag(entry, page, key) if slot[0] != entry else None)
+                for page, sldId, member in pages
+            ])
+            continue
+        slides = engine.add_slide(prs, slide_spec, cache, key, entry)
+        entry_slides.append([("new", capture(slide.part, shared)) for slide in slides])
+        for slide in slides:
+            drop_slide(prs, slide)
+    # Slides of a changed entry were replaced by its new ones
+    for slot in [*generated, *stale]:
+        if slot[0] in entries:
+            placed[slot] = entries.index(slot[0])
+
+    # Slides added by hand follow the nearest generated slide still in the deck
+    after = {}
+    for before, slides in manual:
+        index = next((placed[slot] for slot in before if slot in placed), -1)
+        after.setdefault(index, []).extend(slides)
+    order = list(after.get(-1, []))
+    for index, slides in enumerate(entry_slides):
+        order += slides + after.get(index, [])
+    return order, prs
+
+
+def update_deck(engine, spec, path, cache):
+    """Patch the deck at `path` to match `spec`
+
+    Returns {"rebuilt", "kept", "added_by_hand", "removed"} slide counts.
+    """
+    entries = [entry_id(slide_spec, index) for index, slide_spec in enumerate(spec["slides"])]
+    if len(set(entries)) < len(entries):
+        raise SpecError(f"{path}: slide ids must be unique within a spec")
+    keys = [cache.key(slide_spec) for slide_spec in spec["slides"]]
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with zipfile.ZipFile(path) as src:
+        presentation, prs_rels, old, master = _read_slides(src)
+        if old and not any(tag for _, _, tag in old):
+            old = _adopt(src, spec, old)
+        order, prs = _plan(engine, spec, entries, keys, old, cache)
+        kept = {item[2]: item[3] for item in order if item[0] == "keep"}
+
+        # Old parts still reachable from the package root once the dropped slides are gone
+        dropped = {member for _, member, _ in old} - set(kept)
+        reachable, stack = set(), [""]
+        while stack:
+            member = stack.pop()
+            if member not in reachable and member not in dropped:
+                reachable.add(member)
+                stack += _rel_targets(src, member)
+
+        writer = _PatchWriter(prs, tmp_path, src, master)
+        try:
+            slide_ids = []
+            for item in order:
+                if item[0] == "new":
+                    writer.add_captured(item[1])
+                    slide_ids.append((None, writer.slides[-1]))
+                else:
+                    slide_ids.append((item[1], item[2]))
+
+            linked = _link_layouts(src, master, writer.added_layouts) if writer.added_layouts else {}
+            defaults, overrides = _content_types(src)
+            parts = list(writer._written)
+            for info in src.infolist():
+                name = info.filename
+                part = _source_part(name) if name.endswith(".rels") else name
+                if name in _PACKAGE_MEMBERS or part not in reachable:
+                    continue
+                if name in linked:
+                    write_member(writer.zip, name, linked[name])
+                elif kept.get(name):
+                    write_member(writer.zip, name, _retag(src.read(name), kept[name]))
+                else:
+                    _copy_member(src, writer.zip, info)
+                if part == name:
+                    partname = PackURI(f"/{name}")
+                    parts.append(_WrittenPart(partname, overrides.get(partname) or defaults[partname.ext.lower()]))
+
+            # The slide list and the presentation's relationships, in the new order
+            sldIdLst = presentation.get_or_add_sldIdLst()
+            for sldId in sldIdLst.sldId_lst:
+                sldIdLst.remove(sldId)
+            kept_rIds = {sldId.get(_R_ID) for sldId, _ in slide_ids if sldId is not None}
+            for rel in list(prs_rels):
+                if rel.get("Type") == RT.SLIDE and rel.get("Id") not in kept_rIds:
+                    prs_rels.remove(rel)
+            next_id = max([FIRST_SLIDE_ID - 1] + [int(sldId.get("id")) for sldId, _, _ in old]) + 1
+            next_rId = max((_rid_order(rel.get("Id")) for rel in prs_rels), default=0) + 1
+            for sldId, partname in slide_ids:
+                if sldId is None:
+                    rId = f"rId{next_rId}"
+                    prs_rels.add_rel(rId, RT.SLIDE, partname.relative_ref("/ppt"), False)
+                    sldIdLst._add_sldId(id=next_id, rId=rId)
+                    next_id += 1
+                    next_rId += 1
+                else:
+                    sldIdLst.append(sldId)
+            write_member(writer.zip, "ppt/presentation.xml", serialize_part_xml(presentation))
+            write_member(writer.zip, "ppt/_rels/presentation.xml.rels", prs_rels.xml_file_bytes)
+            parts.append(_WrittenPart(PackURI("/ppt/presentation.xml"), overrides["/ppt/presentation.xml"]))
+            write_member(writer.zip, "[Content_Types].xml", serialize_part_xml(_ContentTypesItem.xml_for(parts)))
+            writer.zip.close()
+        except BaseException:
+            writer.zip.close()
+            os.remove(tmp_path)
+            raise
+    os.replace(tmp_path, path)
+
+    rebuilt = sum(1 for item in order if item[0] == "new")
+    added_by_hand = sum(1 for _, _, tag in old if tag is None)
+    return {"rebuilt": rebuilt, "kept": len(kept) - added_by_hand, "added_by_hand": added_by_hand,
+            "removed": len(dropped)}
+
+
+def update_decks(engine, spec, output_path=None, cache=None, locales=None):
+    """Update each deck a spec builds (one per locale when it has locales)
+
+    Decks that do not exist yet are built in full. Returns [(output path,
+    update summary)], with no summary for decks built in full or already up
+    to date.
+    """
+    from .locales import check_locales, locale_output, localize_slide
+
+    output_path = output_path or spec.get("output")
+    if not output_path:
+        raise SpecError("No output path given for deck")
+    decks = [(spec, output_path)]
+    locales = locales or spec.get("locales")
+    if locales:
+        check_locales(locales)
+        decks = [
+            ({"slides": [localize_slide(slide_spec, locale) for slide_spec in spec["slides"]]},
+             locale_output(output_path, locale))
+            for locale in locales
+        ]
+
+    results = []
+    for deck_spec, path in decks:
+        _, deck_key, current = engine.deck_keys(deck_spec, path, cache)
+        if current:
+            results.append((path, None))
+            continue
+        if not os.path.exists(path):
+            results.append((engine.compile(deck_spec, path, cache), None))
+            continue
+        results.append((path, update_deck(engine, deck_spec, path, cache)))
+        cache.mark_deck(path, deck_key)
+    return results
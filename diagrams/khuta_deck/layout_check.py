@@ -0,0 +1,298 @@
+"""
+Khuta App - Layout Check
+Finds colliding shapes, shapes off the slide and overflowing text in built decks
+
+Slides are read straight from the .pptx zip, as the thumbnail renderer does.
+Each shape's bounds (placeholders take theirs from the layout, grouped shapes
+are mapped through the group) go into a sweep over x: shapes enter a sorted
+index of the boxes still open at that x as their left edge is reached and
+leave it through a heap once their right edge is passed. The index is a
+segment tree over y, so each box is compared only with the open boxes it
+actually crosses and a slide costs O(n log n) plus one step per overlap.
+A shape lying fully inside another is layering, like text on a card, and is
+not reported; only partial overlaps are. Connectors are checked against the
+slide edges but not for collisions, since they are meant to touch shapes.
+
+Text is measured with the same NotoSansArabic metrics the builders fit text
+with, so the check flags what the builders could not fit as well as edits
+made by hand. Boxes set to shrink text on overflow are not measured, and boxes
+that grow with their text are only checked for lines too wide to fit.
+"""
+
+import heapq
+import math
+import zipfile
+from bisect import bisect_left, bisect_right, insort
+from collections import namedtuple
+
+from lxml import etree
+
+from .ooxml_geometry import (
+    BODY_INSETS, EMU_PER_INCH, EMU_PER_PT, NS, R_ID, group_transform, layout_placeholders, ph_key, qn, read_rels,
+)
+from .text_layout import LINE_SPACING, default_metrics
+
+# Text taller or wider than its box by less than this is not reported (points)
+OVERFLOW_TOLERANCE_PT = 1.0
+
+# Font size PowerPoint uses when neither the run nor the styles set one (points)
+DEFAULT_FONT_PT = 18
+
+Issue = namedtuple("Issue", "slide kind shapes detail")
+
+# name, bounds (left, top, right, bottom) in EMU, whether it takes part in collisions, the p:sp or None
+Box = namedtuple("Box", "name bounds solid sp")
+
+
+_SP, _CXN_SP, _PIC, _GRAPHIC_FRAME, _GRP_SP = (qn(f"p:{name}") for name in ("sp", "cxnSp", "pic", "graphicFrame", "grpSp"))
+_T, _R, _BR, _FLD = (qn(f"a:{name}") for name in ("t", "r", "br", "fld"))
+
+
+def _inches(emu):
+    return f"{emu / EMU_PER_INCH:.2f} in"
+
+
+# Finding overlaps
+
+class _OpenSpans:
+    """The [top, bottom) spans of the open boxes, for finding those that cross a new box
+
+    A segment tree over the slide's y coordinates holds each span in at most
+    two nodes per level, so the spans containing a point are read off one
+    root-to-leaf path. A list sorted by top edge gives the spans starting
+    inside a range. Adding and removing a span cost O(log n), and a query
+    O(log n) plus one step per span it returns.
+    """
+
+    def __init__(self, coords):
+        self.coords = coords
+        self.size = 1
+        while self.size < len(coords):
+            self.size *= 2
+        self.nodes = [set() for _ in range(2 * self.size)]
+        self.tops = []  # (top, i), sorted
+
+    def _cover(self, top, bottom):
+        # Canonical nodes of the leaves [index(top), index(bottom))
+        lo, hi = bisect_left(self.coords, top) + self.size, bisect_left(self.coords, bottom) + self.size
+        while lo < hi:
+            if lo & 1:
+                yield lo
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                yield hi
+            lo, hi = lo // 2, hi // 2
+
+    def add(self, i, top, bottom):
+        for node in self._cover(top, bottom):
+            self.nodes[node].add(i)
+        insort(self.tops, (top, i))
+
+    def remove(self, i, top, bottom):
+        for node in self._cover(top, bottom):
+            self.nodes[node].discard(i)
+        del self.tops[bisect_left(self.tops, (top, i))]
+
+    def crossing(self, top, bottom):
+        """Indexes of the spans whose interiors meet (top, bottom)"""
+        # Spans containing `top`, then those starting strictly inside the range
+        node = bisect_left(self.coords, top) + self.size
+        while node:
+            yield from self.nodes[node]
+            node //= 2
+        lo = bisect_right(self.tops, (top, math.inf))
+        for _, i in self.tops[lo:bisect_left(self.tops, (bottom, -1), lo)]:
+            yield i
+
+
+def overlapping_pairs(bounds):
+    """Index pairs (i, j) of (left, top, right, bottom) boxes whose interiors intersect
+
+    Boxes that only touch along an edge, and boxes with no area, do not overlap.
+    """
+    order = sorted((i for i, b in enumerate(bounds) if b[0] < b[2] and b[1] < b[3]), key=lambda i: bounds[i][0])
+    spans = _OpenSpans(sorted({y for i in order for y in (bounds[i][1], bounds[i][3])}))
+    closing = []  # (right, i) of the open boxes
+    pairs = []
+    for i in order:
+        left, top, right, bottom = bounds[i]
+        while closing and closing[0][0] <= left:
+            _, j = heapq.heappop(closing)
+            spans.remove(j, bounds[j][1], bounds[j][3])
+        pairs += ((j, i) for j in spans.crossing(top, bottom))
+        heapq.heappush(closing, (right, i))
+        spans.add(i, top, bottom)
+    return pairs
+
+
+def _contains(outer, inner):
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and outer[2] >= inner[2] and outer[3] >= inner[3]
+
+
+# Reading shape geometry
+
+def _bounds(xfrm, transform):
+    off, ext = xfrm.find("a:off", NS), xfrm.find("a:ext", NS)
+    if off is None or ext is None:
+        return None
+    ox, oy, sx, sy = transform
+    left, top = ox + int(off.get("x")) * sx, oy + int(off.get("y")) * sy
+    return (round(left), round(top), round(left + int(ext.get("cx")) * sx), round(top + int(ext.get("cy")) * sy))
+
+
+def shape_boxes(sp_tree, layout_ph, transform=(0, 0, 1, 1)):
+    """Box of every drawn shape under `sp_tree`, in document order"""
+    boxes = []
+    for el in sp_tree:
+        if el.tag == _GRP_SP:
+            boxes += shape_boxes(el, layout_ph, group_transform(el, transform))
+            continue
+        if el.tag == _GRAPHIC_FRAME:
+            xfrm = el.find("p:xfrm", NS)
+        elif el.tag in (_SP, _CXN_SP, _PIC):
+            xfrm = el.find("*/a:xfrm", NS)
+        else:
+            continue
+        ph = el.find("*/p:nvPr/p:ph", NS)
+        if xfrm is None and ph is not None and ph_key(ph) in layout_ph:
+            xfrm = layout_ph[ph_key(ph)].find("p:spPr/a:xfrm", NS)
+        bounds = _bounds(xfrm, transform) if xfrm is not None else None
+        if bounds is None:
+            continue
+        c_nv_pr = el.find("*/p:cNvPr", NS)
+        name = c_nv_pr.get("name") if c_nv_pr is not None else el.tag.rsplit("}", 1)[-1]
+        boxes.append(Box(name, bounds, el.tag != _CXN_SP, el if el.tag == _SP else None))
+    return boxes
+
+
+# Measuring text
+
+def _list_size(tx_body):
+    """Level-one font size (points) from a txBody's list style, or None"""
+    if tx_body is None:
+        return None
+    def_rpr = tx_body.find("a:lstStyle/a:lvl1pPr/a:defRPr", NS)
+    if def_rpr is not None and def_rpr.get("sz"):
+        return int(def_rpr.get("sz")) / 100
+    return None
+
+
+def _paragraph_size(p):
+    """Font size (points) of a paragraph's first run, else of its defaults, or None"""
+    for path in ("a:r/a:rPr", "a:pPr/a:defRPr"):
+        r_pr = p.find(path, NS)
+        if r_pr is not None and r_pr.get("sz"):
+            return int(r_pr.get("sz")) / 100
+    return None
+
+
+def text_overflow(sp, bounds, inherited=None, metrics=None):
+    """Points by which a shape's text runs past its box, as (down, across), or None if it fits"""
+    tx_body = sp.find("p:txBody", NS)
+    if tx_body is None or not any(t.text and t.text.strip() for t in tx_body.iter(_T)):
+        return None
+    inherited_body = inherited.find("p:txBody", NS) if inherited is not None else None
+    body_pr = tx_body.find("a:bodyPr", NS)
+    inherited_pr = inherited_body.find("a:bodyPr", NS) if inherited_body is not None else None
+    body_prs = [pr for pr in (body_pr, inherited_pr) if pr is not None]
+    grows = False
+    for pr in body_prs:
+        # The nearest body setting an autofit mode decides it
+        autofit = pr.find("a:normAutofit", NS), pr.find("a:noAutofit", NS), pr.find("a:spAutoFit", NS)
+        if any(el is not None for el in autofit):
+            if autofit[0] is not None:
+                return None
+            grows = autofit[2] is not None
+            break
+
+    def body_attr(name, default):
+        for pr in body_prs:
+            if pr.get(name) is not None:
+                return pr.get(name)
+        return default
+
+    insets = {name: int(body_attr(name, default)) for name, default in BODY_INSETS.items()}
+    width_pt = (bounds[2] - bounds[0] - insets["lIns"] - insets["rIns"]) / EMU_PER_PT
+    height_pt = (bounds[3] - bounds[1] - insets["tIns"] - insets["bIns"]) / EMU_PER_PT
+    wrap = body_attr("wrap", "square") != "none"
+    default_size = _list_size(tx_body) or _list_size(inherited_body) or DEFAULT_FONT_PT
+
+    metrics = metrics or default_metrics()
+    height = widest = 0.0
+    for p in tx_body.iterfind("a:p", NS):
+        size = _paragraph_size(p) or default_size
+        text = "".join("\n" if el.tag == _BR else el.findtext("a:t", "", NS) for el in p if el.tag in (_R, _BR, _FLD))
+        if wrap:
+            lines = metrics.count_lines(text, max(width_pt, 1.0), size)
+        else:
+            lines = text.count("\n") + 1
+            widest = max([widest] + [metrics.width(line, size) for line in text.split("\n")])
+        space_after = p.find("a:pPr/a:spcAft/a:spcPts", NS)
+        height += lines * size * LINE_SPACING
+        height += int(space_after.get("val")) / 100 if space_after is not None else 0
+    # Boxes that resize to their text only run out sideways
+    down, across = (0.0 if grows else height - height_pt), widest - width_pt
+    if down > OVERFLOW_TOLERANCE_PT or across > OVERFLOW_TOLERANCE_PT:
+        return max(down, 0.0), max(across, 0.0)
+    return None
+
+
+# Checking slides
+
+def check_slide(slide_xml, layout_ph, size, number, metrics=None):
+    """Layout issues of one slide, given its XML, its layout's placeholders and the slide size (EMU)"""
+    sp_tree = etree.fromstring(slide_xml).find("p:cSld/p:spTree", NS)
+    boxes = shape_boxes(sp_tree, layout_ph)
+    issues = []
+    width, height = size
+    for box in boxes:
+        left, top, right, bottom = box.bounds
+        if left < 0 or top < 0 or right > width or bottom > height:
+            issues.append(Issue(number, "off-slide", (box.name,),
+                                f"spans {_inches(left)}, {_inches(top)} to {_inches(right)}, {_inches(bottom)}"))
+        if box.sp is not None:
+            ph = box.sp.find("p:nvSpPr/p:nvPr/p:ph", NS)
+            inherited = layout_ph.get(ph_key(ph)) if ph is not None else None
+            overflow = text_overflow(box.sp, box.bounds, inherited, metrics)
+            if overflow is not None:
+                down, across = overflow
+                detail = " and ".join(f"{amount / 72:.2f} in too {word}"
+                                      for amount, word in ((down, "tall"), (across, "wide")) if amount)
+                issues.append(Issue(number, "text-overflow", (box.name,), f"text is {detail}"))
+
+    solid = [box for box in boxes if box.solid]
+    for i, j in overlapping_pairs([box.bounds for box in solid]):
+        a, b = solid[i].bounds, solid[j].bounds
+        if _contains(a, b) or _contains(b, a):
+            continue
+        overlap = (min(a[2], b[2]) - max(a[0], b[0]), min(a[3], b[3]) - max(a[1], b[1]))
+        issues.append(Issue(number, "overlap", (solid[i].name, solid[j].name),
+                            f"overlap by {_inches(overlap[0])} x {_inches(overlap[1])}"))
+    return issues
+
+
+def check_deck(path, metrics=None):
+    """Layout issues of every slide of a .pptx file, in slide order"""
+    metrics = metrics or default_metrics()
+    issues = []
+    with zipfile.ZipFile(path) as zf:
+        presentation = etree.fromstring(zf.read("ppt/presentation.xml"))
+        sld_sz = presentation.find("p:sldSz", NS)
+        size = (int(sld_sz.get("cx")), int(sld_sz.get("cy")))
+        prs_rels = read_rels(zf, "ppt/presentation.xml")
+        layouts = {}
+        for number, sld_id in enumerate(presentation.iterfind("p:sldIdLst/p:sldId", NS), 1):
+            slide_name = prs_rels[sld_id.get(R_ID)][1]
+            layout_ph = {}
+            for reltype, target in read_rels(zf, slide_name).values():
+                if reltype == "slideLayout":
+                    if target not in layouts:
+                        layouts[target] = layout_placeholders(etree.fromstring(zf.read(target)))
+                    layout_ph = layouts[target]
+            issues += check_slide(zf.read(slide_name), layout_ph, size, number, metrics)
+    return issues
+
+
+def format_issue(issue):
+    return f"slide {issue.slide}: {issue.kind}: {' / '.join(issue.shapes)}: {issue.detail}"
@@ -0,0 +1,218 @@
+"""
+Khuta App - Locales
+Builds English-only and Arabic-only decks from one spec in a single pass
+
+Spec text can be given per locale, as {"en": ..., "ar": ...}, or as a key
+into the app's assets/translations catalogs, as {"tr": "parent_assessment"}.
+Plain strings are used as they are. Arabic slides are laid out right to left.
+Without a locale both languages are kept, so bilingual decks still build
+from the same spec.
+
+All locales are built together: each spec entry is localized and added to
+every locale's deck before moving on, on copies of one prepared template,
+and pictures are prepared once by the media pipeline for all of them.
+"""
+
+import inspect
+import json
+import os
+import time
+
+from .app_data import TRANSLATIONS
+from .deck_engine import SpecError
+
+LOCALES = tuple(TRANSLATIONS)
+RTL_LOCALES = ("ar",)
+
+
+class TranslationIndex:
+    """Key -> {locale: text} index over the app's translation catalogs
+
+    Each catalog is read once; nested catalogs are flattened to dotted keys,
+    as easy_localization does.
+    """
+
+    def __init__(self, paths=TRANSLATIONS):
+        self.paths = paths
+        self._index = None
+
+    def _load(self):
+        index = {}
+        for locale, path in self.paths.items():
+            with open(path, encoding="utf-8") as f:
+                for key, text in _flatten(json.load(f)):
+                    index.setdefault(key, {})[locale] = text.strip()
+        return index
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = self._load()
+        return self._index
+
+    def reload(self):
+        """Forget the loaded catalogs so the next lookup reads them again"""
+        self._index = None
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def get(self, key, locale=None):
+        """Text of `key` in `locale`, English when missing; both joined when `locale` is None"""
+        texts = self.index.get(key)
+        if texts is None:
+            raise SpecError(f"Unknown translation key: {key!r}")
+        if locale is None:
+            return " - ".join(dict.fromkeys(texts[l] for l in LOCALES if l in texts))
+        return texts.get(locale) or texts.get("en") or key
+
+
+def _flatten(catalog, prefix=""):
+    for key, value in catalog.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}.")
+        else:
+            yield f"{prefix}{key}", str(value)
+
+
+_default_index = None
+
+
+def default_index():
+    """Translation index shared by the builders, loaded once per process"""
+    global _default_index
+    if _default_index is None:
+        _default_index = TranslationIndex()
+    return _default_index
+
+
+def translate(key, locale=None):
+    """Look up a translation key for `locale` (both languages when None)"""
+    return default_index().get(key, locale)
+
+
+def localize(value, locale=None):
+    """Resolve the per-locale texts and translation keys in a spec value"""
+    if isinstance(value, list):
+        return [localize(v, locale) for v in value]
+    if not isinstance(value, dict):
+        return value
+    if set(value) == {"tr"}:
+        return translate(value["tr"], locale)
+    if value and set(value) <= set(LOCALES):
+        if locale is not None:
+            return value.get(locale, value.get("en", ""))
+        return " - ".join(dict.fromkeys(value[l] for l in LOCALES if l in value))
+    return {k: localize(v, locale) for k, v in value.items()}
+
+
+_builder_params = {}
+
+
+def _accepts(slide_type):
+    """Names of the keyword arguments a slide type's builder takes"""
+    if slide_type not in _builder_params:
+        from .slide_builders import BUILDERS
+
+        builder = BUILDERS.get(slide_type)
+        _builder_params[slide_type] = set(inspect.signature(builder).parameters) if builder else set()
+    return _builder_params[slide_type]
+
+
+def localize_slide(slide_spec, locale):
+    """Return a slide spec with its texts in `locale` and the matching direction
+
+    Builders that take `locale` or `rtl` get them unless the spec sets them.
+    """
+    localized = localize(slide_spec, locale)
+    params = _accepts(localized.get("type"))
+    if locale is not None and "locale" in params:
+        localized.setdefault("locale", locale)
+    if locale in RTL_LOCALES and "rtl" in params:
+        localized.setdefault("rtl", True)
+    return localized
+
+
+def check_locales(locales):
+    for locale in locales:
+        if locale not in LOCALES:
+            raise SpecError(f"Unknown locale {locale!r}, expected one of {', '.join(LOCALES)}")
+
+
+def locale_output(output_path, locale):
+    """Output path of one locale: "{locale}" in the path is replaced, or a suffix added"""
+    if "{locale}" in output_path:
+        return output_path.replace("{locale}", locale)
+    root, ext = os.path.splitext(output_path)
+    return f"{root}_{locale}{ext}"
+
+
+def compile_locales(engine, spec, locales=None, output_path=None, cache=None, profiler=None, stream=False,
+                    store=None):
+    """Build one deck per locale in a single pass over the spec, returning the output paths
+
+    Up-to-date and archived decks are skipped as in DeckEngine.compile.
+    """
+    locales = locales or spec.get("locales") or LOCALES
+    check_locales(locales)
+    output_path = output_path or spec.get("output")
+    if not output_path:
+        raise SpecError("No output path given for deck")
+
+    decks = []
+    for locale in locales:
+        localized = {"slides": [localize_slide(slide_spec, locale) for slide_spec in spec["slides"]]}
+        path = locale_output(output_path, locale)
+        keys, deck_key, current = engine.deck_keys(localized, path, cache)
+        if current or engine.checkout(store, deck_key, path, cache):
+            continue
+        decks.append({"path": path, "spec": localized, "keys": keys, "deck_key": deck_key})
+
+    for deck in decks:
+        if profiler is not None:
+            profiler.begin_deck(deck["path"])
+        deck["prs"] = prs = engine.new_presentation(profiler)
+        deck["slides"] = engine.iter_slides(prs, deck["spec"], cache, deck["keys"], profiler)
+        if stream:
+            from .streaming import StreamingWriter
+
+            deck["tmp"] = f"{deck['path']}.{os.getpid()}.tmp"
+            deck["writer"] = StreamingWriter(prs, deck["tmp"])
+
+    # Advance every deck one spec entry at a time
+    try:
+        for _ in spec["slides"]:
+            for deck in decks:
+                if profiler is not None:
+                    profiler.begin_deck(deck["path"])
+                slides = next(deck["slides"])
+                if stream:
+                    for slide in slides:
+                        deck["writer"].add(slide)
+    except BaseException:
+        for deck in decks:
+            if stream:
+                deck["writer"].zip.close()
+                os.remove(deck["tmp"])
+        raise
+
+    for deck in decks:
+        if profiler is not None:
+            profiler.begin_deck(deck["path"])
+        if stream:
+            deck["writer"].close()
+            os.replace(deck["tmp"], deck["path"])
+            seconds = deck["writer"].write_seconds
+        else:
+            from .reproducible import save_presentation
+
+            start = time.perf_counter()
+            save_presentation(deck["prs"], deck["path"])
+            seconds = time.perf_counter() - start
+        if profiler is not None:
+            profiler.record_save(seconds, os.path.getsize(deck["path"]))
+        if cache is not None:
+            cache.mark_deck(deck["path"], deck["deck_key"])
+        if store is not None:
+            store.put_deck(deck["path"], deck["deck_key"])
+    return [locale_output(output_path, locale) for locale in locales]
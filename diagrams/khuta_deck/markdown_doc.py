@@ -0,0 +1,141 @@
+"""
+Khuta App - Markdown Documents
+Parses the diagrams/*.md files into sections of lists, text, tables and Mermaid blocks
+
+Only the Markdown those files use is understood: ATX headings, bullet and
+numbered lists, pipe tables, plain text lines and fenced code blocks, of
+which only ```mermaid blocks are kept. Inline markup (bold, code, links) is
+reduced to its text, and <br/> in table cells becomes a line break.
+
+A parsed document is plain JSON, cached on disk under the hash of the file's
+contents and of this module, and kept in memory for the rest of the process,
+so unchanged files are not parsed again by later builds or by the Mermaid
+slides and Markdown slides that read the same file.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+from . import BUILD_CACHE_DIR
+
+MARKDOWN_CACHE_DIR = os.path.join(BUILD_CACHE_DIR, "markdown")
+
+# Cached documents are invalidated whenever this module changes
+with open(__file__, "rb") as _f:
+    PARSER_VERSION = hashlib.sha256(_f.read()).hexdigest()[:16]
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_LIST_ITEM = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+(.*)$")
+_RULE = re.compile(r"^\s*([-*_])(?:\s*\1){2,}\s*$")
+_TABLE_SEPARATOR = re.compile(r"^\s*\|?\s*:?-+:?\s*(?:\|\s*:?-+:?\s*)*\|?\s*$")
+
+_INLINE = (
+    (re.compile(r"!?\[([^\]]*)\]\([^)]*\)"), r"\1"),  # links and images keep their text
+    (re.compile(r"(\*\*|__)(.+?)\1"), r"\2"),
+    (re.compile(r"(?<![\w*])([*_])(?!\s)(.+?)(?<!\s)\1(?![\w*])"), r"\2"),
+    (re.compile(r"`([^`]*)`"), r"\1"),
+    (re.compile(r"<br\s*/?>", re.IGNORECASE), "\n"),
+)
+
+
+def inline_text(text):
+    """Text of a line with its inline markup removed"""
+    for pattern, replacement in _INLINE:
+        text = pattern.sub(replacement, text)
+    return text.strip()
+
+
+def _cells(line):
+    line = line.strip()
+    if line.startswith("|"):
+        line = line[1:]
+    if line.endswith("|") and not line.endswith("\\|"):
+        line = line[:-1]
+    return [inline_text(cell.replace("\\|", "|")) for cell in re.split(r"(?<!\\)\|", line)]
+
+
+def parse_markdown(text, title=""):
+    """Parse Markdown into {"sections": [{"level", "title", "blocks"}]}
+
+    Text before the first heading goes in a level-0 section named `title`.
+    Blocks are {"kind": "list" or "text", "items"}, {"kind": "table",
+    "headers", "rows"} and {"kind": "mermaid", "source"}.
+    """
+    section = {"level": 0, "title": title, "blocks": []}
+    sections = [section]
+    lines = text.splitlines(keepends=True)
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        stripped = line.strip()
+        i += 1
+        if stripped.startswith(("```", "~~~")):
+            fence, source = stripped[:3], []
+            while i < len(lines) and not lines[i].strip().startswith(fence):
+                source.append(lines[i])
+                i += 1
+            i += 1
+            if stripped[3:].strip().lower() == "mermaid":
+                section["blocks"].append({"kind": "mermaid", "source": "".join(source)})
+            continue
+
+        heading = _HEADING.match(stripped)
+        if heading:
+            section = {"level": len(heading.group(1)), "title": inline_text(heading.group(2)), "blocks": []}
+            sections.append(section)
+            continue
+
+        if not stripped or _RULE.match(stripped):
+            continue
+
+        if stripped.startswith("|") and i < len(lines) and _TABLE_SEPARATOR.match(lines[i]):
+            headers = _cells(stripped)
+            rows = []
+            i += 1
+            while i < len(lines) and lines[i].strip().startswith("|"):
+                row = _cells(lines[i])
+                rows.append((row + [""] * len(headers))[:len(headers)])
+                i += 1
+            section["blocks"].append({"kind": "table", "headers": headers, "rows": rows})
+            continue
+
+        item = _LIST_ITEM.match(line)
+        kind, text_line = ("list", item.group(1)) if item else ("text", stripped.lstrip("> "))
+        blocks = section["blocks"]
+        if not blocks or blocks[-1]["kind"] != kind:
+            blocks.append({"kind": kind, "items": []})
+        blocks[-1]["items"].append(inline_text(text_line))
+    return {"sections": sections}
+
+
+# Documents parsed in this process, by content key
+_documents = {}
+
+
+def load_markdown(path, cache_dir=MARKDOWN_CACHE_DIR):
+    """Parsed document of a Markdown file, from memory or the on-disk cache when the file is unchanged"""
+    with open(path, "rb") as f:
+        data = f.read()
+    title = os.path.splitext(os.path.basename(path))[0]
+    digest = hashlib.sha256(f"{PARSER_VERSION}:{title}:".encode("utf-8") + data).hexdigest()
+    document = _documents.get(digest)
+    if document is not None:
+        return document
+
+    cache_path = os.path.join(cache_dir, f"{digest[:32]}.json") if cache_dir else None
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path, encoding="utf-8") as f:
+            document = json.load(f)
+    else:
+        document = parse_markdown(data.decode("utf-8"), title)
+        if cache_path:
+            os.makedirs(cache_dir, exist_ok=True)
+            # Write then rename, so concurrent builds never read a partial document
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(document, f, ensure_ascii=False)
+            os.replace(tmp_path, cache_path)
+    _documents[digest] = document
+    return document
@@ -0,0 +1,160 @@
+"""
+Khuta App - Media Pipeline
+Prepares images from assets/images before they are embedded in slides
+
+Each image is downsampled to the size it is displayed at, WebP (and other
+formats PowerPoint cannot show) is transcoded, and pictures that are the same
+under different names are collapsed onto one source by a perceptual hash, so
+they become a single media part in the deck. Prepared images are kept in an
+on-disk cache keyed by source content and target size.
+"""
+
+import hashlib
+import json
+import os
+
+from PIL import Image
+
+from . import BUILD_CACHE_DIR
+
+MEDIA_CACHE_DIR = os.path.join(BUILD_CACHE_DIR, "media")
+
+# Pixels per inch of displayed size
+DEFAULT_DPI = 150
+
+JPEG_QUALITY = 85
+
+# Maximum Hamming distance between dHashes for two pictures to be merged
+DUPLICATE_DISTANCE = 6
+
+
+def dhash(image):
+    """64-bit difference hash of an image"""
+    gray = image.convert("L").resize((9, 8), Image.LANCZOS)
+    pixels = gray.tobytes()
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (left < right)
+    return value
+
+
+class ImagePipeline:
+    """Resize, transcode, dedupe and cache images for embedding"""
+
+    def __init__(self, cache_dir=MEDIA_CACHE_DIR, dpi=DEFAULT_DPI):
+        self.cache_dir = cache_dir
+        self.dpi = dpi
+        self.hits = 0
+        self.misses = 0
+        self.duplicates = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._index_path = os.path.join(cache_dir, "index.json")
+        # content sha256 -> {"dhash", "size", "canonical", "path"}
+        self._index = self._load_index()
+        self._file_shas = {}
+
+    def _load_index(self):
+        try:
+            with open(self._index_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        tmp_path = f"{self._index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self._index_path)
+
+    def _content_sha(self, path):
+        stat = os.stat(path)
+        cached = self._file_shas.get(path)
+        if cached and cached[0] == (stat.st_mtime_ns, stat.st_size):
+            return cached[1]
+        with open(path, "rb") as f:
+            sha = hashlib.sha256(f.read()).hexdigest()
+        self._file_shas[path] = ((stat.st_mtime_ns, stat.st_size), sha)
+        return sha
+
+    def _canonical(self, sha, path):
+        """Return (canonical sha, source path) for an image, merging look-alikes"""
+        entry = self._index.get(sha)
+        if entry is None:
+            with Image.open(path) as image:
+                value = dhash(image)
+                size = image.size
+            canonical = sha
+            for other_sha, other in self._index.items():
+                if other["canonical"] == other_sha and bin(other["dhash"] ^ value).count("1") <= DUPLICATE_DISTANCE:
+                    canonical = other_sha
+                    break
+            entry = {"dhash": value, "size": size, "canonical": canonical, "path": path}
+            self._index[sha] = entry
+            self._save_index()
+        elif not os.path.exists(entry.get("path", "")):
+            entry["path"] = path
+            self._save_index()
+
+        canonical = entry["canonical"]
+        if canonical != sha:
+            self.duplicates += 1
+            source = self._index[canonical].get("path")
+            if source and os.path.exists(source):
+                return canonical, source
+        return sha, path
+
+    def target_pixels(self, width_in, height_in):
+        """Pixel box for an image displayed at the given size in inches"""
+        return max(1, round(width_in * self.dpi)), max(1, round(height_in * self.dpi))
+
+    def prepare(self, path, width_in, height_in):
+        """Return the path of a cached copy of `path` fitted to the display box"""
+        sha, source = self._canonical(self._content_sha(path), path)
+        box_w, box_h = self.target_pixels(width_in, height_in)
+
+        for ext in (".jpg", ".png"):
+            cached = os.path.join(self.cache_dir, f"{sha[:24]}_{box_w}x{box_h}{ext}")
+            if os.path.exists(cached):
+                self.hits += 1
+                return cached
+
+        self.misses += 1
+        with Image.open(source) as image:
+            image.thumbnail((box_w, box_h), Image.LANCZOS)
+            has_alpha = image.mode in ("RGBA", "LA") or "transparency" in image.info
+            ext = ".png" if has_alpha else ".jpg"
+            cached = os.path.join(self.cache_dir, f"{sha[:24]}_{box_w}x{box_h}{ext}")
+            # Write then rename, so concurrent builds never read a partial file
+            tmp_path = f"{cached}.{os.getpid()}.tmp"
+            if has_alpha:
+                image.convert("RGBA").save(tmp_path, "PNG", optimize=True)
+            else:
+                image.convert("RGB").save(tmp_path, "JPEG", quality=JPEG_QUALITY, optimize=True)
+        os.replace(tmp_path, cached)
+        return cached
+
+    def fitted_size(self, prepared_path, width_in, height_in):
+        """Displayed (width, height) in inches that keeps the image's aspect ratio"""
+        with Image.open(prepared_path) as image:
+            w, h = image.size
+        scale = min(width_in / w, height_in / h)
+        return w * scale, h * scale
+
+    def report(self):
+        """One-line summary of pipeline activity"""
+        return (f"Media cache: {self.hits} hits, {self.misses} misses, "
+                f"{self.duplicates} duplicates merged")
+
+
+_default_pipeline = None
+
+
+def default_pipeline():
+    """Shared pipeline used by the slide builders"""
+    global _default_pipeline
+    if _default_pipeline is None:
+        _default_pipeline = ImagePipeline()
+    return _default_pipeline
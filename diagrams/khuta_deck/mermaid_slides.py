@@ -0,0 +1,945 @@
+"""
+Khuta App - Mermaid Diagram Slides
+Parses the Mermaid subsets used in diagrams/*.md and draws them as native
+PowerPoint shapes and connectors
+
+Supported: flowchart/graph, stateDiagram-v2, classDiagram, erDiagram and
+sequenceDiagram. Graph-like diagrams go through a layered layout (rank by
+longest path, barycenter ordering) whose result is cached on disk by a hash of
+the diagram source; sequence diagrams are laid out directly from their message
+order.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+from pptx.enum.shapes import MSO_CONNECTOR, MSO_SHAPE
+from pptx.enum.dml import MSO_LINE
+from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
+from pptx.oxml.xmlchemy import OxmlElement
+from pptx.util import Inches, Pt
+
+from . import BUILD_CACHE_DIR
+from .deck_layouts import HEADER_LAYOUT, get_layout, set_title
+from .deck_theme import PRIMARY_BLUE, DARK_BLUE, LIGHT_GRAY, WHITE
+from .markdown_doc import load_markdown
+from .text_layout import LINE_SPACING, SAFETY, default_metrics
+
+LAYOUT_CACHE_DIR = os.path.join(BUILD_CACHE_DIR, "layouts")
+
+# Cached layouts are invalidated whenever this module changes
+with open(__file__, "rb") as _f:
+    LAYOUT_VERSION = hashlib.sha256(_f.read()).hexdigest()[:16]
+
+# Drawing area below the header band, in inches
+AREA_LEFT, AREA_TOP, AREA_WIDTH, AREA_HEIGHT = 0.4, 1.45, 12.533, 5.85
+
+# Nodes per rank before a rank is wrapped onto extra rows
+MAX_RANK_SIZE = {"TB": 7, "LR": 6}
+
+# Ranks per slide before a graph is split across slides
+MAX_RANKS_PER_SLIDE = {"TB": 8, "LR": 6}
+
+# Node text sizes (points), members of class and ER boxes set smaller
+MAX_NODE_FONT_PT, MIN_NODE_FONT_PT = 14, 7
+MEMBER_SCALE = 0.85
+
+# Text-frame margins of nodes and of edge labels on each side (inches)
+NODE_MARGIN = 0.03
+LABEL_MARGIN = 0.02
+
+# Edge labels are set at this fraction of the node text size, or smaller to fit between ranks
+LABEL_SCALE = 0.8
+
+# Sequence diagram messages per slide before continuing on a new slide
+MAX_MESSAGES_PER_SLIDE = 20
+
+# Edge labels wrap beyond this width (inches), and are tried at these fractions along the edge,
+# on the edge and then stepped off it by these multiples of their own size
+MAX_LABEL_WIDTH = 2.0
+_LABEL_STOPS = (0.5, 0.35, 0.65, 0.2, 0.8, 0.1, 0.9)
+_LABEL_OFFSETS = (0, 0.5, -0.5, 1, -1, 1.5, -1.5, 2, -2, 2.5, -2.5, 3, -3)
+
+_SHAPES = {
+    "rect": MSO_SHAPE.RECTANGLE,
+    "round": MSO_SHAPE.ROUNDED_RECTANGLE,
+    "stadium": MSO_SHAPE.ROUNDED_RECTANGLE,
+    "diamond": MSO_SHAPE.DIAMOND,
+    "hexagon": MSO_SHAPE.HEXAGON,
+    "cylinder": MSO_SHAPE.CAN,
+    "circle": MSO_SHAPE.OVAL,
+    "parallelogram": MSO_SHAPE.PARALLELOGRAM,
+    "flag": MSO_SHAPE.PENTAGON,
+    "start": MSO_SHAPE.OVAL,
+    "end": MSO_SHAPE.OVAL,
+}
+
+# Shapes whose connection sites 0-3 are top, left, bottom, right
+_GLUEABLE = {"rect", "round", "stadium", "diamond"}
+
+# Node text delimiters, longest opener first
+_NODE_DELIMITERS = [
+    ("(((", ")))", "circle"), ("((", "))", "circle"), ("([", "])", "stadium"),
+    ("[(", ")]", "cylinder"), ("[[", "]]", "rect"), ("[/", "/]", "parallelogram"),
+    ("[\\", "\\]", "parallelogram"), ("{{", "}}", "hexagon"), ("[", "]", "rect"),
+    ("(", ")", "round"), ("{", "}", "diamond"), (">", "]", "flag"),
+]
+
+_NODE_ID = re.compile(r"\w+(?:[.-]\w+)*")
+_FLOW_EDGE = re.compile(r"\s*(<?(?:-\.+-?|={2,}|-{2,})[>ox]?)(?:\|([^|]*)\|)?\s*")
+_FLOW_TEXT_EDGE = re.compile(r"(--|==|-\.)\s+([^->=.|][^|]*?)\s+(-->|==>|\.->|---)")
+_STATE_EDGE = re.compile(r"^(\[\*\]|[\w.]+)\s*-->\s*(\[\*\]|[\w.]+)\s*(?::\s*(.*))?$")
+_CLASS_EDGE = re.compile(
+    r'^([\w.]+)\s*(?:"([^"]*)")?\s*(<\|--|--\|>|<\|\.\.|\.\.\|>|\*--|--\*|o--|--o|<--|-->|<\.\.|\.\.>|--|\.\.)'
+    r'\s*(?:"([^"]*)")?\s*([\w.]+)\s*(?::\s*(.*))?$'
+)
+_ER_EDGE = re.compile(r"^([\w-]+)\s+([|}o]{2}(?:--|\.\.)[|{o]{2})\s+([\w-]+)\s*:\s*(.*)$")
+_SEQ_MESSAGE = re.compile(r"^(.+?)\s*(-->>|->>|--x|-x|--\)|-\)|-->|->)\s*[+-]?\s*(.+?)\s*:\s*(.*)$")
+_SEQ_NOTE = re.compile(r"^[Nn]ote\s+(?:over|left of|right of)\s+([^:]+):\s*(.*)$")
+
+
+# ==================== MARKDOWN ====================
+
+def extract_diagrams(md_path):
+    """Return [{"title", "source"}] for each mermaid block in a Markdown file"""
+    return [
+        {"title": section["title"], "source": block["source"]}
+        for section in load_markdown(md_path)["sections"]
+        for block in section["blocks"]
+        if block["kind"] == "mermaid"
+    ]
+
+
+def _clean_text(text):
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "\"'`":
+        text = text[1:-1]
+    text = re.sub(r"<br\s*/?>", "\n", text)
+    text = re.sub(r"~([^~]*)~", r"<\1>", text)
+    return text.replace("&quot;", '"').replace("&amp;", "&")
+
+
+# ==================== PARSING ====================
+
+def _new_graph(kind, direction="TB"):
+    return {"kind": kind, "direction": direction, "nodes": {}, "edges": [], "groups": []}
+
+
+def _add_node(graph, node_id, label=None, shape="rect", group=None):
+    node = graph["nodes"].get(node_id)
+    if node is None:
+        node = graph["nodes"][node_id] = {"label": node_id, "shape": shape, "lines": []}
+        if group is not None:
+            group["members"].append(node_id)
+    if label is not None:
+        node["label"] = label
+        node["shape"] = shape
+    return node
+
+
+def _read_node(text, pos):
+    """Read `id[label]` style node reference at `pos`; return (id, label, shape, end)"""
+    match = _NODE_ID.match(text, pos)
+    if not match:
+        return None
+    node_id, pos = match.group(), match.end()
+    for opener, closer, shape in _NODE_DELIMITERS:
+        if text.startswith(opener, pos):
+            end = text.find(closer, pos + len(opener))
+            if end == -1:
+                continue
+            label = _clean_text(text[pos + len(opener):end])
+            pos = end + len(closer)
+            break
+    else:
+        label, shape = None, "rect"
+    if text.startswith(":::", pos):
+        pos = re.compile(r":::[\w-]+").match(text, pos).end()
+    return node_id, label, shape, pos
+
+
+def _read_node_group(graph, text, pos, group):
+    """Read `A & B[label]` and return (ids, end)"""
+    ids = []
+    while True:
+        while pos < len(text) and text[pos] == " ":
+            pos += 1
+        node = _read_node(text, pos)
+        if node is None:
+            return ids, pos
+        node_id, label, shape, pos = node
+        _add_node(graph, node_id, label, shape, group)
+        ids.append(node_id)
+        amp = re.compile(r"\s*&\s*").match(text, pos)
+        if not amp:
+            return ids, pos
+        pos = amp.end()
+
+
+def _parse_flowchart(lines, header):
+    parts = header.split()
+    direction = parts[1] if len(parts) > 1 else "TB"
+    graph = _new_graph("flowchart", "LR" if direction in ("LR", "RL") else "TB")
+    stack = []
+    for line in lines:
+        if line.startswith("subgraph"):
+            rest = line[len("subgraph"):].strip()
+            match = re.match(r"^([\w-]+)\s*\[(.*)\]$", rest)
+            title = _clean_text(match.group(2) if match else rest)
+            group = {"title": title, "members": []}
+            graph["groups"].append(group)
+            stack.append(group)
+            continue
+        if line == "end":
+            if stack:
+                stack.pop()
+            continue
+        if re.match(r"^(style|classDef|class|click|linkStyle|direction)\b", line):
+            continue
+
+        group = stack[-1] if stack else None
+        line = _FLOW_TEXT_EDGE.sub(lambda m: f"{m.group(3)}|{m.group(2)}|", line)
+        sources, pos = _read_node_group(graph, line, 0, group)
+        while sources and pos < len(line):
+            edge = _FLOW_EDGE.match(line, pos)
+            if not edge:
+                break
+            op, label = edge.group(1), edge.group(2)
+            targets, pos = _read_node_group(graph, line, edge.end(), group)
+            if not targets:
+                break
+            for src in sources:
+                for dst in targets:
+                    graph["edges"].append({
+                        "src": src, "dst": dst,
+                        "label": _clean_text(label) if label else "",
+                        "dashed": "." in op,
+                        "arrow": "both" if op.startswith("<") else ("end" if op[-1] in ">ox" else "none"),
+                    })
+            sources = targets
+    return graph
+
+
+def _parse_state(lines, header):
+    graph = _new_graph("state", "TB")
+    stack = []
+    in_note = False
+    for line in lines:
+        if in_note:
+            in_note = line != "end note"
+            continue
+        if line.startswith("note "):
+            in_note = ":" not in line
+            continue
+        if line.startswith("direction "):
+            graph["direction"] = "LR" if line.split()[1] in ("LR", "RL") else "TB"
+            continue
+        if line == "}":
+            if stack:
+                stack.pop()
+            continue
+
+        group = stack[-1] if stack else None
+        match = re.match(r'^state\s+"([^"]*)"\s+as\s+([\w.]+)', line)
+        if match:
+            _add_node(graph, match.group(2), _clean_text(match.group(1)), "round", group)
+            continue
+        match = re.match(r"^state\s+([\w.]+)\s*\{$", line)
+        if match:
+            new_group = {"title": match.group(1), "members": []}
+            graph["groups"].append(new_group)
+            stack.append(new_group)
+            continue
+        match = _STATE_EDGE.match(line)
+        if match:
+            src, dst, label = match.groups()
+            scope = group["title"] if group else ""
+            if src == "[*]":
+                src = f"__start_{scope}"
+                _add_node(graph, src, "", "start", group)
+            if dst == "[*]":
+                dst = f"__end_{scope}"
+                _add_node(graph, dst, "", "end", group)
+            for node_id in (src, dst):
+                node = _add_node(graph, node_id, group=group)
+                if node["shape"] == "rect":
+                    node["shape"] = "round"
+            graph["edges"].append({
+                "src": src, "dst": dst, "label": _clean_text(label or ""),
+                "dashed": False, "arrow": "end",
+            })
+    return graph
+
+
+def _parse_class(lines, header):
+    graph = _new_graph("class", "TB")
+    current = None
+    for line in lines:
+        if current is not None:
+            if line == "}":
+                current = None
+            elif line.startswith("<<"):
+                current["label"] = f"{line}\n{current['label']}"
+            else:
+                current["lines"].append(_clean_text(line))
+            continue
+        if line.startswith("note ") or line.startswith("direction "):
+            continue
+        match = re.match(r"^class\s+([\w.]+)(?:~[^~]*~)?\s*(\{)?", line)
+        if match:
+            node = _add_node(graph, match.group(1), match.group(1))
+            if match.group(2):
+                current = node
+            continue
+        match = re.match(r"^<<(\w+)>>\s+([\w.]+)$", line)
+        if match:
+            node = _add_node(graph, match.group(2))
+            node["label"] = f"<<{match.group(1)}>>\n{node['label']}"
+            continue
+        match = _CLASS_EDGE.match(line)
+        if match:
+            left, left_card, op, right_card, right, label = match.groups()
+            _add_node(graph, left)
+            _add_node(graph, right)
+            # Point arrows from the dependent class to the one it uses
+            if op.startswith("<") or op[0] in "*o":
+                src, dst = right, left
+            else:
+                src, dst = left, right
+            label = _clean_text(label or "")
+            if left_card or right_card:
+                label = f"{left_card or ''} {label} {right_card or ''}".strip()
+            graph["edges"].append({
+                "src": src, "dst": dst, "label": label,
+                "dashed": ".." in op, "arrow": "none" if op in ("--", "..") else "end",
+            })
+            continue
+        match = re.match(r"^([\w.]+)\s*:\s*(.+)$", line)
+        if match:
+            _add_node(graph, match.group(1))["lines"].append(_clean_text(match.group(2)))
+    return graph
+
+
+def _parse_er(lines, header):
+    graph = _new_graph("er", "TB")
+    current = None
+    for line in lines:
+        if current is not None:
+            if line == "}":
+                current = None
+            else:
+                current["lines"].append(" ".join(line.split()[:3]))
+            continue
+        match = re.match(r"^([\w-]+)\s*\{$", line)
+        if match:
+            current = _add_node(graph, match.group(1), match.group(1))
+            continue
+        match = _ER_EDGE.match(line)
+        if match:
+            src, op, dst, label = match.groups()
+            _add_node(graph, src)
+            _add_node(graph, dst)
+            graph["edges"].append({
+                "src": src, "dst": dst, "label": _clean_text(label),
+                "dashed": ".." in op, "arrow": "end",
+            })
+    return graph
+
+
+def _parse_sequence(lines, header):
+    diagram = {"kind": "sequence", "participants": [], "labels": {}, "rows": []}
+
+    def participant(name):
+        name = name.strip()
+        if name not in diagram["labels"]:
+            diagram["participants"].append(name)
+            diagram["labels"][name] = name
+        return name
+
+    for line in lines:
+        match = re.match(r"^(participant|actor)\s+(.+?)(?:\s+as\s+(.+))?$", line)
+        if match:
+            name = participant(match.group(2))
+            diagram["labels"][name] = _clean_text(match.group(3) or match.group(2))
+            continue
+        match = _SEQ_NOTE.match(line)
+        if match:
+            over = [participant(p) for p in match.group(1).split(",")]
+            diagram["rows"].append({"kind": "note", "over": over, "text": _clean_text(match.group(2))})
+            continue
+        match = re.match(r"^(alt|else|loop|opt|par|and|critical|break)\b\s*(.*)$", line)
+        if match:
+            diagram["rows"].append({"kind": "frame", "text": f"[{match.group(1)}] {match.group(2)}".strip()})
+            continue
+        match = _SEQ_MESSAGE.match(line)
+        if match:
+            src, op, dst, text = match.groups()
+            diagram["rows"].append({
+                "kind": "message", "src": participant(src), "dst": participant(dst),
+                "text": _clean_text(text), "dashed": op.startswith("--"),
+                "arrow": ">>" in op,
+            })
+    return diagram
+
+
+_PARSERS = {
+    "graph": _parse_flowchart,
+    "flowchart": _parse_flowchart,
+    "stateDiagram": _parse_state,
+    "stateDiagram-v2": _parse_state,
+    "classDiagram": _parse_class,
+    "erDiagram": _parse_er,
+    "sequenceDiagram": _parse_sequence,
+}
+
+
+def parse_mermaid(source):
+    """Parse one mermaid diagram into a graph or sequence model"""
+    lines = []
+    for raw in source.splitlines():
+        line = raw.split("%%", 1)[0].strip()
+        if line:
+            lines.append(line)
+    if not lines:
+        raise ValueError("Empty mermaid diagram")
+    header = lines[0]
+    parser = _PARSERS.get(header.split()[0])
+    if parser is None:
+        raise ValueError(f"Unsupported mermaid diagram: {header!r}")
+    return parser(lines[1:], header)
+
+
+# ==================== LAYOUT ====================
+
+def _ranks(graph):
+    """Longest-path ranks, ignoring edges that close a cycle"""
+    order = list(graph["nodes"])
+    out = {n: [] for n in order}
+    for e in graph["edges"]:
+        if e["src"] != e["dst"]:
+            out[e["src"]].append(e["dst"])
+
+    # Drop back edges found by an iterative DFS
+    state, forward = {}, {n: [] for n in order}
+    for root in order:
+        if root in state:
+            continue
+        stack = [(root, iter(out[root]))]
+        state[root] = 1
+        while stack:
+            node, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                state[node] = 2
+                stack.pop()
+            elif state.get(child) == 1:
+                continue
+            else:
+                forward[node].append(child)
+                if child not in state:
+                    state[child] = 1
+                    stack.append((child, iter(out[child])))
+
+    indegree = {n: 0 for n in order}
+    for n in order:
+        for m in forward[n]:
+            indegree[m] += 1
+    rank = {n: 0 for n in order}
+    queue = [n for n in order if indegree[n] == 0]
+    for n in queue:
+        for m in forward[n]:
+            rank[m] = max(rank[m], rank[n] + 1)
+            indegree[m] -= 1
+            if indegree[m] == 0:
+                queue.append(m)
+
+    # Pull sources down next to their nearest successor
+    has_parent = {m for n in order for m in forward[n]}
+    for n in reversed(queue):
+        if n not in has_parent and forward[n]:
+            rank[n] = min(rank[m] for m in forward[n]) - 1
+    return rank
+
+
+def _order_ranks(graph, rank):
+    """Order nodes within ranks by barycenter sweeps, keeping groups together"""
+    group_of = {}
+    for i, group in enumerate(graph["groups"]):
+        for member in group["members"]:
+            group_of.setdefault(member, i)
+
+    layers = {}
+    for node_id in graph["nodes"]:
+        layers.setdefault(rank[node_id], []).append(node_id)
+    layers = [layers[r] for r in sorted(layers)]
+
+    neighbours = {n: [] for n in graph["nodes"]}
+    for e in graph["edges"]:
+        neighbours[e["src"]].append(e["dst"])
+        neighbours[e["dst"]].append(e["src"])
+
+    for sweep in range(4):
+        position = {n: i for layer in layers for i, n in enumerate(layer)}
+        sequence = layers[1:] if sweep % 2 == 0 else layers[-2::-1]
+        for layer in sequence:
+            def barycenter(n):
+                near = [position[m] for m in neighbours[n] if m in position and rank[m] != rank[n]]
+                return sum(near) / len(near) if near else position[n]
+            layer.sort(key=lambda n: (group_of.get(n, -1), barycenter(n)))
+            position.update({n: i for i, n in enumerate(layer)})
+
+    # Wrap oversized ranks onto extra rows
+    limit = MAX_RANK_SIZE[graph["direction"]]
+    wrapped = []
+    for layer in layers:
+        wrapped.extend(layer[i:i + limit] for i in range(0, len(layer), limit))
+    return wrapped
+
+
+def _node_height(node, font_pt, width):
+    """Height in inches a node `width` inches wide needs for its text at `font_pt`, margins included"""
+    metrics = default_metrics()
+    width_pt = max((width - 2 * NODE_MARGIN) * 72, 1.0)
+    label_lines = node["label"].split("\n") if node["label"] else []
+    member_pt = font_pt * MEMBER_SCALE
+    label_count = sum(metrics.count_lines(line, width_pt, font_pt) for line in label_lines)
+    member_count = sum(metrics.count_lines(line, width_pt, member_pt) for line in node["lines"])
+    height_pt = (label_count * font_pt + member_count * member_pt) * LINE_SPACING
+    return height_pt / 72 + 2 * NODE_MARGIN
+
+
+def compute_layout(graph):
+    """Place every node of a graph model inside the drawing area (inches)"""
+    rank = _ranks(graph)
+    layers = _order_ranks(graph, rank)
+    horizontal = graph["direction"] == "LR"
+    breadth, depth = (AREA_HEIGHT, AREA_WIDTH) if horizontal else (AREA_WIDTH, AREA_HEIGHT)
+
+    widest = max(len(layer) for layer in layers)
+    slot = breadth / widest
+    step = depth / len(layers)
+    if horizontal:
+        box_w, min_h, max_h = min(2.6, step * 0.62), 0.45, slot * 0.8
+    else:
+        box_w, min_h, max_h = min(2.6, slot * 0.86), 0.55, step * 0.62
+
+    # Largest text size at which every node's text fits the tallest box allowed, without breaking words
+    text_nodes = [n for n in graph["nodes"].values() if n["shape"] not in ("start", "end")]
+    words = {word for n in text_nodes for line in n["label"].split("\n") for word in line.split()}
+    widest_word = max((default_metrics().width(word, 1) * SAFETY for word in words), default=0)
+    font_pt = MAX_NODE_FONT_PT
+    while font_pt > MIN_NODE_FONT_PT and (
+            widest_word * font_pt > (box_w - 2 * NODE_MARGIN) * 72
+            or any(_node_height(n, font_pt, box_w) > max_h for n in text_nodes)):
+        font_pt -= 0.5
+    need = [_node_height(n, font_pt, box_w) for n in text_nodes]
+    box_h = min(max_h, max([min_h] + need))
+    label_h = min(box_h, max([min(0.45, box_h)] + [h for n, h in zip(text_nodes, need) if not n["lines"]]))
+
+    nodes = {}
+    for depth_index, layer in enumerate(layers):
+        offset = (breadth - len(layer) * slot) / 2
+        for i, node_id in enumerate(layer):
+            node = graph["nodes"][node_id]
+            w, h = box_w, box_h
+            if node["shape"] in ("start", "end"):
+                w = h = min(0.3, box_h)
+            elif not node["lines"]:
+                h = label_h
+            across = offset + (i + 0.5) * slot
+            along = (depth_index + 0.5) * step
+            cx, cy = (along, across) if horizontal else (across, along)
+            nodes[node_id] = [
+                round(AREA_LEFT + cx - w / 2, 4), round(AREA_TOP + cy - h / 2, 4),
+                round(w, 4), round(h, 4), depth_index,
+            ]
+
+    # Labels on edges between ranks fit the gap between them
+    gap = step - (box_w if horizontal else box_h)
+    label_pt = min(font_pt * LABEL_SCALE, ((gap - 0.05) * 72 - 2 * LABEL_MARGIN * 72) / LINE_SPACING)
+    return {"nodes": nodes, "font_pt": font_pt, "label_pt": round(max(6.0, label_pt), 1)}
+
+
+def split_graph(graph):
+    """Graph models for the slides a graph is drawn on, split by rank when it has too many
+
+    A node joined to a node on another slide is repeated there as a ghost,
+    drawn dashed, so every edge still shows where it leads.
+    """
+    rank = _ranks(graph)
+    levels = {level: i for i, level in enumerate(sorted(set(rank.values())))}
+    pages = -(-len(levels) // MAX_RANKS_PER_SLIDE[graph["direction"]])
+    if pages <= 1:
+        return [graph]
+    per_page = -(-len(levels) // pages)
+    page_of = {n: levels[rank[n]] // per_page for n in graph["nodes"]}
+
+    parts = []
+    for page in range(pages):
+        part = _new_graph(graph["kind"], graph["direction"])
+        part["nodes"] = {n: node for n, node in graph["nodes"].items() if page_of[n] == page}
+        for edge in graph["edges"]:
+            if page not in (page_of[edge["src"]], page_of[edge["dst"]]):
+                continue
+            for end in (edge["src"], edge["dst"]):
+                if end not in part["nodes"]:
+                    part["nodes"][end] = dict(graph["nodes"][end], ghost=True)
+            part["edges"].append(edge)
+        part["groups"] = [
+            dict(group, members=[m for m in group["members"] if page_of[m] == page])
+            for group in graph["groups"]
+        ]
+        parts.append(part)
+    return parts
+
+
+def _layout_key(graph):
+    payload = json.dumps([LAYOUT_VERSION, AREA_LEFT, AREA_TOP, AREA_WIDTH, AREA_HEIGHT, graph], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cached_layout(graph, cache_dir=LAYOUT_CACHE_DIR):
+    """Return the layout for a graph model, computing it only on a cache miss"""
+    path = os.path.join(cache_dir, f"{_layout_key(graph)}.json") if cache_dir else None
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    layout = compute_layout(graph)
+    if path:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(layout, f)
+    return layout
+
+
+# ==================== DRAWING ====================
+
+def _set_arrows(connector, arrow, dashed, color=DARK_BLUE, width=Pt(1.25)):
+    line = connector.line
+    line.color.rgb = color
+    line.width = width
+    if dashed:
+        line.dash_style = MSO_LINE.DASH
+    ln = line._get_or_add_ln()
+    if arrow == "both":
+        head = OxmlElement("a:headEnd")
+        head.set("type", "triangle")
+        ln.append(head)
+    if arrow in ("end", "both"):
+        tail = OxmlElement("a:tailEnd")
+        tail.set("type", "triangle")
+        ln.append(tail)
+
+
+def _add_text(slide, left, top, width, height, text, size, color=DARK_BLUE, bold=False, align=PP_ALIGN.CENTER,
+              margin=None):
+    box = slide.shapes.add_textbox(Inches(left), Inches(top), Inches(width), Inches(height))
+    tf = box.text_frame
+    tf.word_wrap = True
+    if margin is not None:
+        for attr in ("margin_left", "margin_right", "margin_top", "margin_bottom"):
+            setattr(tf, attr, Inches(margin))
+    for i, line in enumerate(text.split("\n")):
+        p = tf.paragraphs[0] if i == 0 else tf.add_paragraph()
+        p.text = line
+        p.font.size = Pt(size)
+        p.font.bold = bold
+        p.font.color.rgb = color
+        p.alignment = align
+    return box
+
+
+def _draw_node(slide, node, box, font_pt):
+    left, top, width, height = box[:4]
+    shape = slide.shapes.add_shape(
+        _SHAPES[node["shape"]], Inches(left), Inches(top), Inches(width), Inches(height)
+    )
+    shape.fill.solid()
+    if node["shape"] in ("start", "end"):
+        shape.fill.fore_color.rgb = DARK_BLUE
+        shape.line.color.rgb = DARK_BLUE
+        return shape
+    # Ghosts stand in for nodes drawn on another slide of the same graph
+    ghost = node.get("ghost", False)
+    light = ghost or bool(node["lines"])
+    shape.fill.fore_color.rgb = (LIGHT_GRAY if ghost else WHITE) if light else PRIMARY_BLUE
+    shape.line.color.rgb = PRIMARY_BLUE if light else DARK_BLUE
+    shape.line.width = Pt(1)
+    if ghost:
+        shape.line.dash_style = MSO_LINE.DASH
+
+    tf = shape.text_frame
+    tf.word_wrap = True
+    tf.vertical_anchor = MSO_ANCHOR.TOP if node["lines"] else MSO_ANCHOR.MIDDLE
+    for attr in ("margin_left", "margin_right", "margin_top", "margin_bottom"):
+        setattr(tf, attr, Inches(NODE_MARGIN))
+    label_lines = node["label"].split("\n") if node["label"] else []
+    for i, line in enumerate(label_lines + node["lines"]):
+        p = tf.paragraphs[0] if i == 0 else tf.add_paragraph()
+        p.text = line
+        is_member = i >= len(label_lines)
+        p.font.size = Pt(font_pt * (MEMBER_SCALE if is_member else 1))
+        p.font.bold = not is_member
+        p.font.color.rgb = DARK_BLUE if light else WHITE
+        p.alignment = PP_ALIGN.LEFT if is_member else PP_ALIGN.CENTER
+    return shape
+
+
+def _label_size(text, size):
+    """Width and height in inches of an edge label's textbox that holds `text` at `size` points"""
+    metrics = default_metrics()
+    # A point of slack so rounding never wraps a line measured to fit exactly
+    width_pt = max(metrics.width(line, size) for line in text.split("\n")) * SAFETY + 1
+    width_pt = min(width_pt, (MAX_LABEL_WIDTH - 2 * LABEL_MARGIN) * 72)
+    lines = metrics.count_lines(text, width_pt, size)
+    return width_pt / 72 + 2 * LABEL_MARGIN, lines * size * LINE_SPACING / 72 + 2 * LABEL_MARGIN
+
+
+def _overlap(a, b):
+    dx = min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0])
+    dy = min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1])
+    return dx * dy if dx > 0 and dy > 0 else 0.0
+
+
+def _inside(inner, outer):
+    return (outer[0] <= inner[0] and outer[1] <= inner[1]
+            and inner[0] + inner[2] <= outer[0] + outer[2] and inner[1] + inner[3] <= outer[1] + outer[3])
+
+
+def _place_label(text, size, start, end, boxes, labels, frames=()):
+    """Box for an edge label: along the edge, or beside it, where it covers the fewest nodes and labels
+
+    Group frames only count when the label would cross their edge.
+    """
+    width, height = _label_size(text, size)
+    (x1, y1), (x2, y2) = start, end
+    length = max(((x2 - x1) ** 2 + (y2 - y1) ** 2) ** 0.5, 1e-6)
+    # Unit normal, to step the label off the line when it sits on a node or another label
+    nx, ny = -(y2 - y1) / length, (x2 - x1) / length
+    shift = abs(nx) * (width + 0.05) + abs(ny) * (height + 0.05)
+    obstacles = [box[:4] for box in boxes.values()] + labels
+    right, bottom = AREA_LEFT + AREA_WIDTH, AREA_TOP + AREA_HEIGHT
+
+    best, best_cost = None, None
+    for offset in (shift * k for k in _LABEL_OFFSETS):
+        for stop in _LABEL_STOPS:
+            cx = x1 + (x2 - x1) * stop + nx * offset
+            cy = y1 + (y2 - y1) * stop + ny * offset
+            left = min(max(cx - width / 2, AREA_LEFT), right - width)
+            top = min(max(cy - height / 2, AREA_TOP), bottom - height)
+            box = (left, top, width, height)
+            # Measured with a little clearance, as edges are rounded to whole EMU
+            clear = (left - 0.01, top - 0.01, width + 0.02, height + 0.02)
+            cost = sum(_overlap(clear, other) for other in obstacles)
+            cost += sum(_overlap(clear, frame) for frame in frames if not _inside(clear, frame))
+            if not cost:
+                return box
+            if best_cost is None or cost < best_cost:
+                best, best_cost = box, cost
+    return best
+
+
+def _connect(slide, shapes, boxes, graph, edge, label_pt, labels, frames):
+    src, dst = edge["src"], edge["dst"]
+    if src == dst:
+        return
+    a, b = boxes[src], boxes[dst]
+    horizontal = graph["direction"] == "LR"
+
+    # Connection sites: 0 top, 1 left, 2 bottom, 3 right
+    if a[4] == b[4]:
+        forward = (a[1] < b[1]) if horizontal else (a[0] < b[0])
+        sites = ((2, 0) if forward else (0, 2)) if horizontal else ((3, 1) if forward else (1, 3))
+    else:
+        forward = a[4] < b[4]
+        sites = ((3, 1) if forward else (1, 3)) if horizontal else ((2, 0) if forward else (0, 2))
+
+    def site_point(box, site):
+        left, top, width, height = box[:4]
+        return {
+            0: (left + width / 2, top), 1: (left, top + height / 2),
+            2: (left + width / 2, top + height), 3: (left + width, top + height / 2),
+        }[site]
+
+    (x1, y1), (x2, y2) = site_point(a, sites[0]), site_point(b, sites[1])
+    connector = slide.shapes.add_connector(
+        MSO_CONNECTOR.STRAIGHT, Inches(x1), Inches(y1), Inches(x2), Inches(y2)
+    )
+    if graph["nodes"][src]["shape"] in _GLUEABLE:
+        connector.begin_connect(shapes[src], sites[0])
+    if graph["nodes"][dst]["shape"] in _GLUEABLE:
+        connector.end_connect(shapes[dst], sites[1])
+    _set_arrows(connector, edge["arrow"], edge["dashed"])
+
+    if edge["label"]:
+        box = _place_label(edge["label"], label_pt, (x1, y1), (x2, y2), boxes, labels, frames)
+        labels.append(box)
+        _add_text(slide, *box, edge["label"], label_pt, color=DARK_BLUE, margin=LABEL_MARGIN)
+
+
+def _draw_groups(slide, graph, boxes, font_pt):
+    """Frame each subgraph whose bounds take in no outside nodes and cross no other frame
+
+    Returns the frames drawn, as (left, top, width, height).
+    """
+    frames = []
+    for group in graph["groups"]:
+        members = [m for m in group["members"] if m in boxes]
+        if not members:
+            continue
+        pad = 0.12
+        left = min(boxes[m][0] for m in members) - pad
+        top = min(boxes[m][1] for m in members) - pad - 0.22
+        right = max(boxes[m][0] + boxes[m][2] for m in members) + pad
+        bottom = max(boxes[m][1] + boxes[m][3] for m in members) + pad
+        outsiders = [
+            n for n, box in boxes.items() if n not in group["members"]
+            and box[0] < right and box[0] + box[2] > left and box[1] < bottom and box[1] + box[3] > top
+        ]
+        box = (left, top, right - left, bottom - top)
+        if outsiders or any(_overlap(box, other) and not _inside(box, other) and not _inside(other, box)
+                            for other in frames):
+            continue
+        frames.append(box)
+        frame = slide.shapes.add_shape(
+            MSO_SHAPE.ROUNDED_RECTANGLE, Inches(left), Inches(top), Inches(right - left), Inches(bottom - top)
+        )
+        frame.adjustments[0] = 0.05
+        frame.fill.solid()
+        frame.fill.fore_color.rgb = LIGHT_GRAY
+        frame.line.color.rgb = PRIMARY_BLUE
+        frame.line.dash_style = MSO_LINE.DASH
+        _add_text(slide, left, top, right - left, 0.25, group["title"],
+                  max(6, font_pt * LABEL_SCALE), color=PRIMARY_BLUE, bold=True, align=PP_ALIGN.LEFT)
+    return frames
+
+
+def _draw_graph(prs, title, graph, cache_dir):
+    parts = split_graph(graph) if graph["nodes"] else [graph]
+    slides = []
+    for page, part in enumerate(parts):
+        slide = prs.slides.add_slide(get_layout(prs, HEADER_LAYOUT))
+        suffix = f" ({page + 1}/{len(parts)})" if len(parts) > 1 else ""
+        set_title(slide, title + suffix)
+        slides.append(slide)
+        if not part["nodes"]:
+            continue
+
+        layout = cached_layout(part, cache_dir)
+        boxes, font_pt = layout["nodes"], layout["font_pt"]
+        frames = _draw_groups(slide, part, boxes, font_pt)
+        shapes = {n: _draw_node(slide, part["nodes"][n], boxes[n], font_pt) for n in part["nodes"]}
+        labels = []
+        for edge in part["edges"]:
+            _connect(slide, shapes, boxes, part, edge, layout["label_pt"], labels, frames)
+    return slides
+
+
+def _draw_sequence(prs, title, diagram):
+    participants = diagram["participants"]
+    rows = diagram["rows"] or [{"kind": "frame", "text": ""}]
+    chunks = [rows[i:i + MAX_MESSAGES_PER_SLIDE] for i in range(0, len(rows), MAX_MESSAGES_PER_SLIDE)]
+    column = AREA_WIDTH / max(1, len(participants))
+    box_w, box_h = min(2.2, column * 0.85), 0.5
+    x_of = {p: AREA_LEFT + (i + 0.5) * column for i, p in enumerate(participants)}
+    font_pt = max(7, min(12, box_w * 72 / (0.55 * max(len(l) for l in diagram["labels"].values()))))
+
+    slides = []
+    for page, chunk in enumerate(chunks):
+        slide = prs.slides.add_slide(get_layout(prs, HEADER_LAYOUT))
+        suffix = f" ({page + 1}/{len(chunks)})" if len(chunks) > 1 else ""
+        set_title(slide, title + suffix)
+        slides.append(slide)
+
+        bottom = AREA_TOP + AREA_HEIGHT
+        for p in participants:
+            head = slide.shapes.add_shape(
+                MSO_SHAPE.ROUNDED_RECTANGLE, Inches(x_of[p] - box_w / 2), Inches(AREA_TOP),
+                Inches(box_w), Inches(box_h)
+            )
+            head.fill.solid()
+            head.fill.fore_color.rgb = PRIMARY_BLUE
+            head.line.fill.background()
+            p_text = head.text_frame.paragraphs[0]
+            p_text.text = diagram["labels"][p]
+            p_text.font.size = Pt(font_pt)
+            p_text.font.bold = True
+            p_text.font.color.rgb = WHITE
+            p_text.alignment = PP_ALIGN.CENTER
+            lifeline = slide.shapes.add_connector(
+                MSO_CONNECTOR.STRAIGHT, Inches(x_of[p]), Inches(AREA_TOP + box_h),
+                Inches(x_of[p]), Inches(bottom)
+            )
+            _set_arrows(lifeline, "none", dashed=True, color=PRIMARY_BLUE, width=Pt(1))
+
+        row_h = (bottom - AREA_TOP - box_h - 0.1) / max(len(chunk), 1)
+        text_pt = max(7, min(12, row_h * 72 / 2.4))
+        y = AREA_TOP + box_h + 0.1
+        for row in chunk:
+            mid = y + row_h * 0.62
+            if row["kind"] == "message":
+                x1, x2 = x_of[row["src"]], x_of[row["dst"]]
+                if x1 == x2:
+                    step, label_w = min(0.5, column / 3), column - 0.6
+                    if x1 + step + 0.05 + label_w <= AREA_LEFT + AREA_WIDTH:
+                        x2 = x1 + step
+                        label_left, align = x2 + 0.05, PP_ALIGN.LEFT
+                    else:
+                        # No room on the right of the last lifeline: loop back on its left
+                        x2 = x1 - step
+                        label_left, align = x2 - 0.05 - label_w, PP_ALIGN.RIGHT
+                else:
+                    label_left, label_w = min(x1, x2), abs(x2 - x1)
+                    align = PP_ALIGN.CENTER
+                arrow = slide.shapes.add_connector(
+                    MSO_CONNECTOR.STRAIGHT, Inches(x1), Inches(mid), Inches(x2), Inches(mid)
+                )
+                _set_arrows(arrow, "end" if row["arrow"] else "none", row["dashed"])
+                _add_text(slide, label_left, mid - row_h * 0.62, label_w, row_h * 0.6,
+                          row["text"], text_pt, align=align)
+            elif row["kind"] == "note":
+                xs = [x_of[p] for p in row["over"]]
+                left, right = min(xs) - column * 0.4, max(xs) + column * 0.4
+                note = slide.shapes.add_shape(
+                    MSO_SHAPE.RECTANGLE, Inches(left), Inches(y + row_h * 0.1),
+                    Inches(right - left), Inches(row_h * 0.8)
+                )
+                note.fill.solid()
+                note.fill.fore_color.rgb = LIGHT_GRAY
+                note.line.color.rgb = PRIMARY_BLUE
+                p_text = note.text_frame.paragraphs[0]
+                p_text.text = row["text"]
+                p_text.font.size = Pt(text_pt)
+                p_text.font.color.rgb = DARK_BLUE
+                p_text.alignment = PP_ALIGN.CENTER
+            else:
+                _add_text(slide, AREA_LEFT, y, 3.5, row_h, row["text"], text_pt,
+                          color=PRIMARY_BLUE, bold=True, align=PP_ALIGN.LEFT)
+            y += row_h
+    return slides
+
+
+def add_mermaid_slide(prs, file=None, source=None, index=None, title=None, cache_dir=LAYOUT_CACHE_DIR):
+    """Add slides for mermaid diagrams, from raw `source` or from a Markdown `file`
+
+    With a file, `index` picks one diagram; by default every diagram in the
+    file is drawn. Returns the list of slides added.
+    """
+    if source is not None:
+        diagrams = [{"title": title or "Diagram", "source": source}]
+    else:
+        diagrams = extract_diagrams(file)
+        if index is not None:
+            diagrams = [diagrams[index]]
+
+    slides = []
+    for diagram in diagrams:
+        model = parse_mermaid(diagram["source"])
+        slide_title = title or diagram["title"]
+        if model["kind"] == "sequence":
+            slides += _draw_sequence(prs, slide_title, model)
+        else:
+            slides += _draw_graph(prs, slide_title, model, cache_dir)
+    return slides
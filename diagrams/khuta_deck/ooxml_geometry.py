@@ -0,0 +1,78 @@
+"""
+Khuta App - OOXML Geometry
+Shared helpers for reading shape geometry and relationships from .pptx zips
+
+The thumbnail renderer and the layout check both read slides straight from
+the zip with lxml rather than through python-pptx. They resolve placeholder
+positions from the slide layout, map grouped shapes through their group
+transforms and follow part relationships the same way, so those rules live
+here once.
+"""
+
+import posixpath
+
+from lxml import etree
+
+EMU_PER_PT = 12700
+EMU_PER_INCH = 914400
+
+NS = {
+    "a": "http://schemas.openxmlformats.org/drawingml/2006/main",
+    "p": "http://schemas.openxmlformats.org/presentationml/2006/main",
+    "r": "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+}
+R_ID = f"{{{NS['r']}}}id"
+
+# Body insets PowerPoint applies when bodyPr sets none (EMU)
+BODY_INSETS = {"lIns": 91440, "tIns": 45720, "rIns": 91440, "bIns": 45720}
+
+
+def qn(tag):
+    """Clark name of a prefixed tag, e.g. "p:sp" """
+    prefix, name = tag.split(":")
+    return f"{{{NS[prefix]}}}{name}"
+
+
+def ph_key(ph):
+    """Key matching a slide placeholder to its layout placeholder: the type for titles, else the idx"""
+    return ph.get("type", "body") if ph.get("type") in ("title", "ctrTitle", "subTitle") else ph.get("idx", "0")
+
+
+def layout_placeholders(layout):
+    """Placeholder shapes of a parsed slide layout, by ph_key"""
+    placeholders = {}
+    if layout is not None:
+        for sp in layout.iterfind("p:cSld/p:spTree/p:sp", NS):
+            ph = sp.find("p:nvSpPr/p:nvPr/p:ph", NS)
+            if ph is not None:
+                placeholders[ph_key(ph)] = sp
+    return placeholders
+
+
+def group_transform(grp, transform):
+    """Compose a (x offset, y offset, x scale, y scale) transform with a group's child transform"""
+    xfrm = grp.find("p:grpSpPr/a:xfrm", NS)
+    if xfrm is None or xfrm.find("a:chExt", NS) is None:
+        return transform
+    off, ext = xfrm.find("a:off", NS), xfrm.find("a:ext", NS)
+    ch_off, ch_ext = xfrm.find("a:chOff", NS), xfrm.find("a:chExt", NS)
+    ox, oy, sx, sy = transform
+    gx = int(ext.get("cx")) / int(ch_ext.get("cx")) if int(ch_ext.get("cx")) else 1
+    gy = int(ext.get("cy")) / int(ch_ext.get("cy")) if int(ch_ext.get("cy")) else 1
+    return (ox + (int(off.get("x")) - int(ch_off.get("x")) * gx) * sx,
+            oy + (int(off.get("y")) - int(ch_off.get("y")) * gy) * sy, sx * gx, sy * gy)
+
+
+def read_rels(zf, partname):
+    """Relationships of a part as {rId: (reltype, member name)}"""
+    folder, name = posixpath.split(partname)
+    rels_name = posixpath.join(folder, "_rels", f"{name}.rels")
+    if rels_name not in zf.NameToInfo:
+        return {}
+    rels = {}
+    for rel in etree.fromstring(zf.read(rels_name)):
+        if rel.get("TargetMode") == "External":
+            continue
+        target = posixpath.normpath(posixpath.join(folder, rel.get("Target")))
+        rels[rel.get("Id")] = (rel.get("Type").rsplit("/", 1)[-1], target)
+    return rels
@@ -0,0 +1,443 @@
+"""
+Khuta App - Render Service
+Local HTTP service that renders report decks on a pool of warm workers
+
+Jobs are posted as JSON, either a deck spec ({"spec": {...}}) or one child's
+results ({"child": {...}, "results": [...]}, shaped like the exports
+report_decks.py reads). They wait in a bounded queue and are rendered by
+worker processes that prepared the template once at startup. When the queue
+is full new jobs are turned away with 503 and a Retry-After header instead of
+piling up, so clients back off during peak assessment periods.
+
+    POST /jobs              queue a job, 202 with its id
+    POST /render            queue a job and answer with the .pptx once rendered
+    GET  /jobs/<id>         job status
+    GET  /jobs/<id>/deck    the rendered .pptx
+    GET  /metrics           queue depth, p50/p99 latency and throughput
+"""
+
+import asyncio
+import json
+import math
+import os
+import re
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from . import BUILD_CACHE_DIR, DIAGRAMS_DIR
+from .deck_engine import PATH_ARGS, DeckEngine, SpecError, _resolve_paths
+
+SERVICE_DIR = os.path.join(BUILD_CACHE_DIR, "service")
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_QUEUE_SIZE = 64
+
+# Largest request body accepted, in bytes
+MAX_BODY = 8 * 1024 * 1024
+
+# Finished jobs (and their decks) kept for clients to collect
+MAX_FINISHED_JOBS = 500
+
+# Latency samples kept for the percentiles, and the throughput window in seconds
+LATENCY_SAMPLES = 2000
+THROUGHPUT_WINDOW = 60
+
+# Seconds a rejected client is asked to wait
+RETRY_AFTER = 1
+
+PPTX_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+_REASONS = {
+    200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+# Per-process engine, prepared once by the pool initializer
+_engine = None
+
+
+def _init_worker():
+    global _engine
+    _engine = DeckEngine()
+    _engine.warm_up()
+    # Load the builders now rather than on the first job
+    from . import report_decks, slide_builders  # noqa: F401
+
+
+def _ready():
+    return os.getpid()
+
+
+class RequestError(Exception):
+    """A request the service answers with an HTTP error status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _path_values(value):
+    """Every path in a slide argument: a path, a list of them or a per-locale mapping"""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, (list, dict)):
+        values = value.values() if isinstance(value, dict) else value
+        return [path for v in values for path in _path_values(v)]
+    return []
+
+
+def _check_paths(spec):
+    """Keep the files a client's spec reads inside the diagrams folder"""
+    for slide_spec in spec["slides"]:
+        if not isinstance(slide_spec, dict):
+            continue
+        for arg in PATH_ARGS:
+            for path in _path_values(slide_spec.get(arg)):
+                if os.path.isabs(path) or ".." in re.split(r"[\\/]", path):
+                    raise SpecError(f"'{arg}' must be a relative path inside the diagrams folder, got {path!r}")
+
+
+def check_payload(payload):
+    """Reject malformed jobs before they take a queue slot"""
+    if not isinstance(payload, dict):
+        raise SpecError("Job must be a JSON object")
+    if "spec" in payload:
+        spec = payload["spec"]
+        if not isinstance(spec, dict) or not isinstance(spec.get("slides"), list):
+            raise SpecError("'spec' must be a mapping with a 'slides' list")
+        _check_paths(spec)
+    elif not (isinstance(payload.get("results"), list) and payload["results"]):
+        raise SpecError("Job needs a 'spec', or a non-empty 'results' list (with an optional 'child')")
+    if "locale" in payload:
+        from .locales import check_locales
+
+        check_locales([payload["locale"]])
+
+
+def job_spec(payload):
+    """Deck spec of a job payload: the spec itself or a child's report"""
+    check_payload(payload)
+    if "spec" in payload:
+        # Client paths are relative to the diagrams folder, whatever the service's working directory
+        slides = [
+            {**slide_spec, **{arg: _resolve_paths(slide_spec[arg], DIAGRAMS_DIR)
+                              for arg in PATH_ARGS if arg in slide_spec}}
+            if isinstance(slide_spec, dict) else slide_spec
+            for slide_spec in payload["spec"]["slides"]
+        ]
+        return {**payload["spec"], "slides": slides}
+    from .report_decks import build_report_spec
+
+    child = dict(payload.get("child") or {})
+    child.setdefault("id", str(payload["results"][0].get("childId", "")))
+    return build_report_spec(child, payload["results"])
+
+
+def render_job(payload, output_path):
+    """Render one job in the current worker; return (seconds, deck size)"""
+    start = time.perf_counter()
+    spec = job_spec(payload)
+    locale = payload.get("locale") or (spec.get("locales") or [None])[0]
+    if locale:
+        from .locales import compile_locales
+
+        # A job renders one deck: the requested locale, or the spec's first
+        path, = compile_locales(_engine, spec, [locale], output_path)
+        os.replace(path, output_path)
+    else:
+        _engine.compile(spec, output_path)
+    return time.perf_counter() - start, os.path.getsize(output_path)
+
+
+class RenderJob:
+    """A queued render and, once finished, its deck or error"""
+
+    def __init__(self, payload, out_dir):
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        self.output_path = os.path.join(out_dir, f"{self.id}.pptx")
+        self.status = "queued"
+        self.error = None
+        self.size = None
+        self.submitted = time.perf_counter()
+        self.render_seconds = None
+        self.finished = None
+        self.done = asyncio.Event()
+
+    def describe(self):
+        info = {"id": self.id, "status": self.status}
+        if self.status == "done":
+            info.update(deck=f"/jobs/{self.id}/deck", size=self.size,
+                        render_ms=round(self.render_seconds * 1000, 1),
+                        latency_ms=round((self.finished - self.submitted) * 1000, 1))
+        elif self.status == "failed":
+            info["error"] = self.error
+        return info
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers, None when empty"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class ServiceMetrics:
+    """Counters, latency samples and a completion window for /metrics"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.accepted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.render_times = deque(maxlen=LATENCY_SAMPLES)
+        self.queue_waits = deque(maxlen=LATENCY_SAMPLES)
+        self._finished_at = deque()
+
+    def record(self, job, started):
+        now = time.perf_counter()
+        if job.status == "done":
+            self.completed += 1
+            self.latencies.append(now - job.submitted)
+            self.render_times.append(job.render_seconds)
+            self.queue_waits.append(started - job.submitted)
+        else:
+            self.failed += 1
+        self._finished_at.append(now)
+
+    def throughput(self):
+        """Jobs finished per second over the last THROUGHPUT_WINDOW seconds"""
+        now = time.perf_counter()
+        while self._finished_at and now - self._finished_at[0] > THROUGHPUT_WINDOW:
+            self._finished_at.popleft()
+        window = min(THROUGHPUT_WINDOW, time.time() - self.started) or 1
+        return len(self._finished_at) / window
+
+    def snapshot(self, queue, running, workers):
+        def ms(samples, pct):
+            value = percentile(samples, pct)
+            return None if value is None else round(value * 1000, 1)
+
+        return {
+            "queue_depth": queue.qsize(),
+            "queue_capacity": queue.maxsize,
+            "running": running,
+            "workers": workers,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "failed": self.failed,
+            "latency_ms": {"p50": ms(self.latencies, 50), "p99": ms(self.latencies, 99)},
+            "render_ms": {"p50": ms(self.render_times, 50), "p99": ms(self.render_times, 99)},
+            "queue_wait_ms": {"p50": ms(self.queue_waits, 50), "p99": ms(self.queue_waits, 99)},
+            "throughput_per_s": round(self.throughput(), 3),
+            "uptime_s": round(time.time() - self.started, 1),
+        }
+
+
+class RenderService:
+    """Bounded job queue in front of a warm process pool, served over HTTP"""
+
+    def __init__(self, workers=None, queue_size=DEFAULT_QUEUE_SIZE, out_dir=SERVICE_DIR):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.out_dir = out_dir
+        self.jobs = {}
+        self._finished = deque()
+        self.running = 0
+        self.metrics = ServiceMetrics()
+        self.pool = None
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Start the workers and the HTTP listener; return the server"""
+        os.makedirs(self.out_dir, exist_ok=True)
+        loop = asyncio.get_running_loop()
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        # Start every worker now so the first jobs do not pay for the template
+        await asyncio.gather(*(loop.run_in_executor(self.pool, _ready) for _ in range(self.workers)))
+        for _ in range(self.workers):
+            loop.create_task(self._dispatch())
+        return await asyncio.start_server(self._handle, host, port)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+    def submit(self, payload):
+        """Queue a job, or return None when the queue is full"""
+        job = RenderJob(payload, self.out_dir)
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.metrics.rejected += 1
+            return None
+        self.jobs[job.id] = job
+        self.metrics.accepted += 1
+        return job
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            job.status = "running"
+            self.running += 1
+            started = time.perf_counter()
+            try:
+                job.render_seconds, job.size = await loop.run_in_executor(
+                    self.pool, render_job, job.payload, job.output_path)
+                job.status = "done"
+            except Exception as e:
+                job.status = "failed"
+                job.error = f"{type(e).__name__}: {e}"
+                if isinstance(e, BrokenProcessPool):
+                    # A worker died (e.g. out of memory); later jobs get a fresh pool
+                    self.pool.shutdown(wait=False)
+                    self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+            finally:
+                self.running -= 1
+                job.finished = time.perf_counter()
+                job.payload = None
+                self.metrics.record(job, started)
+                self._retire(job)
+                job.done.set()
+                self.queue.task_done()
+
+    def _retire(self, job):
+        """Keep the last MAX_FINISHED_JOBS finished jobs, deleting older decks"""
+        self._finished.append(job.id)
+        while len(self._finished) > MAX_FINISHED_JOBS:
+            old = self.jobs.pop(self._finished.popleft(), None)
+            if old is not None and os.path.exists(old.output_path):
+                os.remove(old.output_path)
+
+    # HTTP
+
+    async def _handle(self, reader, writer):
+        try:
+            request = await _read_request(reader)
+            if request is None:
+                return
+            status, body, headers = await self._route(*request)
+        except RequestError as e:
+            status, body, headers = _json(e.status, {"error": str(e)})
+        except SpecError as e:
+            status, body, headers = _json(400, {"error": str(e)})
+        except Exception as e:
+            status, body, headers = _json(500, {"error": f"{type(e).__name__}: {e}"})
+        try:
+            writer.write(_response(status, body, headers))
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, body):
+        parts = [part for part in path.split("?")[0].split("/") if part]
+        if parts in (["jobs"], ["render"]):
+            if method != "POST":
+                return _json(405, {"error": "Use POST"})
+            try:
+                payload = json.loads(body or b"null")
+            except ValueError as e:
+                raise SpecError(f"Invalid JSON: {e}") from None
+            check_payload(payload)
+            job = self.submit(payload)
+            if job is None:
+                status, data, headers = _json(503, {"error": "Render queue is full, retry later"})
+                headers["Retry-After"] = str(RETRY_AFTER)
+                return status, data, headers
+            if parts == ["jobs"]:
+                return _json(202, job.describe())
+            await job.done.wait()
+            return self._deck(job)
+
+        if method != "GET":
+            return _json(405, {"error": "Use GET"})
+        if parts == ["metrics"]:
+            return _json(200, self.metrics.snapshot(self.queue, self.running, self.workers))
+        if parts == ["health"]:
+            return _json(200, {"status": "ok"})
+        if len(parts) in (2, 3) and parts[0] == "jobs":
+            job = self.jobs.get(parts[1])
+            if job is None:
+                return _json(404, {"error": f"Unknown job {parts[1]}"})
+            if len(parts) == 2:
+                return _json(200, job.describe())
+            if parts[2] == "deck":
+                return self._deck(job)
+        return _json(404, {"error": f"No route for {path}"})
+
+    def _deck(self, job):
+        if job.status == "failed":
+            return _json(500, job.describe())
+        if job.status != "done":
+            return _json(409, job.describe())
+        with open(job.output_path, "rb") as f:
+            deck = f.read()
+        return 200, deck, {"Content-Type": PPTX_TYPE, "X-Job-Id": job.id,
+                           "Content-Disposition": f'attachment; filename="{job.id}.pptx"'}
+
+
+async def _read_request(reader):
+    """Read one HTTP/1.1 request; return (method, path, body) or None on a closed connection"""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, path, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise RequestError(400, "Malformed request line") from None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise RequestError(400, "Invalid Content-Length") from None
+    if length > MAX_BODY:
+        raise RequestError(413, f"Request body over {MAX_BODY} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), path, body
+
+
+def _json(status, data):
+    return status, json.dumps(data, ensure_ascii=False).encode("utf-8"), {"Content-Type": "application/json"}
+
+
+def _response(status, body, headers):
+    lines = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}", f"Content-Length: {len(body)}", "Connection: close"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+async def _serve(host, port, workers, queue_size, out_dir):
+    service = RenderService(workers, queue_size, out_dir)
+    server = await service.start(host, port)
+    print(f"Render service on http://{host}:{port} with {service.workers} workers, "
+          f"queue of {queue_size}", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None, queue_size=DEFAULT_QUEUE_SIZE, out_dir=SERVICE_DIR):
+    """Run the render service until interrupted"""
+    try:
+        asyncio.run(_serve(host, port, workers, queue_size, out_dir))
+    except KeyboardInterrupt:
+        pass
+    return 0
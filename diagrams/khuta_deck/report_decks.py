@@ -0,0 +1,149 @@
+"""
+Khuta App - Per-Child Report Decks
+Streams a TestResults export and emits one assessment report deck per child
+
+Exports follow the Firestore schema in 06-database-schema.md. Rows can be
+JSONL or CSV; in CSV, list fields (answers, recommendations) are JSON arrays.
+TestResults rows must be grouped by `childId` (as produced by a path-ordered
+export). When a Children export is given it must be ordered the same way, and
+is merge-joined against the results, so only one child is held in memory.
+"""
+
+import csv
+import itertools
+import json
+import os
+from datetime import datetime, timezone
+
+from .slide_builders import score_band
+
+# Assessment history rows shown on the report table
+MAX_HISTORY_ROWS = 8
+
+
+def read_rows(path):
+    """Yield export rows one at a time from a JSONL or CSV file"""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            for row in csv.DictReader(f):
+                yield {k: _parse_csv_value(v) for k, v in row.items()}
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def _parse_csv_value(value):
+    if value and value[0] in "[{":
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _parse_date(value):
+    """Parse ISO strings, epoch seconds or Firestore timestamp exports"""
+    if isinstance(value, dict):
+        value = value.get("_seconds", value.get("seconds"))
+    if value in (None, ""):
+        return None
+    if isinstance(value, (int, float)) or str(value).replace(".", "", 1).isdigit():
+        return datetime.fromtimestamp(float(value), tz=timezone.utc)
+    try:
+        date = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    # Dates without an offset are UTC, so they sort with the aware ones
+    return date.replace(tzinfo=timezone.utc) if date.tzinfo is None else date
+
+
+def iter_children(results_path, children_path=None):
+    """Yield (child, results) pairs, streaming both exports"""
+    children = read_rows(children_path) if children_path else iter(())
+    child = next(children, None)
+
+    groups = itertools.groupby(read_rows(results_path), key=lambda r: str(r.get("childId", "")))
+    for child_id, results in groups:
+        # Merge join: skip children without results
+        while child is not None and str(child.get("id", "")) < child_id:
+            child = next(children, None)
+        if child is not None and str(child.get("id", "")) == child_id:
+            info = child
+        else:
+            info = {"id": child_id}
+
+        if str(info.get("isDeleted", "")).lower() == "true":
+            continue
+        yield info, list(results)
+
+
+def build_report_spec(child, results):
+    """Describe one child's report deck as a deck spec"""
+    results = sorted(results, key=lambda r: _parse_date(r.get("date")) or datetime.min.replace(tzinfo=timezone.utc))
+    latest = results[-1]
+    t_score = float(latest.get("score") or 0)
+    label, desc = score_band(t_score)
+    name = child.get("name") or latest.get("childName") or child["id"]
+
+    slides = [
+        {
+            "type": "title",
+            "title": name,
+            "subtitle": "Assessment Report - تقرير التقييم",
+        },
+        {
+            "type": "content",
+            "title": "Child Profile - بيانات الطفل",
+            "content_items": [
+                f"Age - العمر: {child.get('age', latest.get('age', '-'))}",
+                f"Gender - الجنس: {child.get('gender', latest.get('gender', '-'))}",
+                f"Assessments - عدد التقييمات: {len(results)}",
+                f"Latest T-Score - آخر درجة: {t_score:g} ({label.splitlines()[0]})",
+                f"{desc.replace(chr(10), ' - ')}",
+            ],
+        },
+        {"type": "score_interpretation", "t_score": t_score},
+    ]
+
+    history = [
+        [
+            date.strftime("%Y-%m-%d") if (date := _parse_date(r.get("date"))) else "-",
+            str(r.get("testType", "")),
+            f"{float(r.get('score') or 0):g}",
+            str(r.get("interpretation", "")),
+        ]
+        for r in results[-MAX_HISTORY_ROWS:]
+    ]
+    slides.append({
+        "type": "table",
+        "title": "Assessment History - سجل التقييمات",
+        "headers": ["Date", "Type", "T-Score", "Interpretation"],
+        "rows": history,
+    })
+
+    recommendations = latest.get("recommendations") or []
+    if isinstance(recommendations, str):
+        recommendations = [recommendations]
+    if recommendations:
+        slides.append({
+            "type": "content",
+            "title": "Recommendations - التوصيات",
+            "content_items": recommendations,
+            "rtl": True,
+        })
+
+    return {"slides": slides}
+
+
+def build_reports(engine, results_path, out_dir, children_path=None, cache=None, store=None):
+    """Build one report deck per child and yield each output path
+
+    With a `store`, reports whose inputs are unchanged are checked out of it.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    for child, results in iter_children(results_path, children_path):
+        spec = build_report_spec(child, results)
+        safe_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in str(child["id"]))
+        yield engine.compile(spec, os.path.join(out_dir, f"{safe_id}.pptx"), cache, store=store)
@@ -0,0 +1,92 @@
+"""
+Khuta App - Reproducible Output
+Writes decks so that the same inputs always give byte-for-byte the same file
+
+Zip members get a fixed timestamp and permissions, parts are written in
+python-pptx's own (deterministic) order, and the core document properties
+carry fixed values instead of the template's. Shape ids are already stable:
+python-pptx numbers shapes from the slide's contents alone. The timestamp
+follows SOURCE_DATE_EPOCH when it is set, as in other reproducible builds.
+"""
+
+import datetime
+import io
+import os
+import re
+import time
+import zipfile
+
+from pptx.opc.oxml import serialize_part_xml
+from pptx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from pptx.opc.serialized import _ContentTypesItem
+
+# Zip timestamps cannot go earlier than 1980
+BUILD_EPOCH = max(int(os.environ.get("SOURCE_DATE_EPOCH", 0)), 315532800)
+ZIP_DATE_TIME = time.gmtime(BUILD_EPOCH)[:6]
+
+# Dates in a workbook's docProps/core.xml
+_WORKBOOK_DATES = re.compile(rb"(<dcterms:(?:created|modified)[^>]*>)[^<]*")
+
+# Regular file, rw-r--r--
+_FILE_ATTR = 0o100644 << 16
+
+CORE_PROPERTIES = {
+    "author": "Khuta",
+    "last_modified_by": "Khuta",
+    "comments": "",
+    "revision": 1,
+}
+
+
+def zip_info(membername):
+    """ZipInfo for a package member with the fixed timestamp and attributes"""
+    info = zipfile.ZipInfo(membername, ZIP_DATE_TIME)
+    info.compress_type = zipfile.ZIP_DEFLATED
+    info.create_system = 3
+    info.external_attr = _FILE_ATTR
+    return info
+
+
+def write_member(zf, membername, blob):
+    zf.writestr(zip_info(membername), blob)
+
+
+def stamp_core_properties(prs):
+    """Replace the template's author, comments and dates with fixed values"""
+    core = prs.core_properties
+    for name, value in CORE_PROPERTIES.items():
+        setattr(core, name, value)
+    build_time = datetime.datetime.fromtimestamp(BUILD_EPOCH, datetime.timezone.utc).replace(tzinfo=None)
+    core.created = build_time
+    core.modified = build_time
+
+
+def stamp_chart_workbook(chart):
+    """Give the workbook embedded in a chart fixed dates
+
+    XlsxWriter dates the workbook it writes for the chart data with the
+    current time, so the same chart would differ from build to build.
+    """
+    xlsx_part = chart.part.chart_workbook.xlsx_part
+    stamp = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(BUILD_EPOCH)).encode("ascii")
+    out = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(xlsx_part.blob)) as src, zipfile.ZipFile(out, "w") as dst:
+        for info in src.infolist():
+            data = src.read(info)
+            if info.filename == "docProps/core.xml":
+                data = _WORKBOOK_DATES.sub(lambda m: m.group(1) + stamp, data)
+            dst.writestr(info, data)
+    xlsx_part.blob = out.getvalue()
+
+
+def save_presentation(prs, file):
+    """Save a presentation like `prs.save`, with fixed member timestamps"""
+    package = prs.part.package
+    parts = list(package.iter_parts())
+    with zipfile.ZipFile(file, "w", zipfile.ZIP_DEFLATED) as zf:
+        write_member(zf, CONTENT_TYPES_URI.membername, serialize_part_xml(_ContentTypesItem.xml_for(parts)))
+        write_member(zf, PACKAGE_URI.rels_uri.membername, package._rels.xml)
+        for part in parts:
+            write_member(zf, part.partname.membername, part.blob)
+            if len(part.rels):
+                write_member(zf, part.partname.rels_uri.membername, part.rels.xml)
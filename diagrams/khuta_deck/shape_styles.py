@@ -0,0 +1,114 @@
+"""
+Khuta App - Shape Styles
+Registry of styled shape and paragraph prototypes that builders clone
+
+Styling a shape through python-pptx (fill.solid(), fore_color.rgb, line.fill,
+then size, bold, color and alignment on every paragraph) walks and edits the
+same elements over and over. Each distinct style is instead built once
+through python-pptx, so the markup matches it exactly, and kept as an XML
+fragment; builders deep-copy the fragment and only fill in the text, the
+shape id and the geometry.
+"""
+
+import copy
+
+from pptx.enum.text import PP_ALIGN
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls, qn
+from pptx.oxml.shapes.autoshape import CT_Shape
+from pptx.shapes.autoshape import AutoShapeType, Shape
+from pptx.text.text import _Paragraph
+from pptx.util import Pt
+
+_ALIGNMENTS = {"left": PP_ALIGN.LEFT, "center": PP_ALIGN.CENTER, "right": PP_ALIGN.RIGHT}
+
+# style key -> prototype element
+_prototypes = {}
+
+
+def _prototype(key, build):
+    proto = _prototypes.get(key)
+    if proto is None:
+        proto = _prototypes[key] = build()
+    return proto
+
+
+def _build_paragraph(size, color, bold, align, space_after):
+    p = parse_xml(f"<a:p {nsdecls('a')}/>")
+    para = _Paragraph(p, None)
+    para.font.size = Pt(size)
+    if bold:
+        para.font.bold = True
+    para.font.color.rgb = color
+    if space_after is not None:
+        para.space_after = Pt(space_after)
+    if align is not None:
+        para.alignment = _ALIGNMENTS[align]
+    return p
+
+
+def paragraph(text, size, color, bold=False, align=None, space_after=None):
+    """A styled a:p holding `text`; line breaks in `text` become a:br"""
+    key = ("p", size, str(color), bold, align, space_after)
+    p = copy.deepcopy(_prototype(key, lambda: _build_paragraph(size, color, bold, align, space_after)))
+    p.append_text(text)
+    return p
+
+
+def _build_autoshape(shape_type, color, word_wrap, outline, outline_width):
+    autoshape_type = AutoShapeType(shape_type)
+    sp = CT_Shape.new_autoshape_sp(0, "", autoshape_type.prst, 0, 0, 0, 0)
+    shape = Shape(sp, None)
+    shape.fill.solid()
+    shape.fill.fore_color.rgb = color
+    if outline is None:
+        shape.line.fill.background()
+    else:
+        shape.line.color.rgb = outline
+        shape.line.width = Pt(outline_width)
+    if word_wrap:
+        shape.text_frame.word_wrap = True
+    return sp
+
+
+def _build_textbox(word_wrap):
+    sp = CT_Shape.new_textbox_sp(0, "", 0, 0, 0, 0)
+    if word_wrap:
+        Shape(sp, None).text_frame.word_wrap = True
+    return sp
+
+
+def _place(slide, proto, name, left, top, width, height, paragraphs):
+    """Clone `proto` onto `slide` with a fresh id, the geometry and the paragraphs"""
+    sp = copy.deepcopy(proto)
+    shape_id = slide.shapes._next_shape_id
+    c_nv_pr = sp[0][0]
+    c_nv_pr.set("id", str(shape_id))
+    c_nv_pr.set("name", f"{name} {shape_id - 1}")
+    xfrm = sp.spPr.xfrm
+    xfrm.off.set("x", str(int(left)))
+    xfrm.off.set("y", str(int(top)))
+    xfrm.ext.set("cx", str(int(width)))
+    xfrm.ext.set("cy", str(int(height)))
+    if paragraphs:
+        tx_body = sp.txBody
+        # The prototype's empty first paragraph makes way for the given ones
+        tx_body.remove(tx_body.find(qn("a:p")))
+        tx_body.extend(paragraphs)
+    slide.shapes._spTree.append(sp)
+    return sp
+
+
+def add_autoshape(slide, shape_type, left, top, width, height, color, paragraphs=(), word_wrap=False,
+                  outline=None, outline_width=None):
+    """Append a filled autoshape without an outline (or with `outline` color and width in points)"""
+    key = ("autoshape", shape_type, str(color), word_wrap, str(outline), outline_width)
+    proto = _prototype(key, lambda: _build_autoshape(shape_type, color, word_wrap, outline, outline_width))
+    name = AutoShapeType(shape_type).basename
+    return _place(slide, proto, name, left, top, width, height, list(paragraphs))
+
+
+def add_textbox(slide, left, top, width, height, paragraphs=(), word_wrap=False):
+    """Append a textbox holding `paragraphs`"""
+    proto = _prototype(("textbox", word_wrap), lambda: _build_textbox(word_wrap))
+    return _place(slide, proto, "TextBox", left, top, width, height, list(paragraphs))
@@ -0,0 +1,526 @@
+"""
+Khuta App - Slide Builders
+Reusable slide builders for the Khuta presentation decks
+"""
+
+import os
+import re
+
+from pptx.util import Inches, Pt
+from pptx.chart.data import CategoryChartData
+from pptx.enum.chart import XL_CHART_TYPE, XL_LEGEND_POSITION, XL_MARKER_STYLE
+from pptx.enum.text import PP_ALIGN
+from pptx.enum.shapes import MSO_SHAPE
+from pptx.dml.color import RGBColor
+
+from .deck_theme import (
+    SLIDE_WIDTH, PRIMARY_BLUE, DARK_BLUE, GREEN, YELLOW, ORANGE, RED, DARK_RED, WHITE,
+)
+from .app_data import app_data
+from .deck_layouts import HEADER_LAYOUT, SECTION_LAYOUT, TITLE_LAYOUT, get_layout, set_title
+from .locales import translate
+from .markdown_doc import load_markdown
+from .media import default_pipeline
+from .shape_styles import add_autoshape, add_textbox, paragraph
+from .mermaid_slides import add_mermaid_slide
+from .reproducible import stamp_chart_workbook
+from .table_xml import add_table, as_rows, paginate_rows
+from .text_layout import MIN_FONT_PT, check_overflow_mode, fit_items, paginate, shrink_to_fit
+
+# Color and (English, Arabic) concern shown for each interpretation level
+# from average up; the levels below average fold into the average band
+LEVEL_STYLES = {
+    "average": (GREEN, ("Low Concern", "قلق منخفض")),
+    "slightly_above_average": (YELLOW, ("Monitor", "يحتاج متابعة")),
+    "above_average": (ORANGE, ("Concern", "يحتاج اهتمام")),
+    "significantly_above_average": (RED, ("High Concern", "يحتاج تدخل")),
+    "extremely_above_average": (DARK_RED, ("Very High Concern", "يحتاج تدخل عاجل")),
+}
+
+# Chart slide types -> native chart types
+CHART_TYPES = {
+    "line": XL_CHART_TYPE.LINE,
+    "column": XL_CHART_TYPE.COLUMN_CLUSTERED,
+    "stacked_bar": XL_CHART_TYPE.BAR_STACKED_100,
+}
+
+QUESTION_SET_TITLES = {
+    "parent": ("Parent Questions", "أسئلة الوالدين"),
+    "teacher": ("Teacher Questions", "أسئلة المعلم"),
+}
+
+def _bilingual(en, ar, locale=None, sep=" - "):
+    """Return the English or Arabic text for `locale`, or both joined by `sep`"""
+    if locale == "en":
+        return en
+    if locale == "ar":
+        return ar
+    return f"{en}{sep}{ar}"
+
+def _mirror(left, width, rtl):
+    """Left edge in inches of a shape, mirrored across the slide for right-to-left decks"""
+    return SLIDE_WIDTH.inches - left - width if rtl else left
+
+def score_bands(locale=None):
+    """T-score bands from the app's interpretation levels, lowest first
+
+    Each band is ((low, high), range label, band label, color, description).
+    """
+    levels = sorted((l for l in app_data()["levels"] if l["key"] in LEVEL_STYLES), key=lambda l: l["min"])
+    bands = []
+    for i, level in enumerate(levels):
+        low = level["min"] if i else float("-inf")
+        high = levels[i + 1]["min"] if i + 1 < len(levels) else float("inf")
+        if i == 0:
+            score_range = f"≤ {high - 1}"
+        elif high == float("inf"):
+            score_range = f"≥ {low}"
+        else:
+            score_range = f"{low} - {high - 1}"
+        # English labels may carry their own range, e.g. "Average (45-55)"
+        english = re.sub(r"\s*\(.*\)$", "", level["en"])
+        label = _bilingual(english, level["ar"], locale, "\n")
+        color, (desc_en, desc_ar) = LEVEL_STYLES[level["key"]]
+        bands.append(((low, high), score_range, label, color, _bilingual(desc_en, desc_ar, locale, "\n")))
+    return bands
+
+def _add_header_slide(prs, title, rtl=False):
+    """Add a slide on the header layout and fill its title"""
+    slide = prs.slides.add_slide(get_layout(prs, HEADER_LAYOUT))
+    p = set_title(slide, title)
+    if rtl:
+        p.alignment = PP_ALIGN.RIGHT
+    return slide
+
+def add_title_slide(prs, title, subtitle=""):
+    """Add a title slide"""
+    slide = prs.slides.add_slide(get_layout(prs, TITLE_LAYOUT))
+    set_title(slide, title)
+
+    # Subtitle
+    subtitle_ph = slide.placeholders[1]
+    if subtitle:
+        subtitle_ph.text_frame.paragraphs[0].text = subtitle
+    else:
+        subtitle_ph._element.getparent().remove(subtitle_ph._element)
+
+    return slide
+
+def add_section_slide(prs, title, rtl=False):
+    """Add a section divider slide"""
+    slide = prs.slides.add_slide(get_layout(prs, SECTION_LAYOUT))
+    p = set_title(slide, title)
+    if rtl:
+        p.alignment = PP_ALIGN.RIGHT
+
+    return slide
+
+def _add_bullets(slide, left, top, width, height, items, size, space_after, rtl=False):
+    """Add a word-wrapped textbox of bullet points"""
+    align = "right" if rtl else None
+    paragraphs = [paragraph(f"• {item}", size, DARK_BLUE, align=align, space_after=space_after) for item in items]
+    add_textbox(slide, Inches(left), Inches(top), Inches(width), Inches(height), paragraphs, word_wrap=True)
+
+def _add_heading(slide, left, top, width, height, text, rtl=False):
+    """Add a bold column heading"""
+    align = "right" if rtl else None
+    add_textbox(slide, Inches(left), Inches(top), Inches(width), Inches(height),
+                [paragraph(text, 24, PRIMARY_BLUE, bold=True, align=align)])
+
+def _fill_counts(items):
+    """Replace {parent_count} and {teacher_count} in spec text with the app's question counts"""
+    questions = app_data()["questions"]
+    counts = {"{parent_count}": str(len(questions["parent"])), "{teacher_count}": str(len(questions["teacher"]))}
+    filled = []
+    for item in items:
+        for placeholder, count in counts.items():
+            item = item.replace(placeholder, count)
+        filled.append(item)
+    return filled
+
+def _page_title(title, page, pages):
+    return f"{title} ({page + 1}/{pages})" if pages > 1 else title
+
+def add_content_slide(prs, title, content_items, rtl=False, overflow="paginate"):
+    """Add a content slide with bullet points, continued on more slides if they overflow"""
+    content_items = _fill_counts(content_items)
+    bullets = [f"• {item}" for item in content_items]
+    size, space_after, pages = fit_items(bullets, 11.733, 5, 24, 12, overflow)
+
+    slides = []
+    start = 0
+    for page, chunk in enumerate(pages):
+        slide = _add_header_slide(prs, _page_title(title, page, len(pages)), rtl)
+        _add_bullets(slide, 0.8, 1.8, 11.733, 5, content_items[start:start + len(chunk)], size, space_after, rtl)
+        start += len(chunk)
+        slides.append(slide)
+
+    return slides[0] if len(slides) == 1 else slides
+
+def add_two_column_slide(prs, title, left_items, right_items, left_title="", right_title="", rtl=False,
+                         overflow="paginate"):
+    """Add a two-column slide, continued on more slides if a column overflows"""
+    left_items, right_items = _fill_counts(left_items), _fill_counts(right_items)
+    # Both columns share one font size, and paginate side by side
+    left = [f"• {item}" for item in left_items]
+    right = [f"• {item}" for item in right_items]
+    check_overflow_mode(overflow)
+    size, space_after = 20, 8
+    if overflow == "shrink":
+        size = min(shrink_to_fit(column, 5.5, 4.5, 20, 8, MIN_FONT_PT) or MIN_FONT_PT for column in (left, right))
+        space_after = 8 * size / 20
+    if overflow == "none":
+        left_pages, right_pages = [left], [right]
+    else:
+        left_pages = paginate(left, 5.5, 4.5, size, space_after)
+        right_pages = paginate(right, 5.5, 4.5, size, space_after)
+    pages = max(len(left_pages), len(right_pages))
+
+    slides = []
+    left_start = right_start = 0
+    for page in range(pages):
+        slide = _add_header_slide(prs, _page_title(title, page, pages), rtl)
+
+        # Left column title (the right-hand one in right-to-left decks)
+        left_x = _mirror(0.5, 5.5, rtl)
+        if left_title:
+            _add_heading(slide, left_x, 1.5, 5.5, 0.5, left_title, rtl)
+
+        # Left column content
+        count = len(left_pages[page]) if page < len(left_pages) else 0
+        _add_bullets(slide, left_x, 2.2, 5.5, 4.5, left_items[left_start:left_start + count], size, space_after, rtl)
+        left_start += count
+
+        # Right column title
+        right_x = _mirror(7, 5.5, rtl)
+        if right_title:
+            _add_heading(slide, right_x, 1.5, 5.5, 0.5, right_title, rtl)
+
+        # Right column content
+        count = len(right_pages[page]) if page < len(right_pages) else 0
+        _add_bullets(slide, right_x, 2.2, 5.5, 4.5, right_items[right_start:right_start + count], size, space_after, rtl)
+        right_start += count
+
+        slides.append(slide)
+
+    return slides[0] if len(slides) == 1 else slides
+
+def add_table_slide(prs, title, headers, rows, rtl=False, font_size=16, row_height=0.5, max_rows=None,
+                    column_widths=None):
+    """Add a slide with a table, repeating the header on continuation slides if it is too long
+
+    `rows` may be a list of lists or a NumPy array; `row_height` is the
+    minimum row height in inches, `max_rows` caps data rows per slide and
+    `column_widths` gives relative column widths (even by default).
+    """
+    headers = [str(text) for text in headers]
+    rows = as_rows(rows)
+    header_height, pages = paginate_rows(headers, rows, font_size, row_height, max_rows, column_widths)
+
+    slides = []
+    for page, (page_rows, heights) in enumerate(pages):
+        slide = _add_header_slide(prs, _page_title(title, page, len(pages)), rtl)
+        row_heights = [int(Inches(h)) for h in [header_height] + heights]
+        add_table(slide, headers, page_rows, row_heights, font_size, column_widths, rtl)
+        slides.append(slide)
+
+    return slides[0] if len(slides) == 1 else slides
+
+def add_chart_slide(prs, title, categories, series, chart_type="line", number_format=None, rtl=False):
+    """Add a slide with a native chart
+
+    `series` is a list of {"name", "values", "color"} mappings, one value per
+    category; "color" ("RRGGBB") is optional. `chart_type` is one of
+    CHART_TYPES. Values are drawn as given, so long series should be
+    downsampled first.
+    """
+    if chart_type not in CHART_TYPES:
+        raise ValueError(f"Unknown chart type: {chart_type!r} (expected one of {', '.join(CHART_TYPES)})")
+    slide = _add_header_slide(prs, title, rtl)
+
+    data = CategoryChartData(number_format=number_format or "General")
+    data.categories = [str(category) for category in categories]
+    for item in series:
+        data.add_series(str(item["name"]), [None if value is None else float(value) for value in item["values"]])
+
+    chart = slide.shapes.add_chart(CHART_TYPES[chart_type], Inches(0.5), Inches(1.5), Inches(12.333),
+                                   Inches(5.7), data).chart
+    stamp_chart_workbook(chart)
+    chart.font.size = Pt(14)
+    chart.font.color.rgb = DARK_BLUE
+    chart.has_legend = len(series) > 1
+    if chart.has_legend:
+        chart.legend.position = XL_LEGEND_POSITION.BOTTOM
+        chart.legend.include_in_layout = False
+    if rtl:
+        # Categories run right to left, with the value axis on the right
+        chart.category_axis.reverse_order = True
+    for plot_series, item in zip(chart.plots[0].series, series):
+        if chart_type == "line":
+            plot_series.smooth = False
+            plot_series.marker.style = XL_MARKER_STYLE.NONE
+        if item.get("color"):
+            color = RGBColor.from_string(item["color"])
+            if chart_type == "line":
+                plot_series.format.line.color.rgb = color
+                plot_series.format.line.width = Pt(2.25)
+            else:
+                plot_series.format.fill.solid()
+                plot_series.format.fill.fore_color.rgb = color
+    return slide
+
+def add_architecture_slide(prs, locale=None, rtl=False):
+    """Add architecture diagram slide"""
+    slide = _add_header_slide(prs, _bilingual("System Architecture", "هيكل النظام", locale), rtl)
+
+    # Architecture boxes
+    layers = [
+        (("Presentation Layer", "واجهة المستخدم"), 1, Inches(1.8), PRIMARY_BLUE),
+        (("State Management", "إدارة الحالة (BLoC)"), 1, Inches(3.2), RGBColor(129, 140, 248)),
+        (("Service Layer", "طبقة الخدمات"), 1, Inches(4.6), RGBColor(52, 211, 153)),
+        (("Data Layer", "طبقة البيانات"), 1, Inches(6), RGBColor(251, 191, 36)),
+    ]
+
+    for (en, ar), left, top, color in layers:
+        text = paragraph(_bilingual(en, ar, locale, "\n"), 18, WHITE, bold=True, align="center")
+        add_autoshape(slide, MSO_SHAPE.ROUNDED_RECTANGLE, Inches(_mirror(left, 5, rtl)), top, Inches(5), Inches(1),
+                      color, [text], word_wrap=True)
+
+    # Right side - components
+    components = [
+        ("Screens & Widgets", 7, Inches(1.8)),
+        ("AuthCubit | ChildCubit | AssessmentCubit", 7, Inches(3.2)),
+        ("ScoringService | AIService | ErrorHandler", 7, Inches(4.6)),
+        ("Firebase | Firestore | Gemini AI", 7, Inches(6)),
+    ]
+
+    for text, left, top in components:
+        add_textbox(slide, Inches(_mirror(left, 5.5, rtl)), top, Inches(5.5), Inches(1),
+                    [paragraph(text, 16, DARK_BLUE, align="right" if rtl else "left")])
+
+    # Arrows
+    for i in range(3):
+        add_autoshape(slide, MSO_SHAPE.DOWN_ARROW, Inches(_mirror(3.25, 0.5, rtl)), Inches(2.9 + i * 1.4),
+                      Inches(0.5), Inches(0.3), DARK_BLUE)
+
+    return slide
+
+def add_flow_slide(prs, locale=None, rtl=False):
+    """Add user flow slide; right-to-left decks run the steps from the right"""
+    slide = _add_header_slide(prs, _bilingual("User Flow", "مسار المستخدم", locale), rtl)
+    parent_count = len(app_data()["questions"]["parent"])
+    teacher_count = len(app_data()["questions"]["teacher"])
+
+    # Flow steps
+    steps = [
+        ("1. فتح التطبيق", "Splash Screen"),
+        ("2. التعريف", "Onboarding"),
+        ("3. تسجيل الدخول", "Login/Register"),
+        ("4. الشاشة الرئيسية", "Home Screen"),
+        ("5. إضافة طفل", "Add Child"),
+        ("6. بدء التقييم", "Start Assessment"),
+        ("7. الإجابة", f"{parent_count} / {teacher_count} Questions"),
+        ("8. النتائج", "Results + AI"),
+    ]
+
+    x_start = Inches(0.5)
+    y = Inches(2.5)
+    box_width = Inches(1.4)
+    box_height = Inches(1.5)
+    gap = Inches(0.15)
+
+    for i, (ar_text, en_text) in enumerate(steps):
+        col = len(steps) - 1 - i if rtl else i
+        x = x_start + col * (box_width + gap)
+
+        # Box and text
+        color = PRIMARY_BLUE if i % 2 == 0 else RGBColor(99, 179, 237)
+        text = [paragraph(f"{i + 1}. {en_text}" if locale == "en" else ar_text, 14, WHITE, bold=True, align="center")]
+        if locale is None:
+            text.append(paragraph(en_text, 11, WHITE, align="center"))
+        add_autoshape(slide, MSO_SHAPE.ROUNDED_RECTANGLE, x, y, box_width, box_height, color, text, word_wrap=True)
+
+        # Arrow
+        if i < len(steps) - 1:
+            if rtl:
+                shape, arrow_x = MSO_SHAPE.LEFT_ARROW, x - gap
+            else:
+                shape, arrow_x = MSO_SHAPE.RIGHT_ARROW, x + box_width
+            add_autoshape(slide, shape, arrow_x, y + Inches(0.6), gap, Inches(0.3), DARK_BLUE)
+
+    return slide
+
+def add_score_interpretation_slide(prs, t_score=None, locale=None, rtl=False):
+    """Add score interpretation slide, optionally highlighting a child's T-score"""
+    slide = _add_header_slide(prs, _bilingual("Score Interpretation", "تفسير الدرجات", locale), rtl)
+
+    bands = score_bands(locale)
+    step = Inches(min(1.3, 5.4 / len(bands)))
+    band_height = min(Inches(1), step - Inches(0.2))
+
+    y = Inches(1.8)
+    for (low, high), score_range, label, color, desc in bands:
+        highlighted = t_score is not None and low <= t_score < high
+
+        # Color bar
+        outline, outline_width = (DARK_BLUE, 4) if highlighted else (None, None)
+        add_autoshape(slide, MSO_SHAPE.ROUNDED_RECTANGLE, Inches(_mirror(0.5, 1.5, rtl)), y, Inches(1.5), band_height,
+                      color, [paragraph(score_range, 24, WHITE, bold=True, align="center")],
+                      outline=outline, outline_width=outline_width)
+
+        # Label, at the largest size up to 20pt that fits its box
+        align = "right" if rtl else None
+        size = shrink_to_fit([label], 4.7, band_height / Inches(1), 20, 0, MIN_FONT_PT) or MIN_FONT_PT
+        add_textbox(slide, Inches(_mirror(2.2, 4.7, rtl)), y, Inches(4.7), band_height,
+                    [paragraph(label, size, DARK_BLUE, bold=True, align=align)])
+
+        # Description, after the column the score marker uses
+        add_textbox(slide, Inches(_mirror(8.7, 4.1, rtl)), y, Inches(4.1), band_height,
+                    [paragraph(desc, 18, color, align=align)])
+
+        # Child's score marker, between the label and the description
+        if highlighted:
+            marker = f"T = {t_score:g} ▶" if rtl else f"◀ T = {t_score:g}"
+            add_textbox(slide, Inches(_mirror(6.9, 1.7, rtl)), y, Inches(1.7), band_height,
+                        [paragraph(marker, 22, color, bold=True)])
+
+        y += step
+
+    return slide
+
+def add_question_cards_slide(prs, title, images, captions=None, columns=4, rows=2, rtl=False):
+    """Add slides with a grid of question picture cards, continuing as needed"""
+    pipeline = default_pipeline()
+    if captions is None:
+        captions = [os.path.splitext(os.path.basename(path))[0].replace("_", " ") for path in images]
+
+    per_slide = columns * rows
+    pages = max(1, -(-len(images) // per_slide))
+    cell_w = 12.333 / columns
+    cell_h = 5.6 / rows
+    image_w, image_h = cell_w - 0.3, cell_h - 0.6
+
+    slides = []
+    for page in range(pages):
+        page_title = f"{title} ({page + 1}/{pages})" if pages > 1 else title
+        slide = _add_header_slide(prs, page_title, rtl)
+        slides.append(slide)
+
+        start = page * per_slide
+        for i, (path, caption) in enumerate(zip(images[start:start + per_slide], captions[start:start + per_slide])):
+            col = columns - 1 - i % columns if rtl else i % columns
+            cell_left = 0.5 + col * cell_w
+            cell_top = 1.5 + (i // columns) * cell_h
+
+            # Picture, downsampled to its displayed size and centered in the cell
+            prepared = pipeline.prepare(path, image_w, image_h)
+            width, height = pipeline.fitted_size(prepared, image_w, image_h)
+            slide.shapes.add_picture(
+                prepared,
+                Inches(cell_left + (cell_w - width) / 2), Inches(cell_top + (image_h - height) / 2),
+                Inches(width), Inches(height)
+            )
+
+            # Caption
+            add_textbox(slide, Inches(cell_left), Inches(cell_top + image_h + 0.05), Inches(cell_w), Inches(0.5),
+                        [paragraph(caption, 14, DARK_BLUE, align="center")], word_wrap=True)
+
+    return slides
+
+def add_questions_table_slide(prs, questions="parent", title=None, rtl=False, locale=None):
+    """Add a table of the app's parent or teacher questions, in English and Arabic unless `locale` is set"""
+    title = title or _bilingual(*QUESTION_SET_TITLES[questions], locale)
+    items = app_data()["questions"][questions]
+    if locale is None:
+        headers, widths = ["#", "Question", "السؤال"], [0.6, 5, 5]
+        rows = [[str(i + 1), question["en"], question["ar"]] for i, question in enumerate(items)]
+    else:
+        headers, widths = ["#", _bilingual("Question", "السؤال", locale)], [0.6, 10]
+        rows = [[str(i + 1), question[locale]] for i, question in enumerate(items)]
+    return add_table_slide(
+        prs, title, headers, rows,
+        rtl=rtl, font_size=14, row_height=0.4, column_widths=widths,
+    )
+
+def add_norms_table_slide(prs, assessment="parent", gender="male", title=None, rtl=False, locale=None):
+    """Add the SDQ T-score norm grid (raw score x age group) for one assessment type and gender"""
+    grid = app_data()["t_scores"][assessment][gender]
+    groups = list(grid)
+    rows = [[str(raw)] + [str(grid[group][raw]) for group in groups] for raw in range(len(grid[groups[0]]))]
+    if locale is None:
+        title = title or f"T-Score Norms: {assessment.title()}, {gender.title()} - معايير الدرجة التائية"
+        headers = ["Raw Score"] + [f"Age {group}" for group in groups]
+    else:
+        # Assessment and gender names come from the app's own translations
+        names = f"{translate(assessment, locale)}, {translate(gender, locale)}"
+        title = title or _bilingual(f"T-Score Norms: {names}", f"معايير الدرجة التائية: {names}", locale)
+        age = translate("age", locale)
+        headers = [_bilingual("Raw Score", "الدرجة الخام", locale)] + [f"{age} {group}" for group in groups]
+    return add_table_slide(
+        prs, title, headers, rows,
+        rtl=rtl, font_size=14, row_height=0.4,
+    )
+
+def _text_widths(headers, rows):
+    """Relative column widths from the longest line in each column"""
+    widths = []
+    for column, header in enumerate(headers):
+        cells = [header] + [str(row[column]) for row in rows]
+        widths.append(max(8, max(len(line) for cell in cells for line in cell.split("\n"))))
+    return widths
+
+def add_markdown_slides(prs, file, sections=None, title=None, rtl=False, overflow="paginate"):
+    """Add slides for the lists, text and tables of a Markdown file
+
+    Each heading's lists and text lines become a content slide titled with
+    the heading (or `title`), and each table a table slide. `sections` keeps
+    only the headings containing one of the given strings. Mermaid blocks are
+    left to the "mermaid" slide type. Returns the list of slides added.
+    """
+    wanted = [name.casefold() for name in sections] if sections else None
+    slides = []
+    for section in load_markdown(file)["sections"]:
+        if wanted and not any(name in section["title"].casefold() for name in wanted):
+            continue
+        items = []
+        for block in section["blocks"] + [None]:
+            if block is not None and block["kind"] in ("list", "text"):
+                items += block["items"]
+                continue
+            if items:
+                added = add_content_slide(prs, title or section["title"], items, rtl=rtl, overflow=overflow)
+                slides += added if isinstance(added, list) else [added]
+                items = []
+            if block is not None and block["kind"] == "table":
+                widths = _text_widths(block["headers"], block["rows"])
+                added = add_table_slide(prs, title or section["title"], block["headers"], block["rows"], rtl=rtl,
+                                        font_size=14, row_height=0.4, column_widths=widths)
+                slides += added if isinstance(added, list) else [added]
+    return slides
+
+def score_band(t_score, locale=None):
+    """Return the (label, description) of the band a T-score falls in"""
+    bands = score_bands(locale)
+    for (low, high), _, label, _, desc in bands:
+        if low <= t_score < high:
+            return label, desc
+    return bands[-1][2], bands[-1][4]
+
+
+# Spec slide types -> builders
+BUILDERS = {
+    "title": add_title_slide,
+    "section": add_section_slide,
+    "content": add_content_slide,
+    "two_column": add_two_column_slide,
+    "table": add_table_slide,
+    "chart": add_chart_slide,
+    "architecture": add_architecture_slide,
+    "flow": add_flow_slide,
+    "score_interpretation": add_score_interpretation_slide,
+    "mermaid": add_mermaid_slide,
+    "markdown": add_markdown_slides,
+    "question_cards": add_question_cards_slide,
+    "questions_table": add_questions_table_slide,
+    "norms_table": add_norms_table_slide,
+}
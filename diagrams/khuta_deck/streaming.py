@@ -0,0 +1,233 @@
+"""
+Khuta App - Streaming Writer
+Writes a deck into its zip container slide by slide as it is built
+
+Slides are built into a scratch presentation, serialized into the output
+zip together with their images, and then dropped from the scratch
+presentation so their XML trees can be freed. The presentation part, its
+relationships and [Content_Types].xml are written last, once every slide is
+known. Memory therefore stays flat however long the deck is. It also avoids
+python-pptx's linear scan for the next free slide partname, which makes
+adding slides to one large presentation quadratic.
+"""
+
+import hashlib
+import os
+import re
+import time
+import zipfile
+from collections import namedtuple
+
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.opc.oxml import CT_Relationships, serialize_part_xml
+from pptx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI, PackURI
+from pptx.opc.serialized import _ContentTypesItem
+
+from .reproducible import write_member
+
+# Slide ids start at 256 in PresentationML
+FIRST_SLIDE_ID = 256
+
+# Splits "/ppt/media/image12.png" into ("/ppt/media/image", "12", "png")
+_PARTNAME = re.compile(r"^(.*?)(\d*)\.(\w+)$")
+
+# Enough of a part for _ContentTypesItem to type it
+_WrittenPart = namedtuple("_WrittenPart", "partname content_type")
+
+
+class CapturedPart:
+    """A built slide, or a part only it uses, detached from its presentation
+
+    Each relationship is (rId, reltype, target, external), where the target
+    is an external URL, the PackURI of a template part, or another
+    CapturedPart. Pictures carry a content key so decks store each once.
+    """
+
+    __slots__ = ("partname", "content_type", "blob", "rels", "media_key")
+
+    def __init__(self, part):
+        self.partname = part.partname
+        self.content_type = part.content_type
+        self.blob = part.blob
+        self.rels = []
+        self.media_key = None
+        if part.partname.startswith("/ppt/media/"):
+            self.media_key = (part.partname.ext, getattr(part, "sha1", None) or hashlib.sha1(self.blob).hexdigest())
+
+
+def capture(part, shared, seen=None):
+    """Capture a part and the parts it relates to that are not in `shared` (ids of template parts)"""
+    seen = {} if seen is None else seen
+    captured = seen[id(part)] = CapturedPart(part)
+    for rId, rel in sorted(part.rels.items(), key=lambda item: _rid_order(item[0])):
+        if rel.is_external:
+            target = rel.target_ref
+        elif id(rel.target_part) in shared:
+            target = rel.target_part.partname
+        else:
+            target = seen.get(id(rel.target_part)) or capture(rel.target_part, shared, seen)
+        captured.rels.append((rId, rel.reltype, target, rel.is_external))
+    return captured
+
+
+def drop_slide(prs, slide):
+    """Remove a slide from a presentation so its part can be freed"""
+    sldIdLst = prs.slides._sldIdLst
+    for sldId in sldIdLst.sldId_lst:
+        if prs.part.related_part(sldId.rId) is slide.part:
+            sldIdLst.remove(sldId)
+            prs.part.drop_rel(sldId.rId)
+
+
+def template_parts(prs):
+    """Ids of the parts a presentation has before any slide is added"""
+    return {id(part) for part in prs.part.package.iter_parts()}
+
+
+class StreamingWriter:
+    """Serialize slides into a .pptx zip as they are added
+
+    `prs` is the scratch presentation slides are built in. Call `add(slide)`
+    for each finished slide in deck order, or `add_captured` for slides
+    captured earlier, and `close()` once at the end.
+    """
+
+    def __init__(self, prs, file):
+        self.prs = prs
+        self.zip = zipfile.ZipFile(file, "w", zipfile.ZIP_DEFLATED)
+        self.write_seconds = 0.0
+        # Parts of the template itself keep their names and are written at close()
+        self.shared = template_parts(prs)
+        self._written = []
+        self.slides = []
+        self._counters = {}
+        self._media = {}
+        # New parts are numbered after the template's own, e.g. its logo image
+        for part in prs.part.package.iter_parts():
+            prefix, index, ext = _PARTNAME.match(part.partname).groups()
+            key = (prefix, ext)
+            self._counters[key] = max(self._counters.get(key, 0), int(index or 0))
+
+    def _write(self, partname, blob):
+        write_member(self.zip, PackURI(partname).membername, blob)
+
+    def _next_partname(self, template):
+        prefix, _, ext = _PARTNAME.match(template).groups()
+        index = self._counters.get((prefix, ext), 0) + 1
+        self._counters[(prefix, ext)] = index
+        return PackURI(f"{prefix}{index}.{ext}")
+
+    def _shared_partname(self, partname):
+        """Output name of a template part that a slide relates to"""
+        return partname
+
+    def _target_partname(self, captured, names):
+        """Return the output name of a captured part, writing it out on first sight"""
+        if id(captured) in names:
+            return names[id(captured)]
+        if captured.media_key is not None:
+            # The same picture on many slides is stored once
+            partname = self._media.get(captured.media_key)
+            if partname is None:
+                partname = self._media[captured.media_key] = self._next_partname(captured.partname)
+                self._write(partname, captured.blob)
+                self._written.append(_WrittenPart(partname, captured.content_type))
+            names[id(captured)] = partname
+            return partname
+        return self._write_part(captured, self._next_partname(captured.partname), names)
+
+    def _write_part(self, captured, partname, names):
+        """Write a captured part and, recursively, the parts it relates to"""
+        names[id(captured)] = partname
+        rels = CT_Relationships.new()
+        for rId, reltype, target, external in captured.rels:
+            if not external:
+                if isinstance(target, CapturedPart):
+                    target = self._target_partname(target, names)
+                else:
+                    target = self._shared_partname(target)
+                target = target.relative_ref(partname.baseURI)
+            rels.add_rel(rId, reltype, target, external)
+        self._write(partname, captured.blob)
+        if captured.rels:
+            self._write(partname.rels_uri, rels.xml_file_bytes)
+        self._written.append(_WrittenPart(partname, captured.content_type))
+        return partname
+
+    def add_captured(self, captured):
+        """Write a captured slide as the next slide of the deck"""
+        start = time.perf_counter()
+        self.slides.append(self._write_part(captured, self._next_partname("/ppt/slides/slide.xml"), {}))
+        self.write_seconds += time.perf_counter() - start
+
+    def add(self, slide):
+        """Write a finished slide and drop it from the scratch presentation"""
+        start = time.perf_counter()
+        captured = capture(slide.part, self.shared)
+        drop_slide(self.prs, slide)
+        self.write_seconds += time.perf_counter() - start
+        self.add_captured(captured)
+
+    def close(self):
+        """Write the presentation, template parts and content types, then close the zip"""
+        start = time.perf_counter()
+        prs_part = self.prs.part
+        sldIdLst = self.prs.slides._sldIdLst
+
+        # Slide relationships get ids after every id the presentation part already uses
+        next_rId = max((_rid_order(rId) for rId in prs_part.rels.keys()), default=0) + 1
+        slide_rels = []
+        for index, partname in enumerate(self.slides):
+            rId = f"rId{next_rId + index}"
+            sldIdLst._add_sldId(id=FIRST_SLIDE_ID + index, rId=rId)
+            slide_rels.append((rId, partname))
+
+        package = prs_part.package
+        parts = list(package.iter_parts())
+        for part in parts:
+            self._write(part.partname, part.blob)
+            if part is prs_part:
+                rels = CT_Relationships.new()
+                for rId, rel in sorted(part.rels.items(), key=lambda item: _rid_order(item[0])):
+                    rels.add_rel(rId, rel.reltype, rel.target_ref, rel.is_external)
+                for rId, partname in slide_rels:
+                    rels.add_rel(rId, RT.SLIDE, partname.relative_ref(part.partname.baseURI), False)
+                self._write(part.partname.rels_uri, rels.xml_file_bytes)
+            elif len(part.rels):
+                self._write(part.partname.rels_uri, part.rels.xml)
+        self._write(PACKAGE_URI.rels_uri, package._rels.xml)
+
+        written = parts + self._written
+        self._write(CONTENT_TYPES_URI, serialize_part_xml(_ContentTypesItem.xml_for(written)))
+        self.zip.close()
+
+        # Leave the scratch presentation as it was
+        for sldId in sldIdLst.sldId_lst:
+            sldIdLst.remove(sldId)
+        self.write_seconds += time.perf_counter() - start
+
+
+def _rid_order(rId):
+    return int(rId[3:]) if rId.startswith("rId") and rId[3:].isdigit() else 0
+
+
+def stream_deck(engine, spec, output_path, cache=None, keys=None, profiler=None):
+    """Build a spec straight into `output_path`, returning the seconds spent writing
+
+    The deck is written to a temporary file beside the output and moved into
+    place when complete, so a failed build never leaves a truncated deck.
+    """
+    prs = engine.new_presentation(profiler)
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    writer = StreamingWriter(prs, tmp_path)
+    try:
+        for slides in engine.iter_slides(prs, spec, cache, keys, profiler):
+            for slide in slides:
+                writer.add(slide)
+        writer.close()
+    except BaseException:
+        writer.zip.close()
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, output_path)
+    return writer.write_seconds
@@ -0,0 +1,152 @@
+"""
+Khuta App - Table XML
+Emits Khuta-styled tables as graphicFrame XML in one pass and splits long
+tables into slide-sized pages
+
+Setting text, fill and font cell by cell through python-pptx costs several
+element lookups per property; building the XML string directly is many
+times faster and produces the same markup. Row heights are estimated with
+the text_layout metrics so pages never run off the slide.
+"""
+
+from xml.sax.saxutils import escape
+
+from pptx.oxml import parse_xml
+from pptx.util import Emu, Inches
+
+from .deck_theme import PRIMARY_BLUE, DARK_BLUE, LIGHT_GRAY, WHITE
+from .text_layout import LINE_SPACING, default_metrics
+
+TABLE_LEFT = Inches(0.667)
+TABLE_TOP = Inches(1.8)
+TABLE_WIDTH = Inches(12)
+
+# Room below TABLE_TOP before the bottom margin, in inches
+MAX_TABLE_HEIGHT = 5.4
+
+# Cell margins PowerPoint applies (0.1" sides, 0.05" top/bottom), in inches
+CELL_MARGIN_X = 0.1
+CELL_MARGIN_Y = 0.05
+
+# Medium Style 2 - Accent 1
+TABLE_STYLE_ID = "{5C22544A-7EE6-4342-B048-85BDC9FD1C3A}"
+
+_NSMAP = (
+    'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+    'xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main"'
+)
+
+
+def as_rows(rows):
+    """Return table rows as a list of lists of strings
+
+    Accepts any iterable of rows, including a NumPy array (via `tolist`).
+    """
+    if hasattr(rows, "tolist"):
+        rows = rows.tolist()
+    return [["" if value is None else str(value) for value in row] for row in rows]
+
+
+# A cell the row data has no value for, left unstyled like a fresh python-pptx cell
+_EMPTY_CELL = "<a:tc><a:txBody><a:bodyPr/><a:lstStyle/><a:p/></a:txBody><a:tcPr/></a:tc>"
+
+
+def _fill(color):
+    return f'<a:solidFill><a:srgbClr val="{color}"/></a:solidFill>'
+
+
+def _cell(text, size, color, bold, fill):
+    """One table cell, with a paragraph in the cell's font for each line of `text`"""
+    bold_attr = ' b="1"' if bold else ""
+    ppr = f'<a:pPr algn="ctr"><a:defRPr{bold_attr} sz="{size * 100}">{_fill(color)}</a:defRPr></a:pPr>'
+    paragraphs = []
+    for line in text.split("\n"):
+        run = f"<a:r><a:t>{escape(line)}</a:t></a:r>" if line else ""
+        paragraphs.append(f"<a:p>{ppr}{run}</a:p>")
+    tcpr = f"<a:tcPr>{_fill(fill)}</a:tcPr>" if fill else "<a:tcPr/>"
+    return f'<a:tc><a:txBody><a:bodyPr/><a:lstStyle/>{"".join(paragraphs)}</a:txBody>{tcpr}</a:tc>'
+
+
+def column_widths(num_cols, weights=None):
+    """EMU width of each column, split evenly or in proportion to `weights`"""
+    if not weights:
+        return [int(TABLE_WIDTH / num_cols)] * num_cols
+    if len(weights) != num_cols:
+        raise ValueError(f"Expected {num_cols} column widths, got {len(weights)}")
+    total = sum(weights)
+    return [int(TABLE_WIDTH * w / total) for w in weights]
+
+
+def table_xml(shape_id, headers, rows, row_heights, font_size=16, weights=None, rtl=False):
+    """Return the graphicFrame XML for a header row plus data rows
+
+    `row_heights` holds EMU heights for the header and each data row; `rtl`
+    lays the columns out right to left.
+    """
+    num_cols = len(headers)
+    rtl_attr = ' rtl="1"' if rtl else ""
+    header_size = font_size + 2
+    grid = "".join(f'<a:gridCol w="{w}"/>' for w in column_widths(num_cols, weights))
+
+    parts = [
+        f'<p:graphicFrame {_NSMAP}><p:nvGraphicFramePr>'
+        f'<p:cNvPr id="{shape_id}" name="Table {shape_id - 1}"/>'
+        f'<p:cNvGraphicFramePr><a:graphicFrameLocks noGrp="1"/></p:cNvGraphicFramePr><p:nvPr/>'
+        f'</p:nvGraphicFramePr><p:xfrm><a:off x="{TABLE_LEFT}" y="{TABLE_TOP}"/>'
+        f'<a:ext cx="{TABLE_WIDTH}" cy="{sum(row_heights)}"/></p:xfrm>'
+        f'<a:graphic><a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/table">'
+        f'<a:tbl><a:tblPr firstRow="1" bandRow="1"{rtl_attr}><a:tableStyleId>{TABLE_STYLE_ID}</a:tableStyleId></a:tblPr>'
+        f'<a:tblGrid>{grid}</a:tblGrid>'
+    ]
+
+    header = "".join(_cell(text, header_size, WHITE, True, PRIMARY_BLUE) for text in headers)
+    parts.append(f'<a:tr h="{row_heights[0]}">{header}</a:tr>')
+    for row_idx, row in enumerate(rows):
+        fill = LIGHT_GRAY if row_idx % 2 == 0 else None
+        cells = "".join(_cell(text, font_size, DARK_BLUE, False, fill) for text in row[:num_cols])
+        cells += _EMPTY_CELL * (num_cols - len(row))
+        parts.append(f'<a:tr h="{row_heights[row_idx + 1]}">{cells}</a:tr>')
+
+    parts.append("</a:tbl></a:graphicData></a:graphic></p:graphicFrame>")
+    return "".join(parts)
+
+
+def add_table(slide, headers, rows, row_heights, font_size=16, weights=None, rtl=False):
+    """Append a Khuta table to a slide's shape tree and return its element"""
+    shape_id = slide.shapes._next_shape_id
+    frame = parse_xml(table_xml(shape_id, headers, rows, row_heights, font_size, weights, rtl).encode("utf-8"))
+    slide.shapes._spTree.append(frame)
+    return frame
+
+
+def row_height(row, widths, font_size, min_height):
+    """Estimated height of a row in inches, from the lines its tallest cell wraps to"""
+    metrics = default_metrics()
+    lines = max((
+        metrics.count_lines(text, (Emu(width).inches - 2 * CELL_MARGIN_X) * 72, font_size)
+        for text, width in zip(row, widths)
+    ), default=1)
+    return max(min_height, lines * font_size * LINE_SPACING / 72 + 2 * CELL_MARGIN_Y)
+
+
+def paginate_rows(headers, rows, font_size=16, min_row_height=0.5, max_rows=None, weights=None):
+    """Split data rows into pages that fit under the header on one slide
+
+    Returns (header height, [(rows, row heights)]) with heights in inches.
+    """
+    widths = column_widths(len(headers), weights)
+    header_height = row_height(headers, widths, font_size + 2, min_row_height)
+
+    pages, page, heights, used = [], [], [], header_height
+    for row in rows:
+        height = row_height(row, widths, font_size, min_row_height)
+        full = used + height > MAX_TABLE_HEIGHT or (max_rows and len(page) >= max_rows)
+        if page and full:
+            pages.append((page, heights))
+            page, heights, used = [], [], header_height
+        page.append(row)
+        heights.append(height)
+        used += height
+    if page or not pages:
+        pages.append((page, heights))
+    return header_height, pages
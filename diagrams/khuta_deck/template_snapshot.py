@@ -0,0 +1,99 @@
+"""
+Khuta App - Template Snapshot
+Prepares the base template once and keeps it as a ready-made package on disk
+
+The base every deck starts from (16:9 size, Khuta layouts with the logo, the
+Khuta palette in the theme, fixed document properties) is saved to the build
+cache under a hash of the template and of the code that prepares it. Later
+processes load those bytes instead of preparing the template again, and
+DeckEngine clones the loaded base for each deck it builds.
+"""
+
+import hashlib
+import io
+import os
+
+from . import BUILD_CACHE_DIR
+
+SNAPSHOT_DIR = os.path.join(BUILD_CACHE_DIR, "templates")
+
+# Modules whose code shapes the prepared base
+_SOURCE_MODULES = ("template_snapshot.py", "deck_layouts.py", "deck_theme.py", "media.py",
+                   "reproducible.py")
+
+_A_NS = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+
+
+def apply_theme_colors(prs):
+    """Set the theme's color scheme slots to the Khuta palette"""
+    from lxml import etree
+    from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+
+    from .deck_theme import THEME_COLORS
+
+    theme_part = prs.slide_master.part.part_related_by(RT.THEME)
+    theme = etree.fromstring(theme_part.blob)
+    scheme = theme.find(f"{_A_NS}themeElements/{_A_NS}clrScheme")
+    scheme.set("name", "Khuta")
+    for slot, color in THEME_COLORS.items():
+        element = scheme.find(f"{_A_NS}{slot}")
+        for child in list(element):
+            element.remove(child)
+        etree.SubElement(element, f"{_A_NS}srgbClr", val=str(color))
+    theme_part._blob = etree.tostring(theme, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+
+def prepare_base(template=None):
+    """Return the template with the deck-wide settings applied"""
+    from pptx import Presentation
+
+    from .deck_layouts import install_layouts
+    from .deck_theme import SLIDE_WIDTH, SLIDE_HEIGHT
+    from .reproducible import stamp_core_properties
+
+    base = Presentation(template)
+    base.slide_width = SLIDE_WIDTH
+    base.slide_height = SLIDE_HEIGHT
+    apply_theme_colors(base)
+    install_layouts(base)
+    stamp_core_properties(base)
+    return base
+
+
+def snapshot_key(template=None):
+    """Hash of the template file, the preparing code and the logo"""
+    import pptx
+
+    from .app_data import LOGO_PATH
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256(pptx.__version__.encode("ascii"))
+    paths = [os.path.join(here, name) for name in _SOURCE_MODULES]
+    paths += [path for path in (template, LOGO_PATH) if path and os.path.exists(path)]
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+def load_snapshot(template=None, snapshot_dir=SNAPSHOT_DIR):
+    """Bytes of the prepared base package, prepared and saved on first use"""
+    path = os.path.join(snapshot_dir, f"{snapshot_key(template)[:32]}.pptx")
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        pass
+
+    from .reproducible import save_presentation
+
+    buffer = io.BytesIO()
+    save_presentation(prepare_base(template), buffer)
+    data = buffer.getvalue()
+    os.makedirs(snapshot_dir, exist_ok=True)
+    # Write then rename, so concurrent builds never read a partial snapshot
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return data
@@ -0,0 +1,270 @@
+"""
+Khuta App - Text Layout
+Measures slide text with the bundled NotoSansArabic metrics and fits bullet
+lists to their boxes, by shrinking the text or spilling it onto continuation
+slides
+
+Widths come from the font's nominal glyph advances (cmap + hmtx). Contextual
+Arabic forms and kerning are not applied, so measurements are a close
+estimate and fitting keeps a small safety margin. The codepoint -> advance
+table is cached on disk per font file.
+"""
+
+import hashlib
+import json
+import os
+import struct
+from functools import lru_cache
+
+from . import BUILD_CACHE_DIR, DIAGRAMS_DIR
+
+FONT_PATH = os.path.join(DIAGRAMS_DIR, "..", "assets", "fonts", "NotoSansArabic-Regular.ttf")
+FONT_CACHE_DIR = os.path.join(BUILD_CACHE_DIR, "fonts")
+
+# Advance (in em) for characters the font has no glyph for, e.g. emoji or CJK
+# text that PowerPoint renders with a fallback font
+FALLBACK_ADVANCE_EM = 0.55
+
+# Line height as a multiple of font size, matching single spacing
+LINE_SPACING = 1.2
+
+# Text frame insets PowerPoint applies to textboxes (0.1" sides, 0.05" top/bottom)
+INSET_X_PT = 7.2
+INSET_Y_PT = 3.6
+
+# Measured widths are padded by this factor before fitting
+SAFETY = 1.05
+
+OVERFLOW_MODES = ("paginate", "shrink", "none")
+
+# Smallest size "shrink" reduces body text to before it paginates
+MIN_FONT_PT = 14
+
+
+def _read_tables(data):
+    num_tables = struct.unpack_from(">H", data, 4)[0]
+    tables = {}
+    for i in range(num_tables):
+        tag, _, offset, length = struct.unpack_from(">4sIII", data, 12 + 16 * i)
+        tables[tag.decode("latin-1")] = (offset, length)
+    return tables
+
+
+def _cmap_format4(data, offset):
+    seg_count = struct.unpack_from(">H", data, offset + 6)[0] // 2
+    ends = struct.unpack_from(f">{seg_count}H", data, offset + 14)
+    starts_at = offset + 16 + 2 * seg_count
+    starts = struct.unpack_from(f">{seg_count}H", data, starts_at)
+    deltas = struct.unpack_from(f">{seg_count}h", data, starts_at + 2 * seg_count)
+    range_at = starts_at + 4 * seg_count
+    range_offsets = struct.unpack_from(f">{seg_count}H", data, range_at)
+
+    mapping = {}
+    for i in range(seg_count):
+        for code in range(starts[i], ends[i] + 1):
+            if code == 0xFFFF:
+                continue
+            if range_offsets[i] == 0:
+                glyph = (code + deltas[i]) & 0xFFFF
+            else:
+                at = range_at + 2 * i + range_offsets[i] + 2 * (code - starts[i])
+                glyph = struct.unpack_from(">H", data, at)[0]
+                if glyph:
+                    glyph = (glyph + deltas[i]) & 0xFFFF
+            if glyph:
+                mapping[code] = glyph
+    return mapping
+
+
+def _cmap_format12(data, offset):
+    groups = struct.unpack_from(">I", data, offset + 12)[0]
+    mapping = {}
+    for i in range(groups):
+        start, end, glyph = struct.unpack_from(">III", data, offset + 16 + 12 * i)
+        for code in range(start, end + 1):
+            mapping[code] = glyph + code - start
+    return mapping
+
+
+def parse_advances(path):
+    """Return (unitsPerEm, {codepoint: advance}) read from a TrueType font"""
+    with open(path, "rb") as f:
+        data = f.read()
+    tables = _read_tables(data)
+    units_per_em = struct.unpack_from(">H", data, tables["head"][0] + 18)[0]
+    num_metrics = struct.unpack_from(">H", data, tables["hhea"][0] + 34)[0]
+    hmtx = tables["hmtx"][0]
+    # hmtx holds (advanceWidth, lsb) pairs; glyphs past the last pair reuse its advance
+    advances = struct.unpack_from(">" + "Hxx" * num_metrics, data, hmtx)
+
+    cmap = tables["cmap"][0]
+    count = struct.unpack_from(">H", data, cmap + 2)[0]
+    subtables = {}
+    for i in range(count):
+        platform, encoding, offset = struct.unpack_from(">HHI", data, cmap + 4 + 8 * i)
+        fmt = struct.unpack_from(">H", data, cmap + offset)[0]
+        subtables[(platform, encoding, fmt)] = cmap + offset
+
+    for key, parser in (((3, 10, 12), _cmap_format12), ((0, 4, 12), _cmap_format12),
+                        ((3, 1, 4), _cmap_format4), ((0, 3, 4), _cmap_format4)):
+        if key in subtables:
+            mapping = parser(data, subtables[key])
+            break
+    else:
+        raise ValueError(f"{path}: no Unicode cmap subtable")
+
+    last = advances[-1]
+    return units_per_em, {
+        code: advances[glyph] if glyph < len(advances) else last
+        for code, glyph in mapping.items()
+    }
+
+
+class FontMetrics:
+    """Cached glyph advances for one font, with fast string measurement"""
+
+    def __init__(self, path=FONT_PATH, cache_dir=FONT_CACHE_DIR):
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        cache_path = os.path.join(cache_dir, f"{digest[:24]}.json") if cache_dir else None
+
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, encoding="utf-8") as f:
+                cached = json.load(f)
+            self.units_per_em = cached["units_per_em"]
+            self._advances = {int(k): v for k, v in cached["advances"].items()}
+        else:
+            self.units_per_em, self._advances = parse_advances(path)
+            if cache_path:
+                os.makedirs(cache_dir, exist_ok=True)
+                with open(cache_path, "w", encoding="utf-8") as f:
+                    json.dump({"units_per_em": self.units_per_em, "advances": self._advances}, f)
+
+        self._fallback = FALLBACK_ADVANCE_EM * self.units_per_em
+        self.word_units = lru_cache(maxsize=65536)(self._word_units)
+        self.count_lines = lru_cache(maxsize=65536)(self._count_lines)
+
+    def _word_units(self, word):
+        get, fallback = self._advances.get, self._fallback
+        return sum(get(ord(ch), fallback) for ch in word)
+
+    def has_glyph(self, ch):
+        """Whether the font maps the character to a glyph"""
+        return ord(ch) in self._advances
+
+    def width(self, text, size_pt):
+        """Width of a single line of text in points"""
+        return self.word_units(text) * size_pt / self.units_per_em
+
+    def _count_lines(self, text, width_pt, size_pt):
+        """Number of lines `text` wraps to in a box `width_pt` wide"""
+        scale = size_pt * SAFETY / self.units_per_em
+        space = self.word_units(" ") * scale
+        lines = 0
+        for hard_line in text.split("\n"):
+            lines += 1
+            used = 0.0
+            for word in hard_line.split(" "):
+                w = self.word_units(word) * scale
+                if used and used + space + w > width_pt:
+                    lines += 1
+                    used = 0.0
+                elif used:
+                    used += space
+                # Words wider than the box break across lines
+                while w > width_pt:
+                    lines += 1
+                    w -= width_pt
+                used += w
+        return lines
+
+    def paragraphs_height(self, items, width_pt, size_pt, space_after_pt):
+        """Height in points of a list of paragraphs set at `size_pt`"""
+        line_height = size_pt * LINE_SPACING
+        return sum(
+            self.count_lines(item, width_pt, size_pt) * line_height + space_after_pt
+            for item in items
+        )
+
+
+_default_metrics = None
+
+
+def default_metrics():
+    """Shared NotoSansArabic metrics used by the slide builders"""
+    global _default_metrics
+    if _default_metrics is None:
+        _default_metrics = FontMetrics()
+    return _default_metrics
+
+
+def _inner_box(width_in, height_in):
+    return width_in * 72 - 2 * INSET_X_PT, height_in * 72 - 2 * INSET_Y_PT
+
+
+def fits(items, width_in, height_in, size_pt, space_after_pt, metrics=None):
+    """True when the paragraphs fit the box at `size_pt`"""
+    metrics = metrics or default_metrics()
+    width_pt, height_pt = _inner_box(width_in, height_in)
+    # The last paragraph's trailing space does not need to fit
+    height = metrics.paragraphs_height(items, width_pt, size_pt, space_after_pt) - space_after_pt
+    return height <= height_pt
+
+
+def shrink_to_fit(items, width_in, height_in, size_pt, space_after_pt, min_size_pt, metrics=None):
+    """Largest whole point size from `size_pt` down to `min_size_pt` that fits, or None
+
+    Space after each paragraph scales with the font size.
+    """
+    size = size_pt
+    while size >= min_size_pt:
+        spacing = space_after_pt * size / size_pt
+        if fits(items, width_in, height_in, size, spacing, metrics):
+            return size
+        size -= 1
+    return None
+
+
+def paginate(items, width_in, height_in, size_pt, space_after_pt, metrics=None):
+    """Split paragraphs into pages that each fit the box at `size_pt`"""
+    metrics = metrics or default_metrics()
+    width_pt, height_pt = _inner_box(width_in, height_in)
+    line_height = size_pt * LINE_SPACING
+
+    pages, page, used = [], [], 0.0
+    for item in items:
+        height = metrics.count_lines(item, width_pt, size_pt) * line_height + space_after_pt
+        # Last paragraph's trailing space does not need to fit
+        if page and used + height - space_after_pt > height_pt:
+            pages.append(page)
+            page, used = [], 0.0
+        page.append(item)
+        used += height
+    if page or not pages:
+        pages.append(page)
+    return pages
+
+
+def check_overflow_mode(overflow):
+    """Raise ValueError for an unknown overflow mode"""
+    if overflow not in OVERFLOW_MODES:
+        raise ValueError(f"Unknown overflow mode: {overflow!r} (expected one of {', '.join(OVERFLOW_MODES)})")
+
+
+def fit_items(items, width_in, height_in, size_pt, space_after_pt, overflow="paginate", min_size_pt=MIN_FONT_PT):
+    """Fit paragraphs to a box; return (size_pt, space_after_pt, pages)
+
+    `overflow` is "paginate" (spill onto more pages at the same size),
+    "shrink" (reduce the size down to `min_size_pt`, then paginate) or
+    "none" (keep everything on one page, even if it overflows).
+    """
+    check_overflow_mode(overflow)
+    if overflow == "none" or fits(items, width_in, height_in, size_pt, space_after_pt):
+        return size_pt, space_after_pt, [list(items)]
+    if overflow == "shrink":
+        size = shrink_to_fit(items, width_in, height_in, size_pt, space_after_pt, min_size_pt)
+        if size is not None:
+            return size, space_after_pt * size / size_pt, [list(items)]
+        space_after_pt = space_after_pt * min_size_pt / size_pt
+        size_pt = min_size_pt
+    return size_pt, space_after_pt, paginate(items, width_in, height_in, size_pt, space_after_pt)
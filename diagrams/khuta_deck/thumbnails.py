@@ -0,0 +1,729 @@
+"""
+Khuta App - Slide Thumbnails
+Renders slide previews to PNG without an office suite
+
+Only the shapes the Khuta builders emit are drawn: rectangles, rounded
+rectangles, arrows, ovals and diamonds, connectors, textboxes, pictures and
+tables, on top of the layout's background and bands. Text is set in the
+bundled NotoSansArabic font. Pillow here has no complex-script support, so
+Arabic letters are joined into their presentation forms and right-to-left
+runs are reordered before drawing. Previews are close, not exact.
+
+Slides are read straight from the .pptx zip, rendered across worker
+processes, and kept in an on-disk cache keyed by the hash of the slide, its
+layout and its pictures, so re-rendering a rebuilt deck only draws the slides
+that changed. Each deck gets one PNG per slide and a contact sheet.
+"""
+
+import hashlib
+import io
+import os
+import re
+import unicodedata
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from lxml import etree
+import PIL
+from PIL import Image, ImageDraw, ImageFont
+
+from . import BUILD_CACHE_DIR
+from .ooxml_geometry import (
+    BODY_INSETS, EMU_PER_PT, NS, R_ID, group_transform, layout_placeholders, ph_key, qn, read_rels,
+)
+from .text_layout import FONT_PATH, LINE_SPACING, default_metrics
+
+THUMBNAIL_CACHE_DIR = os.path.join(BUILD_CACHE_DIR, "thumbnails")
+
+# Thumbnail width in pixels
+DEFAULT_WIDTH = 640
+
+# Contact sheet layout
+CONTACT_COLUMNS = 4
+CONTACT_CELL_WIDTH = 320
+CONTACT_GAP = 12
+
+# System font for characters NotoSansArabic has no glyph for, such as ≤, ≥ and ◀
+FALLBACK_FONT = "DejaVuSans.ttf"
+
+# Modules whose code shapes the rendered PNGs
+_SOURCE_MODULES = ("thumbnails.py", "ooxml_geometry.py", "text_layout.py")
+
+_R_EMBED = f"{{{NS['r']}}}embed"
+
+# Table cell margins PowerPoint applies when tcPr sets none (EMU)
+_CELL_MARGINS = {"marL": 91440, "marT": 45720, "marR": 91440, "marB": 45720}
+
+_DEFAULT_TEXT = {"size": 18.0, "bold": False, "color": (0, 0, 0)}
+_TABLE_BORDER = (217, 217, 217)
+
+_ARABIC = re.compile(r"[؀-ۿݐ-ݿﭐ-﷿ﹰ-﻿]")
+_TOKENS = re.compile(r"\s+|[()\[\]{}]|[^\s()\[\]{}]+")
+_MIRRORED = str.maketrans("()[]{}", ")(][}{")
+
+
+def _renderer_version():
+    """Hash of the rendering code, the font and Pillow, so cached thumbnails are redrawn when they change"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256(PIL.__version__.encode("ascii"))
+    paths = [os.path.join(here, name) for name in _SOURCE_MODULES]
+    if os.path.exists(FONT_PATH):
+        paths.append(FONT_PATH)
+    try:
+        paths.append(ImageFont.truetype(FALLBACK_FONT, 12).path)
+    except OSError:
+        pass
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()[:16]
+
+
+RENDERER_VERSION = _renderer_version()
+
+
+def _rgb(hex_value):
+    return tuple(int(hex_value[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def _solid(el):
+    """RGB of a solidFill child of `el`, None for noFill, ... when neither is given"""
+    if el is None:
+        return ...
+    if el.find("a:noFill", NS) is not None:
+        return None
+    clr = el.find("a:solidFill/a:srgbClr", NS)
+    if clr is not None:
+        return _rgb(clr.get("val"))
+    return ...
+
+
+# Arabic shaping
+
+@lru_cache(maxsize=None)
+def _forms(ch):
+    """Presentation forms of an Arabic letter, by form name"""
+    name = unicodedata.name(ch, "")
+    if not name.startswith("ARABIC LETTER "):
+        return {}
+    forms = {}
+    for form in ("ISOLATED", "FINAL", "INITIAL", "MEDIAL"):
+        try:
+            forms[form] = unicodedata.lookup(f"{name} {form} FORM")
+        except KeyError:
+            pass
+    return forms
+
+
+def _joins_next(ch):
+    return ch == "ـ" or "INITIAL" in _forms(ch)
+
+
+def _joins_prev(ch):
+    return ch == "ـ" or "FINAL" in _forms(ch)
+
+
+@lru_cache(maxsize=None)
+def _lam_alef(alef, form):
+    suffix = unicodedata.name(alef, "").replace("ARABIC LETTER ", "")
+    try:
+        return unicodedata.lookup(f"ARABIC LIGATURE LAM WITH {suffix} {form} FORM")
+    except KeyError:
+        return None
+
+
+def shape_arabic(text):
+    """Replace Arabic letters with their contextual presentation forms"""
+    if not _ARABIC.search(text):
+        return text
+    chars = list(text)
+    # Marks (harakat) are transparent to joining
+    letters = [i for i, ch in enumerate(chars) if unicodedata.category(ch) != "Mn"]
+    out = chars[:]
+    skip = set()
+    for n, i in enumerate(letters):
+        if i in skip:
+            continue
+        ch = chars[i]
+        prev = chars[letters[n - 1]] if n > 0 and letters[n - 1] not in skip else None
+        nxt = chars[letters[n + 1]] if n + 1 < len(letters) else None
+        joined_prev = prev is not None and _joins_next(prev) and _joins_prev(ch)
+        if ch == "ل" and nxt is not None:
+            ligature = _lam_alef(nxt, "FINAL" if joined_prev else "ISOLATED")
+            if ligature:
+                out[i] = ligature
+                out[letters[n + 1]] = ""
+                skip.add(letters[n + 1])
+                continue
+        joined_next = nxt is not None and _joins_next(ch) and _joins_prev(nxt)
+        form = {(True, True): "MEDIAL", (True, False): "FINAL",
+                (False, True): "INITIAL", (False, False): "ISOLATED"}[joined_prev, joined_next]
+        forms = _forms(ch)
+        out[i] = forms.get(form) or forms.get("FINAL" if joined_prev else "ISOLATED") or ch
+    return "".join(out)
+
+
+def _visual_order(tokens, rtl):
+    """Reorder a line's (text, style) tokens for drawing left to right
+
+    Arabic words are reversed in place, and runs of Arabic words (or, in a
+    right-to-left paragraph, of other words) swap order around them. This
+    covers the bilingual titles and Arabic slides without a full bidi pass.
+    """
+    kinds = [_direction(text) for text, _ in tokens]
+    tokens = [(text[::-1], style) if kind == "ar" else (text, style) for (text, style), kind in zip(tokens, kinds)]
+    if rtl:
+        tokens, kinds = tokens[::-1], kinds[::-1]
+    flip = "ltr" if rtl else "ar"
+    result, run = [], []
+    for token, kind in zip(tokens, kinds):
+        if kind == flip or (kind is None and run):
+            run.append((token, kind))
+            continue
+        result += _close_run(run, rtl)
+        run = []
+        result.append(_mirror(token) if rtl and kind is None else token)
+    return result + _close_run(run, rtl)
+
+
+def _direction(token):
+    """"ar" or "ltr" for words, None for spaces and punctuation, which follow their neighbours"""
+    if _ARABIC.search(token):
+        return "ar"
+    return "ltr" if any(ch.isalnum() for ch in token) else None
+
+
+def _mirror(token):
+    # Brackets read right to left take the mirrored glyph
+    return token[0].translate(_MIRRORED), token[1]
+
+
+def _close_run(run, rtl):
+    # Trailing spaces and punctuation stay where they are; the words between swap order
+    tail = []
+    while run and run[-1][1] is None:
+        token = run.pop()[0]
+        tail.insert(0, _mirror(token) if rtl else token)
+    return [token for token, _ in reversed(run)] + tail
+
+
+# Text
+
+@lru_cache(maxsize=None)
+def _font(size_px):
+    return ImageFont.truetype(FONT_PATH, max(1, size_px))
+
+
+@lru_cache(maxsize=None)
+def _fallback_font(size_px):
+    try:
+        return ImageFont.truetype(FALLBACK_FONT, max(1, size_px))
+    except OSError:
+        return None
+
+
+@lru_cache(maxsize=65536)
+def _font_runs(text, size_px):
+    """Split text into (text, font) runs, setting characters the main font lacks in the fallback font"""
+    font, fallback = _font(size_px), _fallback_font(size_px)
+    if fallback is None:
+        return ((text, font),)
+    metrics = default_metrics()
+    runs = []
+    for ch in text:
+        ch_font = font if ch.isspace() or metrics.has_glyph(ch) else fallback
+        if runs and runs[-1][1] is ch_font:
+            runs[-1][0] += ch
+        else:
+            runs.append([ch, ch_font])
+    return tuple((run, run_font) for run, run_font in runs)
+
+
+def _text_length(text, size_px):
+    return sum(run_font.getlength(run) for run, run_font in _font_runs(text, size_px))
+
+
+def _text_style(rpr, base):
+    """Overlay run (or defRPr) properties on a style mapping"""
+    if rpr is None:
+        return base
+    style = dict(base)
+    if rpr.get("sz"):
+        style["size"] = int(rpr.get("sz")) / 100
+    if rpr.get("b") is not None:
+        style["bold"] = rpr.get("b") in ("1", "true")
+    color = _solid(rpr)
+    if color not in (None, ...):
+        style["color"] = color
+    return style
+
+
+def _list_defaults(lst_style):
+    """Paragraph alignment and run style of a list style's first level"""
+    lvl = lst_style.find("a:lvl1pPr", NS) if lst_style is not None else None
+    if lvl is None:
+        return None, _DEFAULT_TEXT
+    return lvl.get("algn"), _text_style(lvl.find("a:defRPr", NS), _DEFAULT_TEXT)
+
+
+class _Renderer:
+    """Draws one slide's shapes onto a Pillow image"""
+
+    def __init__(self, size, width, media):
+        cx, cy = size
+        self.scale = width / cx
+        self.image = Image.new("RGB", (width, max(1, round(cy * self.scale))), "white")
+        self.draw = ImageDraw.Draw(self.image)
+        self.media = media
+
+    def px(self, emu):
+        return emu * self.scale
+
+    def box(self, xfrm, transform):
+        off, ext = xfrm.find("a:off", NS), xfrm.find("a:ext", NS)
+        ox, oy, sx, sy = transform
+        x, y = ox + int(off.get("x")) * sx, oy + int(off.get("y")) * sy
+        w, h = int(ext.get("cx")) * sx, int(ext.get("cy")) * sy
+        return self.px(x), self.px(y), self.px(w), self.px(h)
+
+    # Paragraph layout
+
+    def text(self, tx_body, rect, insets, defaults, anchor="t", wrap=True):
+        """Lay out and draw a txBody inside `rect` (pixels)"""
+        x, y, w, h = rect
+        left, top = x + self.px(insets[0]), y + self.px(insets[1])
+        width = w - self.px(insets[0] + insets[2])
+        height = h - self.px(insets[1] + insets[3])
+        default_align, default_style = defaults
+        lst_align, lst_style = _list_defaults(tx_body.find("a:lstStyle", NS))
+        default_align = lst_align or default_align
+        if tx_body.find("a:lstStyle/a:lvl1pPr", NS) is not None:
+            default_style = lst_style
+
+        lines = []
+        for p in tx_body.findall("a:p", NS):
+            ppr = p.find("a:pPr", NS)
+            align = (ppr.get("algn") if ppr is not None else None) or default_align or "l"
+            para_style = _text_style(ppr.find("a:defRPr", NS) if ppr is not None else None, default_style)
+            runs = []
+            for el in p:
+                if el.tag == qn("a:r"):
+                    runs.append((el.findtext("a:t", "", NS), _text_style(el.find("a:rPr", NS), para_style)))
+                elif el.tag == qn("a:br"):
+                    runs.append(("\n", para_style))
+            text = "".join(t for t, _ in runs)
+            rtl = (ppr is not None and ppr.get("rtl") == "1") or _first_strong_is_arabic(text)
+            lines += self._wrap(runs, para_style, align, rtl, width if wrap else None)
+
+        total = sum(line[0] for line in lines)
+        if anchor == "ctr":
+            top += (height - total) / 2
+        elif anchor == "b":
+            top += height - total
+        for line_height, line_width, align, tokens in lines:
+            if align == "ctr":
+                cursor = left + (width - line_width) / 2
+            elif align == "r":
+                cursor = left + width - line_width
+            else:
+                cursor = left
+            for text, style, size_px in tokens:
+                stroke = max(0, round(size_px / 28)) if style["bold"] else 0
+                # Fallback runs share the main font's baseline
+                baseline = top + line_height - size_px * LINE_SPACING + _font(size_px).getmetrics()[0]
+                for run, font in _font_runs(text, size_px):
+                    self.draw.text((cursor, baseline), run, font=font, anchor="ls",
+                                   fill=style["color"], stroke_width=stroke, stroke_fill=style["color"])
+                    cursor += font.getlength(run)
+            top += line_height
+
+    def _wrap(self, runs, para_style, align, rtl, width):
+        """Break a paragraph's runs into lines of (height, width, align, tokens)"""
+        words = []
+        for text, style in runs:
+            for token in _TOKENS.findall(shape_arabic(text)):
+                words.append((token, style))
+        if not words:
+            return [(self.px(para_style["size"] * EMU_PER_PT) * LINE_SPACING, 0, align, [])]
+
+        lines, current, current_width = [], [], 0.0
+        for token, style in words:
+            size_px = max(1, round(self.px(style["size"] * EMU_PER_PT)))
+            token_width = _text_length(token, size_px)
+            breaks = token == "\n" or (width is not None and current and not token.isspace()
+                                       and current_width + token_width > width)
+            if breaks:
+                lines.append(current)
+                current, current_width = [], 0.0
+                if token.isspace():
+                    continue
+            current.append((token, style, size_px, token_width))
+            current_width += token_width
+        lines.append(current)
+
+        laid_out = []
+        for line in lines:
+            while line and line[-1][0].isspace():
+                line.pop()
+            sizes = [size_px for _, _, size_px, _ in line] or [round(self.px(para_style["size"] * EMU_PER_PT))]
+            ordered = _visual_order([(token, (style, size_px)) for token, style, size_px, _ in line], rtl)
+            laid_out.append((max(sizes) * LINE_SPACING, sum(w for *_, w in line), align,
+                             [(token, style, size_px) for token, (style, size_px) in ordered]))
+        return laid_out
+
+    # Shapes
+
+    def geometry(self, prst, rect, fill, line, line_px, avs):
+        x, y, w, h = rect
+        ss = min(w, h)
+        if prst == "roundRect":
+            radius = ss * avs.get("adj", 16667) / 100000
+            self.draw.rounded_rectangle([x, y, x + w, y + h], radius, fill=fill, outline=line, width=line_px)
+        elif prst in ("ellipse", "flowChartConnector"):
+            self.draw.ellipse([x, y, x + w, y + h], fill=fill, outline=line, width=line_px)
+        elif prst in _POLYGONS:
+            points = [(x + px * w, y + py * h) for px, py in _POLYGONS[prst]]
+            self.draw.polygon(points, fill=fill, outline=line, width=line_px)
+        elif prst in ("rightArrow", "leftArrow", "downArrow", "upArrow"):
+            self.draw.polygon(_arrow(prst, rect, avs), fill=fill, outline=line, width=line_px)
+        else:
+            self.draw.rectangle([x, y, x + w, y + h], fill=fill, outline=line, width=line_px)
+
+    def sp(self, sp, transform, layout_ph):
+        sp_pr = sp.find("p:spPr", NS)
+        ph = sp.find("p:nvSpPr/p:nvPr/p:ph", NS)
+        inherited = layout_ph.get(ph_key(ph)) if ph is not None else None
+        xfrm = sp_pr.find("a:xfrm", NS)
+        if xfrm is None and inherited is not None:
+            xfrm = inherited.find("p:spPr/a:xfrm", NS)
+        if xfrm is None:
+            return
+        rect = self.box(xfrm, transform)
+
+        geom = sp_pr.find("a:prstGeom", NS)
+        fill = _solid(sp_pr)
+        ln = sp_pr.find("a:ln", NS)
+        line = _solid(ln)
+        if sp.find("p:style", NS) is not None:
+            # Shapes python-pptx adds take the theme's accent colors unless set
+            fill = (68, 114, 196) if fill is ... else fill
+            line = (47, 82, 143) if line is ... else line
+        fill, line = (None if fill is ... else fill), (None if line is ... else line)
+        width_emu = int(ln.get("w", EMU_PER_PT)) if ln is not None else EMU_PER_PT
+        line_px = max(1, round(self.px(width_emu))) if line else 0
+        if geom is not None and (fill or line):
+            self.geometry(geom.get("prst"), rect, fill, line, line_px, _adjustments(geom))
+
+        tx_body = sp.find("p:txBody", NS)
+        if tx_body is None:
+            return
+        defaults, body_pr = (None, _DEFAULT_TEXT), tx_body.find("a:bodyPr", NS)
+        if inherited is not None:
+            inherited_body = inherited.find("p:txBody", NS)
+            defaults = _list_defaults(inherited_body.find("a:lstStyle", NS))
+            if len(body_pr.attrib) == 0:
+                body_pr = inherited_body.find("a:bodyPr", NS)
+        insets = [int(body_pr.get(name, default)) for name, default in BODY_INSETS.items()]
+        wrap = body_pr.get("wrap") != "none"
+        self.text(tx_body, rect, insets, defaults, body_pr.get("anchor", "t"), wrap)
+
+    def cxn_sp(self, cxn, transform):
+        sp_pr = cxn.find("p:spPr", NS)
+        xfrm = sp_pr.find("a:xfrm", NS)
+        ln = sp_pr.find("a:ln", NS)
+        color = _solid(ln)
+        if xfrm is None or color is None:
+            return
+        color = (68, 114, 196) if color is ... else color
+        x, y, w, h = self.box(xfrm, transform)
+        x1, x2 = (x + w, x) if xfrm.get("flipH") == "1" else (x, x + w)
+        y1, y2 = (y + h, y) if xfrm.get("flipV") == "1" else (y, y + h)
+        width = max(1, round(self.px(int(ln.get("w", EMU_PER_PT)) if ln is not None else EMU_PER_PT)))
+        self.draw.line([(x1, y1), (x2, y2)], fill=color, width=width)
+        if ln is not None:
+            for end, tip, tail in (("a:headEnd", (x1, y1), (x2, y2)), ("a:tailEnd", (x2, y2), (x1, y1))):
+                head = ln.find(end, NS)
+                if head is not None and head.get("type", "none") != "none":
+                    self.draw.polygon(_arrowhead(tip, tail, width * 3 + 2), fill=color)
+
+    def pic(self, pic, transform):
+        blip = pic.find("p:blipFill/a:blip", NS)
+        xfrm = pic.find("p:spPr/a:xfrm", NS)
+        blob = self.media.get(blip.get(_R_EMBED)) if blip is not None else None
+        if blob is None or xfrm is None:
+            return
+        x, y, w, h = self.box(xfrm, transform)
+        with Image.open(io.BytesIO(blob)) as picture:
+            picture = picture.convert("RGBA").resize((max(1, round(w)), max(1, round(h))), Image.BILINEAR)
+            self.image.paste(picture, (round(x), round(y)), picture)
+
+    def table(self, frame, transform):
+        tbl = frame.find("a:graphic/a:graphicData/a:tbl", NS)
+        xfrm = frame.find("p:xfrm", NS)
+        if tbl is None or xfrm is None:
+            return
+        x, y, _, _ = self.box(xfrm, transform)
+        widths = [self.px(int(col.get("w")) * transform[2]) for col in tbl.findall("a:tblGrid/a:gridCol", NS)]
+        rtl = tbl.find("a:tblPr", NS) is not None and tbl.find("a:tblPr", NS).get("rtl") == "1"
+        lefts, cursor = [], x
+        for col_width in widths:
+            lefts.append(cursor)
+            cursor += col_width
+        if rtl:
+            # The first column sits on the right
+            lefts = [2 * x + sum(widths) - (left + col_width) for left, col_width in zip(lefts, widths)]
+
+        top = y
+        for tr in tbl.findall("a:tr", NS):
+            row_height = self.px(int(tr.get("h")) * transform[3])
+            for col, tc in enumerate(tr.findall("a:tc", NS)[:len(widths)]):
+                rect = (lefts[col], top, widths[col], row_height)
+                tc_pr = tc.find("a:tcPr", NS)
+                fill = _solid(tc_pr)
+                fill = None if fill is ... else fill
+                self.draw.rectangle([rect[0], rect[1], rect[0] + rect[2], rect[1] + rect[3]],
+                                    fill=fill, outline=_TABLE_BORDER)
+                tx_body = tc.find("a:txBody", NS)
+                if tx_body is not None:
+                    margins = [int(tc_pr.get(name, default)) if tc_pr is not None else default
+                               for name, default in _CELL_MARGINS.items()]
+                    anchor = tc_pr.get("anchor", "t") if tc_pr is not None else "t"
+                    self.text(tx_body, rect, margins, (None, _DEFAULT_TEXT), anchor)
+            top += row_height
+
+    def shapes(self, sp_tree, transform=(0, 0, 1, 1), layout_ph=None, skip_placeholders=False):
+        layout_ph = layout_ph or {}
+        for el in sp_tree:
+            if el.tag == qn("p:sp"):
+                if skip_placeholders and el.find("p:nvSpPr/p:nvPr/p:ph", NS) is not None:
+                    continue
+                self.sp(el, transform, layout_ph)
+            elif el.tag == qn("p:cxnSp"):
+                self.cxn_sp(el, transform)
+            elif el.tag == qn("p:pic"):
+                self.pic(el, transform)
+            elif el.tag == qn("p:graphicFrame"):
+                self.table(el, transform)
+            elif el.tag == qn("p:grpSp"):
+                self.shapes(el, group_transform(el, transform), layout_ph, skip_placeholders)
+
+
+def _first_strong_is_arabic(text):
+    for ch in text:
+        if _ARABIC.match(ch):
+            return True
+        if ch.isalpha():
+            return False
+    return False
+
+
+def _adjustments(geom):
+    """Adjust values of a preset geometry, e.g. {"adj": 16667}"""
+    avs = {}
+    for gd in geom.findall("a:avLst/a:gd", NS):
+        formula = gd.get("fmla", "").split()
+        if len(formula) == 2 and formula[0] == "val":
+            avs[gd.get("name")] = int(formula[1])
+    return avs
+
+
+# Unit-square outlines of the other preset shapes the builders use
+_POLYGONS = {
+    "diamond": [(0.5, 0), (1, 0.5), (0.5, 1), (0, 0.5)],
+    "hexagon": [(0.25, 0), (0.75, 0), (1, 0.5), (0.75, 1), (0.25, 1), (0, 0.5)],
+    "parallelogram": [(0.25, 0), (1, 0), (0.75, 1), (0, 1)],
+    "homePlate": [(0, 0), (0.8, 0), (1, 0.5), (0.8, 1), (0, 1)],
+}
+
+
+def _arrow(prst, rect, avs):
+    """Outline of a block arrow, following the preset's adj1 (shaft) and adj2 (head)"""
+    x, y, w, h = rect
+    vertical = prst in ("downArrow", "upArrow")
+    length, breadth = (h, w) if vertical else (w, h)
+    shaft = breadth * avs.get("adj1", 50000) / 100000
+    head = min(w, h) * avs.get("adj2", 50000) / 100000
+    s0, s1 = (breadth - shaft) / 2, (breadth + shaft) / 2
+    # Points along (length, breadth) for an arrow pointing towards +length
+    points = [(0, s0), (length - head, s0), (length - head, 0), (length, breadth / 2),
+              (length - head, breadth), (length - head, s1), (0, s1)]
+    if prst in ("leftArrow", "upArrow"):
+        points = [(length - a, b) for a, b in points]
+    if vertical:
+        return [(x + b, y + a) for a, b in points]
+    return [(x + a, y + b) for a, b in points]
+
+
+def _arrowhead(tip, tail, size):
+    (x1, y1), (x2, y2) = tip, tail
+    dx, dy = x1 - x2, y1 - y2
+    length = (dx * dx + dy * dy) ** 0.5 or 1
+    ux, uy = dx / length, dy / length
+    bx, by = x1 - ux * size, y1 - uy * size
+    return [(x1, y1), (bx - uy * size / 2, by + ux * size / 2), (bx + uy * size / 2, by - ux * size / 2)]
+
+
+def _background(*cslds):
+    for csld in cslds:
+        color = _solid(csld.find("p:bg/p:bgPr", NS))
+        if color not in (None, ...):
+            return color
+    return (255, 255, 255)
+
+
+def render_slide(job):
+    """Render one slide job (slide XML, layout XML, their pictures, slide size, width) to PNG bytes"""
+    slide_xml, layout_xml, media, layout_media, size, width = job
+    slide = etree.fromstring(slide_xml)
+    layout = etree.fromstring(layout_xml) if layout_xml else None
+    renderer = _Renderer(size, width, layout_media)
+    slide_csld = slide.find("p:cSld", NS)
+    layout_csld = layout.find("p:cSld", NS) if layout is not None else None
+
+    layout_ph = {}
+    if layout_csld is not None:
+        renderer.draw.rectangle([0, 0, *renderer.image.size], fill=_background(slide_csld, layout_csld))
+        layout_tree = layout_csld.find("p:spTree", NS)
+        layout_ph = layout_placeholders(layout)
+        renderer.shapes(layout_tree, skip_placeholders=True)
+    else:
+        renderer.draw.rectangle([0, 0, *renderer.image.size], fill=_background(slide_csld))
+    renderer.media = media
+    renderer.shapes(slide_csld.find("p:spTree", NS), layout_ph=layout_ph)
+
+    out = io.BytesIO()
+    renderer.image.save(out, "PNG", optimize=False)
+    return out.getvalue()
+
+
+# Reading decks
+
+def _images(zf, rels):
+    return {rId: zf.read(target) for rId, (reltype, target) in rels.items() if reltype == "image"}
+
+
+def read_slides(path):
+    """Return the slide size and a render job per slide of a .pptx file"""
+    with zipfile.ZipFile(path) as zf:
+        presentation = etree.fromstring(zf.read("ppt/presentation.xml"))
+        sld_sz = presentation.find("p:sldSz", NS)
+        size = (int(sld_sz.get("cx")), int(sld_sz.get("cy")))
+        prs_rels = read_rels(zf, "ppt/presentation.xml")
+        layouts, jobs = {}, []
+        for sld_id in presentation.findall("p:sldIdLst/p:sldId", NS):
+            slide_name = prs_rels[sld_id.get(R_ID)][1]
+            slide_rels = read_rels(zf, slide_name)
+            layout_xml, layout_media = None, {}
+            for reltype, target in slide_rels.values():
+                if reltype == "slideLayout":
+                    if target not in layouts:
+                        layouts[target] = (zf.read(target), _images(zf, read_rels(zf, target)))
+                    layout_xml, layout_media = layouts[target]
+            jobs.append((zf.read(slide_name), layout_xml, _images(zf, slide_rels), layout_media, size))
+    return size, jobs
+
+
+def slide_key(job, width):
+    """Cache key of a render job: hash of the slide, its layout, pictures and the width"""
+    slide_xml, layout_xml, media, layout_media, size = job
+    digest = hashlib.sha256(f"{RENDERER_VERSION}:{width}:{size}".encode("ascii"))
+    digest.update(hashlib.sha256(slide_xml).digest())
+    digest.update(hashlib.sha256(layout_xml or b"").digest())
+    for pictures in (media, layout_media):
+        for rId in sorted(pictures):
+            digest.update(rId.encode("ascii") + hashlib.sha256(pictures[rId]).digest())
+    return digest.hexdigest()
+
+
+class ThumbnailRenderer:
+    """Render deck thumbnails in parallel, reusing cached slide images"""
+
+    def __init__(self, cache_dir=THUMBNAIL_CACHE_DIR, width=DEFAULT_WIDTH, workers=None):
+        self.cache_dir = cache_dir
+        self.width = width
+        self.workers = workers
+        self.hits = 0
+        self.rendered = 0
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.png")
+
+    def render(self, path):
+        """PNG bytes of every slide of a .pptx file, in deck order"""
+        _, jobs = read_slides(path)
+        keys = [slide_key(job, self.width) for job in jobs]
+        images, missing = {}, {}
+        for key, job in zip(keys, jobs):
+            if key in images or key in missing:
+                continue
+            try:
+                with open(self._cache_path(key), "rb") as f:
+                    images[key] = f.read()
+                self.hits += 1
+            except OSError:
+                missing[key] = (*job, self.width)
+
+        if len(missing) > 1 and self.workers != 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                rendered = list(pool.map(render_slide, missing.values(), chunksize=4))
+        else:
+            rendered = [render_slide(job) for job in missing.values()]
+        for key, png in zip(missing, rendered):
+            images[key] = png
+            cache_path = self._cache_path(key)
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(png)
+            os.replace(tmp_path, cache_path)
+        self.rendered += len(missing)
+        return [images[key] for key in keys]
+
+    def write(self, path, out_dir, slides=True, contact=True):
+        """Write slide-NNN.png files and/or contact.png for a deck into `out_dir`; return the paths"""
+        pngs = self.render(path)
+        os.makedirs(out_dir, exist_ok=True)
+        written = []
+        if slides:
+            for index, png in enumerate(pngs, 1):
+                slide_path = os.path.join(out_dir, f"slide-{index:03d}.png")
+                with open(slide_path, "wb") as f:
+                    f.write(png)
+                written.append(slide_path)
+        if contact and pngs:
+            contact_path = os.path.join(out_dir, "contact.png")
+            contact_sheet(pngs).save(contact_path)
+            written.append(contact_path)
+        return written
+
+    def report(self):
+        return f"Thumbnails: {self.rendered} slides rendered, {self.hits} from cache"
+
+
+def contact_sheet(pngs, columns=CONTACT_COLUMNS, cell_width=CONTACT_CELL_WIDTH, gap=CONTACT_GAP):
+    """Tile slide PNGs into one numbered overview image"""
+    thumbs = []
+    for png in pngs:
+        with Image.open(io.BytesIO(png)) as image:
+            height = round(image.height * cell_width / image.width)
+            thumbs.append(image.convert("RGB").resize((cell_width, height), Image.LANCZOS))
+    cell_height = max(thumb.height for thumb in thumbs)
+    label_height = 18
+    columns = min(columns, len(thumbs))
+    rows = (len(thumbs) + columns - 1) // columns
+    sheet = Image.new("RGB", (gap + columns * (cell_width + gap),
+                              gap + rows * (cell_height + label_height + gap)), (230, 230, 230))
+    draw = ImageDraw.Draw(sheet)
+    for index, thumb in enumerate(thumbs):
+        row, col = divmod(index, columns)
+        x = gap + col * (cell_width + gap)
+        y = gap + row * (cell_height + label_height + gap)
+        sheet.paste(thumb, (x, y))
+        draw.text((x, y + cell_height + 2), str(index + 1), font=_font(12), fill=(45, 55, 72))
+    return sheet
+
+
+def thumbnail_dir(out_dir, deck_path):
+    """Folder for one deck's thumbnails: `out_dir`/<deck name>"""
+    return os.path.join(out_dir, os.path.splitext(os.path.basename(deck_path))[0])
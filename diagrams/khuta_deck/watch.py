@@ -0,0 +1,168 @@
+"""
+Khuta App - Watch Mode
+Rebuilds decks as their sources change, patching in only the affected slides
+
+The spec, the files its slides reference (diagram Markdown, pictures), the
+translation catalogs and the app's Dart sources are polled for changes.
+Every spec entry's slides are kept in memory, captured by streaming.py under
+the entry's build-cache key. After a change only the entries whose key moved
+are rebuilt, and the output is reassembled from the captured slides, so a
+round trip costs one entry's build plus writing the zip however long the
+deck is. Changes to the catalogs or Dart sources alter every key, so they
+rebuild the whole deck.
+"""
+
+import os
+import time
+
+from .app_data import QUESTIONS_DART, SCORING_DART, TRANSLATIONS, reload_app_data
+from .build_cache import _referenced_files, builder_fingerprint
+from .deck_engine import SpecError, load_spec
+
+# Seconds between polls
+POLL_INTERVAL = 0.2
+
+# Sources every slide may depend on
+APP_SOURCES = (QUESTIONS_DART, SCORING_DART, *TRANSLATIONS.values())
+
+
+def _stat(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class DeckWatcher:
+    """Keeps one deck's slides captured and rebuilds the entries that change"""
+
+    def __init__(self, engine, spec_path, cache, output=None, locale=None):
+        self.engine = engine
+        self.spec_path = spec_path
+        self.cache = cache
+        self.output = output
+        self.locale = locale
+        self.stamps = {}
+        # (entry id, build key) -> captured slides of that spec entry
+        self._captured = {}
+        self._prs = None
+        self._shared = None
+
+    def _load(self):
+        spec = load_spec(self.spec_path)
+        output = self.output or spec.get("output")
+        if not output:
+            raise SpecError(f"{self.spec_path}: no output path given for deck")
+        slides = spec["slides"]
+        if self.locale is not None:
+            from .locales import locale_output, localize_slide
+
+            output = locale_output(output, self.locale)
+            slides = [localize_slide(slide_spec, self.locale) for slide_spec in slides]
+        return slides, output
+
+    def changed(self):
+        """Watched paths whose modification time or size moved since the last build"""
+        return [path for path, stamp in self.stamps.items() if _stat(path) != stamp]
+
+    def build(self, changed=()):
+        """Rebuild the entries affected by `changed` paths and rewrite the output
+
+        Returns (entries rebuilt, entries in the deck, output path).
+        """
+        from .deck_update import entry_id
+        from .locales import default_index
+        from .streaming import StreamingWriter, capture, drop_slide, template_parts
+
+        if self._prs is None:
+            self._prs = self.engine.new_presentation()
+            self._shared = template_parts(self._prs)
+        if any(path in APP_SOURCES for path in changed):
+            reload_app_data()
+            default_index().reload()
+            self.cache.fingerprint = builder_fingerprint()
+
+        # Stamp before building, so edits made meanwhile trigger another round
+        spec_stamp = _stat(self.spec_path)
+        slides, output = self._load()
+        paths = set(APP_SOURCES)
+        for slide_spec in slides:
+            paths.update(_referenced_files(slide_spec))
+        self.stamps = {path: _stat(path) for path in paths}
+        self.stamps[self.spec_path] = spec_stamp
+
+        # Slides are tagged with their entry id, so entries are told apart by id as well as key
+        keys = [(entry_id(slide_spec, index), self.cache.key(slide_spec)) for index, slide_spec in enumerate(slides)]
+        captured = {}
+        for slide_spec, (entry, key) in zip(slides, keys):
+            if (entry, key) in self._captured:
+                captured[entry, key] = self._captured[entry, key]
+                continue
+            try:
+                built = self.engine.add_slide(self._prs, slide_spec, self.cache, key, entry)
+            except BaseException:
+                # Drop whatever a failing builder added, so the next round starts clean
+                for slide in list(self._prs.slides):
+                    drop_slide(self._prs, slide)
+                raise
+            captured[entry, key] = [capture(slide.part, self._shared) for slide in built]
+            for slide in built:
+                drop_slide(self._prs, slide)
+        rebuilt = len(set(captured) - set(self._captured))
+        self._captured = captured
+
+        tmp_path = f"{output}.{os.getpid()}.tmp"
+        writer = StreamingWriter(self._prs, tmp_path)
+        try:
+            for key in keys:
+                for slide in captured[key]:
+                    writer.add_captured(slide)
+            writer.close()
+            os.replace(tmp_path, output)
+        except BaseException:
+            writer.zip.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return rebuilt, len(keys), output
+
+
+def _log(message):
+    print(f"[{time.strftime('%H:%M:%S')}] {message}", flush=True)
+
+
+def _rebuild(watcher, changed=()):
+    start = time.perf_counter()
+    try:
+        rebuilt, total, output = watcher.build(changed)
+    except Exception as e:
+        # A half-saved spec, a missing file or a bad entry: wait for the next change
+        _log(f"{watcher.spec_path}: build failed: {type(e).__name__}: {e}")
+        watcher.stamps.update({path: _stat(path) for path in [*changed, watcher.spec_path]})
+        return
+    elapsed = (time.perf_counter() - start) * 1000
+    _log(f"{output}: rebuilt {rebuilt} of {total} entries in {elapsed:.0f} ms")
+
+
+def watch(engine, spec_paths, cache, output=None, locales=None, interval=POLL_INTERVAL):
+    """Build each spec, then rebuild whenever a source changes, until interrupted"""
+    watchers = []
+    for spec_path in spec_paths:
+        spec_locales = locales or load_spec(spec_path).get("locales") or [None]
+        watchers += [DeckWatcher(engine, spec_path, cache, output, locale) for locale in spec_locales]
+
+    for watcher in watchers:
+        _rebuild(watcher)
+    _log(f"Watching {sum(len(w.stamps) for w in watchers)} files, press Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(interval)
+            for watcher in watchers:
+                changed = watcher.changed()
+                if changed:
+                    _log(f"Changed: {', '.join(os.path.basename(path) for path in changed)}")
+                    _rebuild(watcher, changed)
+    except KeyboardInterrupt:
+        pass
+    return 0